@@ -0,0 +1,267 @@
+"""
+Archivos temporales de las descargas: un directorio por trabajo, presupuesto
+de disco y barrido de huérfanos.
+
+Cada descarga a disco recibe su propio directorio (`trabajo_<pid>_<aleatorio>`,
+creado con `mkdtemp`): ahí quedan el original de yt-dlp, los `.part` y el WAV
+convertido, y al terminar se borra el directorio entero. Antes de crearlo se
+reserva el espacio estimado con los metadatos; si la suma de reservas supera
+`TEMP_PRESUPUESTO_MB` (o el disco no tiene lugar), la descarga espera a que
+otra libere el suyo.
+
+El barrido borra los directorios cuyo proceso ya no existe (un worker caído o
+reiniciado) y los más viejos que `TEMP_EDAD_MAXIMA_SEGUNDOS`; se ejecuta al
+arrancar la API y luego cada `TEMP_BARRIDO_SEGUNDOS`. Sólo toca entradas con
+nombres propios (`trabajo_*`, y `audio_*` de versiones anteriores): el resto
+de TEMP_DIRECTORIO se deja intacto aunque sea un directorio compartido.
+
+Con TEMP_EN_RAM=1 los directorios van a un tmpfs (por defecto /dev/shm): los
+WAV intermedios no tocan el disco. El presupuesto se aplica igual, y conviene
+ajustarlo a la RAM disponible.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+TEMP_DIRECTORIO = Path(os.getenv('TEMP_DIRECTORIO', str(Path(__file__).parent / "tmp")))
+
+# Directorios de trabajo en memoria (tmpfs) en lugar del disco
+TEMP_EN_RAM = os.getenv('TEMP_EN_RAM', '0') == '1'
+TEMP_DIRECTORIO_RAM = Path(os.getenv('TEMP_DIRECTORIO_RAM', '/dev/shm/lyricsnatcher'))
+
+# Espacio máximo reservado por las descargas en curso de este proceso
+TEMP_PRESUPUESTO_MB = float(os.getenv('TEMP_PRESUPUESTO_MB', '2048'))
+# Espacio libre que se deja siempre en el sistema de archivos
+TEMP_MARGEN_LIBRE_MB = float(os.getenv('TEMP_MARGEN_LIBRE_MB', '512'))
+# Espera máxima por espacio antes de rechazar la descarga
+TEMP_ESPERA_MAXIMA_SEGUNDOS = float(os.getenv('TEMP_ESPERA_MAXIMA_SEGUNDOS', '600'))
+
+# Barrido de huérfanos: al arrancar y luego cada TEMP_BARRIDO_SEGUNDOS
+TEMP_BARRIDO_SEGUNDOS = float(os.getenv('TEMP_BARRIDO_SEGUNDOS', '600'))
+TEMP_EDAD_MAXIMA_SEGUNDOS = float(os.getenv('TEMP_EDAD_MAXIMA_SEGUNDOS', '21600'))
+
+# Reserva cuando el sitio no informa ni tamaño ni duración
+RESERVA_POR_DEFECTO_MB = 128
+# WAV pcm_s16le mono 16 kHz que produce el postprocesador de yt-dlp
+BYTES_WAV_POR_SEGUNDO = 16000 * 2
+# Original comprimido cuando no se informa el tamaño (~128 kbps)
+BYTES_ORIGINAL_POR_SEGUNDO = 16000
+
+PREFIJO_TRABAJO = 'trabajo_'
+# Archivos sueltos de versiones anteriores (tempfile.mktemp en la raíz, con .part/.wav)
+PREFIJO_LEGADO = 'audio_'
+# Cada cuánto se vuelve a mirar el disco mientras una descarga espera lugar
+INTERVALO_REVISION_SEGUNDOS = 5.0
+
+class EspacioTemporalAgotado(Exception):
+    """No se liberó espacio temporal suficiente a tiempo para la descarga."""
+
+def estimar_bytes(info: Optional[Dict[str, Any]]) -> int:
+    """
+    Espacio que ocupará una descarga a disco: el original más el WAV convertido.
+
+    Args:
+        info: Metadatos sondeados (usa filesize/filesize_approx y duration)
+    """
+    info = info or {}
+    duracion = info.get('duration') or 0
+    original = info.get('filesize') or info.get('filesize_approx') or duracion * BYTES_ORIGINAL_POR_SEGUNDO
+    if not original and not duracion:
+        return int(RESERVA_POR_DEFECTO_MB * 2**20)
+    return int(original + duracion * BYTES_WAV_POR_SEGUNDO)
+
+def _pid_trabajo(entrada: Path) -> Optional[int]:
+    """PID del proceso dueño de un directorio de trabajo (None si no lo es)."""
+    if not entrada.name.startswith(PREFIJO_TRABAJO) or not entrada.is_dir():
+        return None
+    pid = entrada.name[len(PREFIJO_TRABAJO):].split('_', 1)[0]
+    return int(pid) if pid.isdigit() else None
+
+def _proceso_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Existe, pero es de otro usuario
+        return True
+    return True
+
+class AlmacenTemporal:
+    """
+    Directorios de trabajo con reserva de espacio y barrido de huérfanos.
+
+    Las reservas se cuentan por proceso: con varios workers de gunicorn cada
+    uno tiene su propio presupuesto (el margen libre sí mira el disco real).
+    """
+
+    def __init__(self, raiz: Path, presupuesto_bytes: int, margen_libre_bytes: int):
+        self.raiz = raiz
+        self.presupuesto_bytes = presupuesto_bytes
+        self.margen_libre_bytes = margen_libre_bytes
+        # directorio -> bytes reservados
+        self._reservas: Dict[Path, int] = {}
+        self._condicion = threading.Condition()
+        self._esperando = 0
+        self._estadisticas = {'esperas': 0, 'segundos_esperando': 0.0, 'rechazadas': 0,
+                              'barridos': 0, 'huerfanos_eliminados': 0, 'bytes_eliminados': 0}
+
+    @property
+    def reservado_bytes(self) -> int:
+        return sum(self._reservas.values())
+
+    def _hay_lugar(self, bytes_estimados: int) -> bool:
+        """Con el bloqueo tomado. Una descarga sola siempre entra en el presupuesto."""
+        reservado = self.reservado_bytes
+        if reservado and reservado + bytes_estimados > self.presupuesto_bytes:
+            return False
+        # El espacio ya reservado todavía no se escribió del todo
+        libre = shutil.disk_usage(self.raiz).free - reservado
+        return libre - bytes_estimados >= self.margen_libre_bytes
+
+    def crear_directorio(self, bytes_estimados: int) -> Path:
+        """
+        Reservar espacio y crear un directorio de trabajo único.
+
+        Bloquea (en el hilo de descarga) mientras no haya lugar.
+
+        Args:
+            bytes_estimados: Espacio que ocupará la descarga (ver `estimar_bytes`)
+
+        Returns:
+            Directorio vacío, sólo para este trabajo
+
+        Raises:
+            EspacioTemporalAgotado: Si no se libera lugar en TEMP_ESPERA_MAXIMA_SEGUNDOS
+        """
+        self.raiz.mkdir(parents=True, exist_ok=True)
+        with self._condicion:
+            if not self._hay_lugar(bytes_estimados):
+                self._estadisticas['esperas'] += 1
+                self._esperando += 1
+                inicio = time.monotonic()
+                limite = inicio + TEMP_ESPERA_MAXIMA_SEGUNDOS
+                hay_lugar = False
+                try:
+                    # Despierta al liberarse una reserva, o cada pocos segundos
+                    # por si otro proceso liberó disco
+                    while not hay_lugar and time.monotonic() < limite:
+                        self._condicion.wait(min(INTERVALO_REVISION_SEGUNDOS, limite - time.monotonic()))
+                        hay_lugar = self._hay_lugar(bytes_estimados)
+                finally:
+                    self._esperando -= 1
+                    self._estadisticas['segundos_esperando'] += time.monotonic() - inicio
+                if not hay_lugar:
+                    self._estadisticas['rechazadas'] += 1
+                    raise EspacioTemporalAgotado(
+                        f"Sin espacio temporal para {bytes_estimados / 2**20:.0f} MB "
+                        f"tras {TEMP_ESPERA_MAXIMA_SEGUNDOS:.0f} s de espera"
+                    )
+            directorio = Path(tempfile.mkdtemp(prefix=f"{PREFIJO_TRABAJO}{os.getpid()}_", dir=self.raiz))
+            self._reservas[directorio] = bytes_estimados
+        return directorio
+
+    def es_directorio_trabajo(self, ruta: Path) -> bool:
+        with self._condicion:
+            return ruta in self._reservas
+
+    def liberar_directorio(self, directorio: Path):
+        """Borrar el directorio de trabajo con todo su contenido y devolver la reserva."""
+        shutil.rmtree(directorio, ignore_errors=True)
+        with self._condicion:
+            if self._reservas.pop(directorio, None) is not None:
+                self._condicion.notify_all()
+
+    def barrer(self) -> int:
+        """
+        Borrar lo que quedó de trabajos que ya no están en curso.
+
+        - Directorios de trabajo de un proceso que ya no existe: enseguida.
+        - Directorios de este proceso sin reserva (se perdió la limpieza): enseguida.
+        - Directorios de trabajo de otros workers y archivos `audio_*` de
+          versiones anteriores: si son más viejos que TEMP_EDAD_MAXIMA_SEGUNDOS.
+        - Cualquier otra entrada: nunca (la raíz puede ser compartida).
+
+        Returns:
+            Cantidad de entradas eliminadas
+        """
+        if not self.raiz.exists():
+            return 0
+        limite = time.time() - TEMP_EDAD_MAXIMA_SEGUNDOS
+        propio = os.getpid()
+        eliminados = 0
+        bytes_eliminados = 0
+        for entrada in self.raiz.iterdir():
+            # Se consulta en cada entrada y no con una copia previa: un directorio
+            # creado durante el barrido ya tiene su reserva al aparecer en disco
+            if self.es_directorio_trabajo(entrada):
+                continue
+            pid = _pid_trabajo(entrada)
+            legado = entrada.name.startswith(PREFIJO_LEGADO) and entrada.is_file()
+            if pid is None and not legado:
+                continue
+            try:
+                huerfano = entrada.stat().st_mtime < limite
+                if not huerfano and pid is not None:
+                    huerfano = pid == propio or not _proceso_vivo(pid)
+                if not huerfano:
+                    continue
+                if entrada.is_dir():
+                    tamano = sum(f.stat().st_size for f in entrada.rglob('*') if f.is_file())
+                    shutil.rmtree(entrada)
+                else:
+                    tamano = entrada.stat().st_size
+                    entrada.unlink()
+            except FileNotFoundError:
+                # Otro worker lo barrió antes
+                continue
+            except OSError as e:
+                print(f"Advertencia: no se pudo eliminar {entrada}: {e}")
+                continue
+            eliminados += 1
+            bytes_eliminados += tamano
+        self._estadisticas['barridos'] += 1
+        self._estadisticas['huerfanos_eliminados'] += eliminados
+        self._estadisticas['bytes_eliminados'] += bytes_eliminados
+        if eliminados:
+            print(f"Barrido de temporales: {eliminados} huérfanos ({bytes_eliminados / 2**20:.1f} MB)")
+        return eliminados
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._condicion:
+            return {
+                'directorio': str(self.raiz),
+                'en_ram': self.raiz == TEMP_DIRECTORIO_RAM,
+                'trabajos_activos': len(self._reservas),
+                'reservado_mb': round(self.reservado_bytes / 2**20, 1),
+                'presupuesto_mb': round(self.presupuesto_bytes / 2**20, 1),
+                'esperando': self._esperando,
+                **self._estadisticas,
+                'segundos_esperando': round(self._estadisticas['segundos_esperando'], 2),
+            }
+
+def _raiz() -> Path:
+    """tmpfs si TEMP_EN_RAM y existe su sistema de archivos; si no, el disco."""
+    if TEMP_EN_RAM:
+        if TEMP_DIRECTORIO_RAM.parent.is_dir():
+            return TEMP_DIRECTORIO_RAM
+        print(f"Advertencia: {TEMP_DIRECTORIO_RAM.parent} no existe, temporales en {TEMP_DIRECTORIO}")
+    return TEMP_DIRECTORIO
+
+almacen_temporal = AlmacenTemporal(
+    _raiz(), int(TEMP_PRESUPUESTO_MB * 2**20), int(TEMP_MARGEN_LIBRE_MB * 2**20)
+)
+
+async def barrer_periodicamente():
+    """Barrer huérfanos cada TEMP_BARRIDO_SEGUNDOS (el primer barrido lo hace el arranque)."""
+    while True:
+        await asyncio.sleep(TEMP_BARRIDO_SEGUNDOS)
+        try:
+            await asyncio.to_thread(almacen_temporal.barrer)
+        except Exception as e:
+            print(f"Advertencia: falló el barrido de temporales: {e}")
@@ -2,16 +2,85 @@
 Aplicación principal FastAPI para lyricsnatcher.
 Sistema de transcripción y traducción de letras desde URLs de video.
 """
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl
-from typing import Optional, Literal
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, HttpUrl, field_validator
+from typing import Any, Dict, List, Optional, Literal, Set
+import asyncio
+import json
 import os
 
+from database import (
+    inicializar_base_datos, cerrar_conexiones, buscar_transcripcion, buscar_por_url, buscar_letras
+)
+from ejecutores import cerrar_ejecutores
+from almacen_temporal import EspacioTemporalAgotado, almacen_temporal, barrer_periodicamente
+from pipeline import (
+    procesar_cancion, procesar_cancion_en_vivo, estadisticas_coalescencia, estadisticas_vad, estadisticas_descargas,
+    estado_preparacion, preparar_transcripcion, cerrar_transcripcion
+)
+from downloader import LimiteExcedido
+from huellas import estadisticas_huellas
+from metricas import exponer_metricas
+from transcriber.whisper_transcriber import MODELOS_PERMITIDOS
+from translator import ARGOS_PRECARGAR, estadisticas_libretranslate, estadisticas_memoria, gestor_argos
+from ingesta import crear_lote, consultar_lote
+from subtitulos import TIPOS_MIME, generar_subtitulos
+from trabajos import (
+    ESTADO_EN_COLA, ESTADO_COMPLETADO, ESTADO_ERROR,
+    encolar_trabajo, consultar_trabajo, escuchar_trabajo,
+    iniciar_trabajadores, detener_trabajadores
+)
+
+# Transmisiones en vivo en curso: siguen (y guardan el resultado) aunque el cliente se desconecte
+_transmisiones: Set[asyncio.Task] = set()
+# Margen al apagar para que terminen (y se guarden); después se cancelan
+VIVO_ESPERA_APAGADO_SEGUNDOS = float(os.getenv('VIVO_ESPERA_APAGADO_SEGUNDOS', '30'))
+
+async def _detener_transmisiones():
+    """Esperar las transmisiones en curso hasta el margen y cancelar las que sigan."""
+    if not _transmisiones:
+        return
+    _, pendientes = await asyncio.wait(set(_transmisiones), timeout=VIVO_ESPERA_APAGADO_SEGUNDOS)
+    for tarea in pendientes:
+        tarea.cancel()
+    await asyncio.gather(*pendientes, return_exceptions=True)
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    """Arranque y apagado de la aplicación."""
+    # Crear tablas y aplicar migraciones antes de aceptar peticiones
+    inicializar_base_datos()
+    # Borrar temporales que dejaron procesos caídos y luego barrer periódicamente
+    await asyncio.to_thread(almacen_temporal.barrer)
+    barrido = asyncio.create_task(barrer_periodicamente())
+    # Paquetes de Argos (fallback offline): por defecto se leen en la primera
+    # traducción que los necesita, así la API no carga argostranslate al arrancar
+    if ARGOS_PRECARGAR:
+        await asyncio.to_thread(gestor_argos.inicializar)
+    # Cargar y calentar modelos en segundo plano: /health responde ya,
+    # /health/ready devuelve 503 hasta que terminen
+    preparacion = asyncio.create_task(preparar_transcripcion())
+    # Retomar trabajos pendientes de ejecuciones anteriores
+    await iniciar_trabajadores()
+    yield
+    preparacion.cancel()
+    barrido.cancel()
+    # Antes de cerrar los pools: sus futuros son los de las transmisiones en curso
+    await _detener_transmisiones()
+    await detener_trabajadores()
+    # Liberar el planificador de lotes y los pools de descarga, transcripción y traducción
+    cerrar_transcripcion()
+    cerrar_ejecutores()
+    cerrar_conexiones()
+
 app = FastAPI(
     title="LyricSnatcher",
     description="API para transcripción y traducción de letras desde URLs de video",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=ciclo_de_vida
 )
 
 # Configurar CORS para permitir peticiones desde frontend
@@ -28,6 +97,20 @@ class SolicitudTranscripcion(BaseModel):
     """Modelo de entrada para solicitud de transcripción y traducción."""
     url: HttpUrl
     target_lang: Literal["es", "en", "pt"]
+    # Modelo Whisper (p. ej. "tiny" para una vista previa rápida); no se guarda en la base
+    model: Optional[str] = None
+
+    @field_validator("model")
+    @classmethod
+    def validar_modelo(cls, valor: Optional[str]) -> Optional[str]:
+        if valor is not None and valor not in MODELOS_PERMITIDOS:
+            raise ValueError(f"Modelo no permitido; opciones: {', '.join(MODELOS_PERMITIDOS)}")
+        return valor
+
+class SolicitudLote(SolicitudTranscripcion):
+    """Lote de ingesta: `url` puede ser una playlist; `urls` agrega más videos o playlists."""
+    url: Optional[HttpUrl] = None
+    urls: List[HttpUrl] = []
 
 class RespuestaTranscripcion(BaseModel):
     """Modelo de respuesta con letra transcrita y traducida."""
@@ -41,6 +124,61 @@ class RespuestaTranscripcion(BaseModel):
     text_src: str
     text_dst: str
 
+class TrabajoCreado(BaseModel):
+    """Respuesta al encolar un trabajo."""
+    job_id: str
+    status: str
+
+class EstadoLote(BaseModel):
+    """Avance y rendimiento de un lote de ingesta."""
+    batch_id: str
+    source: str
+    target_lang: str
+    model: Optional[str] = None
+    total: int
+    skipped: int
+    queued: int
+    running: int
+    done: int
+    error: int
+    finished: bool
+    elapsed_seconds: float
+    songs_per_hour: float
+
+class ResultadoBusqueda(BaseModel):
+    """Una canción encontrada por `/search`."""
+    id: int
+    title: str
+    artist: str
+    album: Optional[str] = None
+    year: Optional[int] = None
+    source_url: str
+    language_src: str
+    language_match: str
+    snippet: str
+    score: float
+
+class RespuestaBusqueda(BaseModel):
+    """Página de resultados de búsqueda."""
+    query: str
+    page: int
+    per_page: int
+    has_more: bool
+    results: List[ResultadoBusqueda]
+
+class EstadoTrabajo(BaseModel):
+    """Estado de un trabajo en cola o en proceso."""
+    job_id: str
+    source_url: str
+    target_lang: str
+    model: Optional[str] = None
+    batch_id: Optional[str] = None
+    status: Literal["queued", "running", "done", "error"]
+    stage: Optional[Literal["downloading", "transcribing", "translating"]] = None
+    progress: float
+    result: Optional[RespuestaTranscripcion] = None
+    error: Optional[str] = None
+
 @app.get("/")
 async def raiz():
     """Endpoint raíz con información de la API."""
@@ -49,7 +187,19 @@ async def raiz():
         "version": "0.1.0",
         "descripcion": "API para transcripción y traducción de letras",
         "endpoints": {
-            "POST /transcribe-translate": "Transcribir y traducir letra desde URL"
+            "POST /transcribe-translate": "Transcribir y traducir letra desde URL",
+            "GET /transcribe-translate/stream": "Líneas transcritas y traducidas a medida que salen (SSE)",
+            "POST /jobs": "Encolar transcripción y traducción (devuelve job_id)",
+            "GET /jobs/{job_id}": "Consultar etapa y progreso de un trabajo",
+            "GET /jobs/{job_id}/events": "Seguir un trabajo en vivo (Server-Sent Events)",
+            "POST /batches": "Encolar una playlist o lista de URLs (omite las ya guardadas)",
+            "GET /batches/{batch_id}": "Avance y canciones por hora de un lote",
+            "GET /search": "Buscar por fragmento de letra, título o artista (paginado)",
+            "GET /subtitles": "Letra sincronizada (LRC, SRT o VTT) de una canción ya transcrita",
+            "GET /health": "Liveness: el proceso responde",
+            "GET /health/ready": "Readiness: modelos cargados y calientes (503 si no)",
+            "GET /stats": "Métricas internas (coalescencia de peticiones, audio omitido por VAD)",
+            "GET /metrics": "Latencia por etapa, factor de tiempo real y caches (formato Prometheus)"
         }
     }
 
@@ -58,78 +208,247 @@ async def health_check():
     """Verificar estado de la API."""
     return {"status": "ok", "message": "API funcionando correctamente"}
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Verificar que los modelos Whisper estén cargados y calientes."""
+    estado = estado_preparacion()
+    if not estado['listo']:
+        return JSONResponse(status_code=503, content={"status": "warming_up", **estado})
+    return {"status": "ready", **estado}
+
+@app.get("/stats")
+async def estadisticas():
+    """
+    Métricas internas: coalescencia, audio omitido por el VAD, sondeos de
+    metadatos, resubidas reconocidas por huella, traductores, memoria de
+    traducción y espacio temporal.
+    """
+    return {
+        "coalescencia": estadisticas_coalescencia(),
+        "vad": estadisticas_vad(),
+        "descargas": estadisticas_descargas(),
+        "huellas": estadisticas_huellas(),
+        "libretranslate": estadisticas_libretranslate(),
+        "argos": gestor_argos.estadisticas(),
+        "memoria_traduccion": estadisticas_memoria(),
+        "temporales": almacen_temporal.estadisticas(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metricas_prometheus():
+    """Histogramas por etapa y contadores de cache en formato de texto de Prometheus."""
+    return PlainTextResponse(exponer_metricas(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/transcribe-translate", response_model=RespuestaTranscripcion)
-async def transcribir_y_traducir(solicitud: SolicitudTranscripcion):
+async def transcribir_y_traducir(
+    solicitud: SolicitudTranscripcion,
+    perfilar: bool = Header(False, alias="X-Profile")
+):
     """
     Endpoint principal: descarga audio, transcribe y traduce.
     
+    Cada etapa bloqueante corre en su propio pool (ver `ejecutores.py`),
+    así el event loop sigue atendiendo otras peticiones mientras tanto.
+    
     Flujo:
     1. Validar URL
-    2. Descargar audio (temporal)
-    3. Transcribir con Whisper
-    4. Traducir al idioma objetivo
-    5. Guardar metadatos y letra
-    6. Limpiar archivos temporales
-    """
-    from downloader import descargar_audio, limpiar_archivo
-    from transcriber.whisper_transcriber import transcribir_audio
-    from translator import traducir_texto
-    from database import guardar_letra, buscar_por_url
-    
-    url_str = str(solicitud.url)
-    
-    # Verificar si ya existe en base de datos
-    letra_existente = buscar_por_url(url_str)
-    if letra_existente and letra_existente['language_dst'] == solicitud.target_lang:
-        return RespuestaTranscripcion(**letra_existente)
-    
-    ruta_audio = None
+    2. Sondear metadatos sin descargar (413 si supera duración o tamaño máximos)
+    3. Descargar audio (temporal)
+    4. Transcribir con Whisper
+    5. Traducir al idioma objetivo
+    6. Guardar metadatos y letra
+    7. Limpiar archivos temporales
     
+    Con la cabecera `X-Profile: 1` (y PERFILES_DIRECTORIO configurado) se
+    guarda un perfil de cProfile de la petición.
+    """
     try:
-        # 1. Descargar audio
-        ruta_audio, metadata = descargar_audio(url_str)
-        
-        # 2. Transcribir con Whisper
-        resultado_transcripcion = transcribir_audio(ruta_audio)
-        texto_original = resultado_transcripcion['text']
-        idioma_original = resultado_transcripcion['language']
-        
-        # 3. Traducir
-        texto_traducido = traducir_texto(
-            texto_original, 
-            idioma_original, 
-            solicitud.target_lang
+        datos_letra = await procesar_cancion(
+            str(solicitud.url), solicitud.target_lang, modelo=solicitud.model, perfilar=perfilar
         )
-        
-        # 4. Preparar datos para guardar
-        datos_letra = {
-            'title': metadata['title'],
-            'artist': metadata['artist'],
-            'album': metadata.get('album'),
-            'year': metadata.get('year'),
-            'source_url': url_str,
-            'language_src': idioma_original,
-            'language_dst': solicitud.target_lang,
-            'text_src': texto_original,
-            'text_dst': texto_traducido
-        }
-        
-        # 5. Guardar en base de datos
-        guardar_letra(datos_letra)
-        
-        # 6. Retornar respuesta
         return RespuestaTranscripcion(**datos_letra)
     
+    except LimiteExcedido as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except EspacioTemporalAgotado as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "60"})
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error en el proceso: {str(e)}"
         )
+
+@app.get("/transcribe-translate/stream")
+async def transcribir_y_traducir_en_vivo(
+    url: HttpUrl,
+    target_lang: Literal["es", "en", "pt"],
+    model: Optional[str] = None
+):
+    """
+    Variante en vivo de `/transcribe-translate` (Server-Sent Events).
     
-    finally:
-        # 7. Limpiar archivo temporal
-        if ruta_audio:
-            limpiar_archivo(ruta_audio)
+    Emite `status` al cambiar de etapa, `segment` por cada línea apenas
+    Whisper la decodifica (fragmentos de ~30 s cortados en silencios) y
+    `translation` por cada línea traducida, en lotes de pocas líneas. Cierra
+    con `result` (mismo cuerpo que `/transcribe-translate`) o `error`
+    ({status, detail}). El resultado se guarda aunque el cliente se desconecte.
+    """
+    if model is not None and model not in MODELOS_PERMITIDOS:
+        raise HTTPException(
+            status_code=422, detail=f"Modelo no permitido; opciones: {', '.join(MODELOS_PERMITIDOS)}"
+        )
+    
+    cola: asyncio.Queue = asyncio.Queue()
+    
+    def emitir(evento: str, datos: Dict[str, Any]):
+        cola.put_nowait((evento, datos))
+    
+    async def procesar():
+        try:
+            datos_letra = await procesar_cancion_en_vivo(str(url), target_lang, emitir, modelo=model)
+            emitir('result', RespuestaTranscripcion(**datos_letra).model_dump())
+        except LimiteExcedido as e:
+            emitir('error', {'status': 413, 'detail': str(e)})
+        except EspacioTemporalAgotado as e:
+            emitir('error', {'status': 503, 'detail': str(e)})
+        except asyncio.CancelledError:
+            emitir('error', {'status': 503, 'detail': "El servidor se está apagando"})
+            raise
+        except Exception as e:
+            emitir('error', {'status': 500, 'detail': f"Error en el proceso: {str(e)}"})
+    
+    tarea = asyncio.create_task(procesar())
+    _transmisiones.add(tarea)
+    tarea.add_done_callback(_transmisiones.discard)
+    
+    async def generar_eventos():
+        while True:
+            evento, datos = await cola.get()
+            yield f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+            if evento in ('result', 'error'):
+                return
+    
+    return StreamingResponse(
+        generar_eventos(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+@app.post("/jobs", response_model=TrabajoCreado, status_code=202)
+async def crear_trabajo_transcripcion(solicitud: SolicitudTranscripcion):
+    """
+    Encolar una transcripción y traducción; responde de inmediato con el id del trabajo.
+    
+    El avance se consulta con `GET /jobs/{job_id}` o se escucha con
+    `GET /jobs/{job_id}/events` (Server-Sent Events).
+    """
+    id_trabajo = await encolar_trabajo(str(solicitud.url), solicitud.target_lang, solicitud.model)
+    return TrabajoCreado(job_id=id_trabajo, status=ESTADO_EN_COLA)
+
+@app.get("/jobs/{job_id}", response_model=EstadoTrabajo)
+async def estado_trabajo(job_id: str):
+    """Consultar etapa, progreso y resultado de un trabajo."""
+    estado = consultar_trabajo(job_id)
+    if estado is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return EstadoTrabajo(**estado)
+
+@app.get("/jobs/{job_id}/events")
+async def eventos_trabajo(job_id: str):
+    """
+    Emitir los cambios de estado de un trabajo como Server-Sent Events.
+    
+    Envía un evento `status` por cada cambio de etapa y cierra el stream con
+    un evento `result` (o `error`) cuando el trabajo termina.
+    """
+    if consultar_trabajo(job_id) is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    
+    async def generar_eventos():
+        async for estado in escuchar_trabajo(job_id):
+            if estado['status'] == ESTADO_COMPLETADO:
+                evento = 'result'
+            elif estado['status'] == ESTADO_ERROR:
+                evento = 'error'
+            else:
+                evento = 'status'
+            yield f"event: {evento}\ndata: {json.dumps(estado, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(generar_eventos(), media_type="text/event-stream")
+
+@app.post("/batches", response_model=EstadoLote, status_code=202)
+async def crear_lote_ingesta(solicitud: SolicitudLote):
+    """
+    Encolar una playlist y/o una lista de URLs como un lote de trabajos.
+    
+    Las playlists se expanden con yt-dlp (sin descargar) y se omiten las URLs
+    repetidas o ya guardadas para el idioma destino. Cada URL restante es un
+    trabajo normal de `/jobs` asociado al lote.
+    """
+    fuentes = ([str(solicitud.url)] if solicitud.url else []) + [str(url) for url in solicitud.urls]
+    if not fuentes:
+        raise HTTPException(status_code=422, detail="Indica `url` (playlist o video) o `urls`")
+    try:
+        lote = await crear_lote(fuentes, solicitud.target_lang, solicitud.model)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error al crear el lote: {str(e)}")
+    return EstadoLote(**lote)
+
+@app.get("/batches/{batch_id}", response_model=EstadoLote)
+async def estado_lote(batch_id: str):
+    """Consultar avance y rendimiento (canciones por hora) de un lote."""
+    lote = consultar_lote(batch_id)
+    if lote is None:
+        raise HTTPException(status_code=404, detail="Lote no encontrado")
+    return EstadoLote(**lote)
+
+@app.get("/search", response_model=RespuestaBusqueda)
+async def buscar(
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(20, ge=1, le=50)
+):
+    """
+    Búsqueda de texto completo (FTS5) en letras originales, traducciones,
+    títulos y artistas, ordenada por relevancia.
+    """
+    try:
+        # Un resultado de más indica si hay otra página sin contar todas las coincidencias
+        resultados = await asyncio.to_thread(buscar_letras, q, per_page + 1, (page - 1) * per_page)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return RespuestaBusqueda(
+        query=q,
+        page=page,
+        per_page=per_page,
+        has_more=len(resultados) > per_page,
+        results=[ResultadoBusqueda(**r) for r in resultados[:per_page]]
+    )
+
+@app.get("/subtitles")
+async def subtitulos(
+    url: str,
+    format: Literal["lrc", "srt", "vtt"] = "lrc",
+    lang: Optional[Literal["es", "en", "pt"]] = None
+):
+    """
+    Letra sincronizada a partir de los tiempos guardados (no vuelve a transcribir).
+    
+    Con `lang` se usan las líneas de la traducción guardada, alineadas a los
+    mismos tiempos que el original.
+    """
+    transcripcion = await asyncio.to_thread(buscar_transcripcion, url)
+    if transcripcion is None:
+        raise HTTPException(status_code=404, detail="Transcripción no encontrada")
+    texto_traducido = None
+    if lang and lang != transcripcion['language_src']:
+        letra = await asyncio.to_thread(buscar_por_url, url, lang)
+        if letra is None:
+            raise HTTPException(status_code=404, detail=f"Traducción a '{lang}' no encontrada")
+        texto_traducido = letra['text_dst']
+    try:
+        contenido = generar_subtitulos(format, transcripcion, texto_traducido)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(content=contenido, media_type=TIPOS_MIME[format])
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,173 @@
+"""
+Benchmark de arranque: tiempo de import y memoria por worker.
+
+1. Import de `app` en un proceso nuevo: segundos, RSS y qué módulos pesados
+   quedaron cargados (torch, whisper, yt-dlp, argostranslate), frente a
+   importarlos todos al arrancar.
+2. Procesos creados con fork, como el worker de `gunicorn_conf.py` y su pool
+   de Whisper: modelos cargados en el maestro antes del fork frente a
+   cargados en cada proceso.
+   Informa RSS, PSS (memoria proporcional: las páginas compartidas se
+   reparten entre quienes las usan) y memoria privada por worker. Sólo Linux.
+
+Uso:
+    python -m benchmarks.bench_arranque --workers 4 --modelo tiny
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+RAIZ = Path(__file__).resolve().parent.parent
+MODULOS_PESADOS = ['torch', 'whisper', 'faster_whisper', 'yt_dlp', 'argostranslate']
+
+_MEDIR_IMPORT = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+{importar}
+segundos = time.perf_counter() - inicio
+print(json.dumps({{
+    'segundos': segundos,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modulos': [m for m in {modulos!r} if m in sys.modules],
+}}))
+"""
+
+def _medir_import(importar: str, repeticiones: int) -> Dict:
+    """Importar en procesos nuevos y devolver la mediana de tiempo y RSS."""
+    mediciones = []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, '-c', _MEDIR_IMPORT.format(importar=importar, modulos=MODULOS_PESADOS)],
+            capture_output=True, text=True, cwd=RAIZ, check=True
+        ).stdout
+        mediciones.append(json.loads(salida.strip().splitlines()[-1]))
+    return {
+        'segundos': statistics.median(m['segundos'] for m in mediciones),
+        'rss_mb': statistics.median(m['rss_mb'] for m in mediciones),
+        'modulos': mediciones[-1]['modulos'],
+    }
+
+def _memoria(pid: int) -> Dict[str, float]:
+    """RSS, PSS y memoria privada (MB) de un proceso según /proc/<pid>/smaps_rollup."""
+    campos = {}
+    for linea in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines()[1:]:
+        nombre, valor = linea.split(':', 1)
+        campos[nombre] = int(valor.split()[0]) / 1024
+    return {
+        'rss_mb': campos['Rss'],
+        'pss_mb': campos['Pss'],
+        'privada_mb': campos['Private_Clean'] + campos['Private_Dirty'],
+    }
+
+def _medir_workers(workers: int, antes_del_fork: bool) -> Dict:
+    """
+    Crear `workers` procesos con fork; cada uno calienta el modelo y espera a
+    que el maestro lea su memoria. Con `antes_del_fork` el maestro carga los
+    pesos primero (sin inferencia), como `gunicorn_conf.on_starting`.
+    """
+    from transcriber.motores import MOTOR_WHISPER
+    from transcriber.whisper_transcriber import calentar_modelos, cargar_modelos
+
+    inicio = time.perf_counter()
+    if antes_del_fork:
+        if MOTOR_WHISPER == 'openai':
+            import torch
+            torch.set_num_threads(1)
+        cargar_modelos()
+
+    hijos = []
+    for _ in range(workers):
+        lectura_listo, escritura_listo = os.pipe()
+        lectura_fin, escritura_fin = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Cerrar también las tuberías heredadas de los hermanos anteriores
+            for _, lectura, escritura in hijos:
+                os.close(lectura)
+                os.close(escritura)
+            os.close(lectura_listo)
+            os.close(escritura_fin)
+            calentar_modelos()
+            os.write(escritura_listo, b'1')
+            os.read(lectura_fin, 1)
+            os._exit(0)
+        os.close(escritura_listo)
+        os.close(lectura_fin)
+        hijos.append((pid, lectura_listo, escritura_fin))
+
+    for _, lectura_listo, _ in hijos:
+        os.read(lectura_listo, 1)
+    listos = time.perf_counter() - inicio
+    memorias = [_memoria(pid) for pid, _, _ in hijos]
+    maestro = _memoria(os.getpid())
+    for pid, lectura_listo, escritura_fin in hijos:
+        os.close(escritura_fin)
+        os.close(lectura_listo)
+        os.waitpid(pid, 0)
+
+    return {
+        'segundos_hasta_listos': round(listos, 2),
+        'maestro': {clave: round(valor, 1) for clave, valor in maestro.items()},
+        'worker': {
+            clave: round(statistics.mean(m[clave] for m in memorias), 1) for clave in memorias[0]
+        },
+        # Memoria real del grupo: la PSS reparte las páginas compartidas sin contarlas dos veces
+        'pss_total_mb': round(maestro['pss_mb'] + sum(m['pss_mb'] for m in memorias), 1),
+    }
+
+def _medir_workers_en_proceso(workers: int, antes_del_fork: bool) -> Dict:
+    """Cada modo en un intérprete limpio (sin modelos ni torch cargados de antes)."""
+    codigo = (
+        "import json; from benchmarks.bench_arranque import _medir_workers; "
+        f"print(json.dumps(_medir_workers({workers}, {antes_del_fork})))"
+    )
+    salida = subprocess.run(
+        [sys.executable, '-c', codigo], capture_output=True, text=True, cwd=RAIZ, check=True
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque (import y memoria por worker)")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--modelo', default=os.getenv('WHISPER_MODEL', 'tiny'))
+    parser.add_argument('--repeticiones', type=int, default=5, help="Procesos para medir el import")
+    parser.add_argument('--sin-workers', action='store_true', help="Medir sólo el import")
+    args = parser.parse_args()
+    os.environ['WHISPER_MODEL'] = args.modelo
+    os.environ['WHISPER_MODELOS_PRECARGA'] = args.modelo
+
+    print("\n" + "="*60)
+    print("BENCHMARK ARRANQUE")
+    print("="*60)
+    perezoso = _medir_import('import app', args.repeticiones)
+    pesados = '\n'.join(
+        f"try:\n    import {m}\nexcept ImportError:\n    pass" for m in MODULOS_PESADOS
+    )
+    ansioso = _medir_import(f"import app\n{pesados}", args.repeticiones)
+    print(f"{'import':28}{'segundos':>10}{'RSS MB':>10}  módulos pesados")
+    print(f"{'app (perezoso)':28}{perezoso['segundos']:10.2f}{perezoso['rss_mb']:10.0f}  "
+          f"{', '.join(perezoso['modulos']) or '-'}")
+    print(f"{'app + todo al arrancar':28}{ansioso['segundos']:10.2f}{ansioso['rss_mb']:10.0f}  "
+          f"{', '.join(ansioso['modulos']) or '-'}")
+
+    if args.sin_workers:
+        print("="*60 + "\n")
+        return
+    print(f"\n{args.workers} workers con fork, modelo {args.modelo} (MB por worker, promedio):")
+    print(f"{'':24}{'RSS':>8}{'PSS':>8}{'privada':>9}{'PSS total':>11}{'listos s':>10}")
+    for nombre, antes in (('carga en cada worker', False), ('carga antes del fork', True)):
+        resultado = _medir_workers_en_proceso(args.workers, antes)
+        worker = resultado['worker']
+        print(f"{nombre:24}{worker['rss_mb']:8.0f}{worker['pss_mb']:8.0f}{worker['privada_mb']:9.0f}"
+              f"{resultado['pss_total_mb']:11.0f}{resultado['segundos_hasta_listos']:10.1f}")
+    print("(PSS total: maestro + workers, cada página compartida contada una vez)")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
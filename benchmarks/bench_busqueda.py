@@ -0,0 +1,122 @@
+"""
+Benchmark de la búsqueda de texto completo (FTS5) sobre un catálogo sintético.
+
+Carga `--filas` transcripciones con una traducción cada una (los triggers
+mantienen el índice al insertar) y mide la latencia de `buscar_letras`
+frente a un `LIKE` sobre `text_src`/`text_dst` con las mismas consultas.
+
+Uso:
+    python -m benchmarks.bench_busqueda --filas 1000000
+"""
+import argparse
+import itertools
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import database
+
+# Vocabulario con frecuencias tipo Zipf: pocas palabras muy comunes y muchas raras
+_SILABAS = ['ca', 'ra', 'zon', 'mo', 'na', 'te', 'lu', 'so', 'vi', 'da', 'mar', 'sol', 'fi', 'go', 'ne']
+
+def _vocabulario(tamano: int, semilla: int = 1) -> list:
+    aleatorio = random.Random(semilla)
+    palabras = set()
+    while len(palabras) < tamano:
+        palabras.add(''.join(aleatorio.choice(_SILABAS) for _ in range(aleatorio.randint(2, 4))))
+    return sorted(palabras)
+
+def _cargar(filas: int, palabras_por_letra: int, vocabulario: list, lote: int = 20000) -> float:
+    """Insertar filas sintéticas y devolver filas por segundo."""
+    aleatorio = random.Random(2)
+    acumulados = list(itertools.accumulate(1 / (i + 1) for i in range(len(vocabulario))))
+
+    def texto() -> str:
+        palabras = aleatorio.choices(vocabulario, cum_weights=acumulados, k=palabras_por_letra)
+        return '\n'.join(' '.join(palabras[i:i + 6]) for i in range(0, len(palabras), 6))
+
+    inicio = time.perf_counter()
+    for desde in range(0, filas, lote):
+        transcripciones = [
+            (n, f'Canción {n} {aleatorio.choice(vocabulario)}', f'Artista {n % 5000}',
+             f'https://www.youtube.com/watch?v={n:011d}', f'youtube:{n:011d}', 'en', texto())
+            for n in range(desde + 1, min(desde + lote, filas) + 1)
+        ]
+        with database.transaccion() as cursor:
+            cursor.executemany(
+                "INSERT INTO transcriptions (id, title, artist, source_url, video_key, language_src, text_src) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", transcripciones
+            )
+            cursor.executemany(
+                "INSERT INTO translations (transcription_id, language_dst, text_dst) VALUES (?, 'es', ?)",
+                [(t[0], texto()) for t in transcripciones]
+            )
+        print(f"  {min(desde + lote, filas):>9} filas", end='\r')
+    return filas / (time.perf_counter() - inicio)
+
+def _buscar_like(texto: str):
+    """
+    Alternativa sin índice: LIKE sobre todas las filas. Para ordenar o paginar
+    hay que recorrer la tabla completa, así que se cuentan todas las coincidencias.
+    """
+    patron = f'%{texto}%'
+    return database.obtener_conexion().execute("""
+        SELECT COUNT(DISTINCT t.id) FROM transcriptions t
+        LEFT JOIN translations tr ON tr.transcription_id = t.id
+        WHERE t.text_src LIKE ? OR tr.text_dst LIKE ? OR t.title LIKE ? OR t.artist LIKE ?
+    """, (patron, patron, patron, patron)).fetchall()
+
+def _medir(funcion, repeticiones: int) -> dict:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {'p50': statistics.median(tiempos), 'max': max(tiempos), 'resultados': len(resultado)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda FTS5")
+    parser.add_argument('--filas', type=int, default=1000000)
+    parser.add_argument('--palabras', type=int, default=60, help="Palabras por letra sintética")
+    parser.add_argument('--vocabulario', type=int, default=20000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--sin-like', action='store_true', help="No medir el escaneo con LIKE")
+    args = parser.parse_args()
+
+    directorio = Path(tempfile.mkdtemp(prefix='bench_busqueda_'))
+    database.DB_PATH = directorio / 'lyrics.sqlite'
+    try:
+        vocabulario = _vocabulario(args.vocabulario)
+        print("\n" + "="*60)
+        print("BENCHMARK BÚSQUEDA FTS5")
+        print("="*60)
+        print(f"Cargando {args.filas} canciones ({args.palabras} palabras, original + traducción)...")
+        filas_por_segundo = _cargar(args.filas, args.palabras, vocabulario)
+        tamano_mb = sum(f.stat().st_size for f in directorio.iterdir()) / 2**20
+        print()
+        print(f"Carga con triggers: {filas_por_segundo:,.0f} filas/s | base: {tamano_mb:,.0f} MB")
+
+        consultas = {
+            'palabra común': vocabulario[0],
+            'palabra rara': vocabulario[-1],
+            'dos palabras': f'{vocabulario[3]} {vocabulario[500]}',
+            'palabra media': vocabulario[1000],
+            'artista': 'Artista 4321',
+        }
+        print(f"\n{'consulta':16}{'FTS p50 ms':>12}{'FTS máx':>10}{'LIKE p50 ms':>13}{'p. 50':>8}")
+        for nombre, texto in consultas.items():
+            fts = _medir(lambda: database.buscar_letras(texto, 20), args.repeticiones)
+            pagina = _medir(lambda: database.buscar_letras(texto, 20, 1000), args.repeticiones)
+            like = '-' if args.sin_like else f"{_medir(lambda: _buscar_like(texto), 1)['p50']:.1f}"
+            print(f"{nombre:16}{fts['p50']:12.1f}{fts['max']:10.1f}{like:>13}{pagina['p50']:8.1f}")
+        print("(p. 50: página 51, desplazamiento 1000; LIKE: recorrido completo)")
+        print("="*60 + "\n")
+    finally:
+        database.cerrar_conexiones()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
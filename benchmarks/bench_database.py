@@ -0,0 +1,164 @@
+"""
+Benchmark de la capa SQLite: lecturas y escrituras por segundo con hilos concurrentes.
+
+Compara el acceso actual (conexión por hilo, WAL, pragmas ajustados) contra el
+esquema anterior (una conexión nueva por consulta, journal por defecto).
+
+Uso:
+    python -m benchmarks.bench_database --hilos 8 --segundos 5
+"""
+import argparse
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import database
+
+def _datos_letra(n: int) -> dict:
+    """Letra sintética número `n`."""
+    return {
+        'title': f'Canción {n}',
+        'artist': f'Artista {n % 500}',
+        'album': None,
+        'year': 2000 + n % 25,
+        'source_url': f'https://www.youtube.com/watch?v={n:011d}',
+        'language_src': 'en',
+        'language_dst': 'es',
+        'text_src': 'la la la\n' * 40,
+        'text_dst': 'la la la\n' * 40,
+    }
+
+def _leer_sin_pool(ruta: Path, url: str):
+    """Lectura con conexión nueva (comportamiento anterior)."""
+    conexion = sqlite3.connect(ruta, timeout=30)
+    conexion.row_factory = sqlite3.Row
+    conexion.execute(
+        "SELECT * FROM lyrics WHERE video_key = ? LIMIT 1", (database.clave_video(url),)
+    ).fetchone()
+    conexion.close()
+
+def _escribir_sin_pool(ruta: Path, datos: dict):
+    """Escritura con conexión nueva (comportamiento anterior)."""
+    conexion = sqlite3.connect(ruta, timeout=30)
+    cursor = conexion.cursor()
+    cursor.execute("""
+        INSERT INTO transcriptions (title, artist, album, year, source_url,
+                                    language_src, text_src, video_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (datos['title'], datos['artist'], datos['album'], datos['year'], datos['source_url'],
+          datos['language_src'], datos['text_src'], database.clave_video(datos['source_url'])))
+    cursor.execute(
+        "INSERT INTO translations (transcription_id, language_dst, text_dst) VALUES (?, ?, ?)",
+        (cursor.lastrowid, datos['language_dst'], datos['text_dst'])
+    )
+    conexion.commit()
+    conexion.close()
+
+def _ejecutar_carga(leer, escribir, hilos: int, segundos: float,
+                    proporcion_lecturas: float, filas_iniciales: int) -> dict:
+    """Lanzar `hilos` hilos con carga mixta durante `segundos` y contar operaciones."""
+    contador = iter(range(filas_iniciales, 10**9))
+    bloqueo_contador = threading.Lock()
+    resultados = []
+    fin = time.perf_counter() + segundos
+
+    def trabajador(semilla: int):
+        aleatorio = random.Random(semilla)
+        lecturas = escrituras = errores = 0
+        while time.perf_counter() < fin:
+            try:
+                if aleatorio.random() < proporcion_lecturas:
+                    n = aleatorio.randrange(filas_iniciales)
+                    leer(_datos_letra(n)['source_url'])
+                    lecturas += 1
+                else:
+                    with bloqueo_contador:
+                        n = next(contador)
+                    escribir(_datos_letra(n))
+                    escrituras += 1
+            except sqlite3.OperationalError:
+                # "database is locked"
+                errores += 1
+        resultados.append((lecturas, escrituras, errores))
+
+    inicio = time.perf_counter()
+    lista_hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    for hilo in lista_hilos:
+        hilo.start()
+    for hilo in lista_hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    lecturas = sum(r[0] for r in resultados)
+    escrituras = sum(r[1] for r in resultados)
+    errores = sum(r[2] for r in resultados)
+    return {
+        'lecturas_por_segundo': lecturas / duracion,
+        'escrituras_por_segundo': escrituras / duracion,
+        'errores_bloqueo': errores,
+    }
+
+def _preparar(ruta: Path, filas_iniciales: int):
+    """Crear el esquema y cargar filas iniciales en lotes."""
+    database.DB_PATH = ruta
+    lote = [_datos_letra(n) for n in range(filas_iniciales)]
+    for i in range(0, len(lote), 500):
+        database.guardar_letras(lote[i:i + 500])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la capa SQLite")
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--segundos', type=float, default=5.0)
+    parser.add_argument('--proporcion-lecturas', type=float, default=0.8)
+    parser.add_argument('--filas-iniciales', type=int, default=5000)
+    args = parser.parse_args()
+
+    directorio = Path(tempfile.mkdtemp(prefix='bench_db_'))
+
+    print("\n" + "="*60)
+    print("BENCHMARK BASE DE DATOS")
+    print("="*60)
+    print(f"Hilos: {args.hilos} | Duración: {args.segundos}s | "
+          f"Lecturas: {args.proporcion_lecturas:.0%} | Filas iniciales: {args.filas_iniciales}")
+
+    # Esquema anterior: conexión por consulta y journal por defecto
+    ruta_anterior = directorio / 'sin_pool.sqlite'
+    _preparar(ruta_anterior, args.filas_iniciales)
+    database.cerrar_conexiones()
+    conexion = sqlite3.connect(ruta_anterior)
+    conexion.execute("PRAGMA journal_mode = DELETE")
+    conexion.close()
+    sin_pool = _ejecutar_carga(
+        lambda url: _leer_sin_pool(ruta_anterior, url),
+        lambda datos: _escribir_sin_pool(ruta_anterior, datos),
+        args.hilos, args.segundos, args.proporcion_lecturas, args.filas_iniciales
+    )
+
+    # Esquema actual: conexión por hilo + WAL
+    _preparar(directorio / 'con_pool.sqlite', args.filas_iniciales)
+    con_pool = _ejecutar_carga(
+        lambda url: database.buscar_por_url(url, 'es'),
+        database.guardar_letra,
+        args.hilos, args.segundos, args.proporcion_lecturas, args.filas_iniciales
+    )
+
+    # Escritura por lotes (una transacción por cada 100 letras)
+    inicio = time.perf_counter()
+    base = 10**8
+    for i in range(20):
+        database.guardar_letras([_datos_letra(base + i * 100 + j) for j in range(100)])
+    escrituras_lote = 2000 / (time.perf_counter() - inicio)
+    database.cerrar_conexiones()
+
+    print(f"\n{'':28}{'lecturas/s':>12}{'escrituras/s':>14}{'bloqueos':>10}")
+    for nombre, r in (("Conexión por consulta", sin_pool), ("Conexión por hilo + WAL", con_pool)):
+        print(f"{nombre:28}{r['lecturas_por_segundo']:12.0f}"
+              f"{r['escrituras_por_segundo']:14.0f}{r['errores_bloqueo']:10d}")
+    print(f"{'Escritura por lotes (100)':28}{'':12}{escrituras_lote:14.0f}")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
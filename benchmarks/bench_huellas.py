@@ -0,0 +1,127 @@
+"""
+Benchmark de las huellas acústicas (`huellas.py`) con canciones sintéticas.
+
+Registra `--canciones` canciones y luego busca variantes de cada una como
+las de una resubida (volumen, ruido, intro agregada, recorte, recompresión)
+y canciones que no están guardadas. Informa la tasa de aciertos por
+variante, los falsos positivos y el costo de huella + búsqueda por canción.
+
+Uso:
+    python -m benchmarks.bench_huellas --canciones 50 --segundos 180
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import database
+import huellas
+
+FRECUENCIA = huellas.FRECUENCIA_MUESTREO
+
+def _cancion(semilla: int, segundos: float) -> np.ndarray:
+    """Melodía y acordes con armónicos, envolventes y percusión (ruido filtrado)."""
+    aleatorio = np.random.default_rng(semilla)
+    audio = np.zeros(int(segundos * FRECUENCIA), dtype=np.float32)
+    tiempo = 0.0
+    while tiempo < segundos:
+        duracion = aleatorio.choice([0.125, 0.25, 0.5])
+        n = int(duracion * FRECUENCIA)
+        inicio = int(tiempo * FRECUENCIA)
+        t = np.arange(n) / FRECUENCIA
+        envolvente = np.exp(-t * aleatorio.uniform(2, 8)).astype(np.float32)
+        for nota in aleatorio.integers(40, 80, size=aleatorio.integers(1, 4)):
+            frecuencia = 440 * 2 ** ((nota - 69) / 12)
+            for armonico in range(1, 5):
+                audio[inicio:inicio + n] += (
+                    np.sin(2 * np.pi * frecuencia * armonico * t) * envolvente / armonico * 0.1
+                )[:len(audio) - inicio]
+        if aleatorio.random() < 0.5:
+            golpe = aleatorio.standard_normal(min(n, 800)).astype(np.float32) * 0.2
+            audio[inicio:inicio + len(golpe)] += golpe[:len(audio) - inicio]
+        tiempo += duracion
+    return audio
+
+def _recomprimir(audio: np.ndarray) -> np.ndarray:
+    """Pérdida de agudos y remuestreo a 8 kHz y vuelta (como un códec de baja calidad)."""
+    suavizado = np.convolve(audio, np.ones(4) / 4, mode='same')
+    bajo = suavizado[::2]
+    return np.interp(np.arange(len(audio)) / 2, np.arange(len(bajo)), bajo).astype(np.float32)
+
+def _variantes(audio: np.ndarray, semilla: int) -> dict:
+    aleatorio = np.random.default_rng(semilla + 10**6)
+    ruido = aleatorio.standard_normal(len(audio)).astype(np.float32)
+    potencia = np.sqrt(np.mean(audio ** 2))
+    intro = _cancion(semilla + 2 * 10**6, 7.3)
+    return {
+        'volumen x0.5': audio * 0.5,
+        'ruido 20 dB': audio + ruido * potencia * 0.1,
+        'intro 7.3 s': np.concatenate([intro, audio]),
+        'recorte 12.37 s': audio[int(12.37 * FRECUENCIA):],
+        'recompresión': _recomprimir(audio),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de huellas acústicas")
+    parser.add_argument('--canciones', type=int, default=50)
+    parser.add_argument('--segundos', type=float, default=180)
+    args = parser.parse_args()
+
+    directorio = Path(tempfile.mkdtemp(prefix='bench_huellas_'))
+    database.DB_PATH = directorio / 'lyrics.sqlite'
+    try:
+        print("\n" + "="*60)
+        print("BENCHMARK HUELLAS ACÚSTICAS")
+        print("="*60)
+        tiempos_huella = []
+        for i in range(args.canciones):
+            audio = _cancion(i, args.segundos)
+            id_transcripcion = database.guardar_transcripcion({
+                'title': f'Canción {i}', 'artist': 'Artista', 'language_src': 'es', 'text_src': 'la la',
+                'source_url': f'https://www.youtube.com/watch?v={i:011d}',
+            })
+            inicio = time.perf_counter()
+            huella = huellas.calcular_huella(audio)
+            tiempos_huella.append(time.perf_counter() - inicio)
+            huellas.registrar_huella(id_transcripcion, huella)
+        bytes_huella = database.obtener_conexion().execute(
+            "SELECT AVG(LENGTH(fingerprint)) FROM audio_fingerprints"
+        ).fetchone()[0]
+        entradas = database.obtener_conexion().execute(
+            "SELECT COUNT(*) FROM audio_fingerprint_index"
+        ).fetchone()[0]
+        print(f"{args.canciones} canciones de {args.segundos:.0f} s | huella: {bytes_huella / 1024:.1f} KB, "
+              f"{entradas / args.canciones:.0f} entradas de índice por canción")
+        print(f"Costo de la huella: {1000 * np.median(tiempos_huella):.1f} ms por canción "
+              f"({args.segundos / np.median(tiempos_huella):.0f}x tiempo real)")
+
+        aciertos = {}
+        costos = []
+        for i in range(args.canciones):
+            for nombre, variante in _variantes(_cancion(i, args.segundos), i).items():
+                inicio = time.perf_counter()
+                _, duplicado = huellas.identificar_audio(variante)
+                costos.append(time.perf_counter() - inicio)
+                correcto = duplicado is not None and duplicado['transcription_id'] == i + 1
+                aciertos.setdefault(nombre, []).append(correcto)
+
+        falsos = 0
+        for i in range(args.canciones):
+            _, duplicado = huellas.identificar_audio(_cancion(10**5 + i, args.segundos))
+            falsos += duplicado is not None
+
+        print(f"\n{'variante':20}{'aciertos':>10}")
+        for nombre, resultados in aciertos.items():
+            print(f"{nombre:20}{100 * np.mean(resultados):9.0f}%")
+        print(f"{'canciones nuevas':20}{falsos:>6} falsos positivos de {args.canciones}")
+        print(f"\nHuella + búsqueda: {1000 * np.median(costos):.1f} ms por canción (mediana)")
+        print("="*60 + "\n")
+    finally:
+        database.cerrar_conexiones()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
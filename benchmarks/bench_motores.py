@@ -0,0 +1,89 @@
+"""
+Benchmark de motores de transcripción: factor de tiempo real (RTF) y memoria pico.
+
+Cada motor corre en un subproceso propio para que la memoria pico (RSS) de
+uno no contamine la medición del otro.
+
+Uso:
+    python -m benchmarks.bench_motores audio/sample.wav --modelo small
+    python -m benchmarks.bench_motores audio/sample.wav --motores openai faster
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+def _medir(motor: str, modelo: str, ruta_audio: str) -> dict:
+    """Cargar un motor, transcribir el audio y devolver tiempos y memoria."""
+    from downloader import decodificar_pcm, FRECUENCIA_MUESTREO
+    from transcriber.motores import crear_motor
+
+    audio = decodificar_pcm(ruta_audio)
+    duracion_audio = len(audio) / FRECUENCIA_MUESTREO
+
+    inicio = time.perf_counter()
+    instancia = crear_motor(modelo, motor)
+    carga = time.perf_counter() - inicio
+
+    # Calentamiento con un segundo de audio
+    instancia.transcribir(audio[:FRECUENCIA_MUESTREO])
+
+    inicio = time.perf_counter()
+    resultado = instancia.transcribir(audio)
+    inferencia = time.perf_counter() - inicio
+
+    return {
+        'motor': motor,
+        'modelo': modelo,
+        'duracion_audio': duracion_audio,
+        'carga_s': carga,
+        'inferencia_s': inferencia,
+        'rtf': inferencia / duracion_audio,
+        # ru_maxrss está en KB en Linux
+        'rss_pico_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'idioma': resultado['language'],
+        'caracteres': len(resultado['text']),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de motores de transcripción")
+    parser.add_argument('audio', help="Archivo WAV de prueba")
+    parser.add_argument('--modelo', default='small', help="Tamaño del modelo (tiny, base, small...)")
+    parser.add_argument('--motores', nargs='+', default=['openai', 'faster'],
+                        help="Motores a comparar (nombre registrado o modulo:Clase)")
+    parser.add_argument('--interno', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(_medir(args.interno, args.modelo, args.audio)))
+        return
+
+    print("\n" + "="*60)
+    print("BENCHMARK MOTORES DE TRANSCRIPCIÓN")
+    print("="*60)
+    print(f"Audio: {args.audio} | Modelo: {args.modelo}")
+
+    resultados = []
+    for motor in args.motores:
+        proceso = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_motores', args.audio,
+             '--modelo', args.modelo, '--interno', motor],
+            capture_output=True, text=True
+        )
+        if proceso.returncode != 0:
+            print(f"\n{motor}: ERROR\n{proceso.stderr.strip()[-500:]}")
+            continue
+        resultados.append(json.loads(proceso.stdout.strip().splitlines()[-1]))
+
+    if resultados:
+        print(f"\nDuración del audio: {resultados[0]['duracion_audio']:.1f}s")
+        print(f"\n{'motor':16}{'carga s':>10}{'inferencia s':>14}{'RTF':>8}{'RSS pico MB':>14}")
+        for r in resultados:
+            print(f"{r['motor'][:16]:16}{r['carga_s']:10.2f}{r['inferencia_s']:14.2f}"
+                  f"{r['rtf']:8.3f}{r['rss_pico_mb']:14.0f}")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Benchmark de extremo a extremo del pipeline sin salir de la máquina.
+
+Todo lo externo se reemplaza por equivalentes locales:
+
+- Videos: archivos de audio sintéticos servidos por HTTP en 127.0.0.1; yt-dlp
+  los resuelve con su extractor genérico (sondeo, descarga y ffmpeg reales)
+- LibreTranslate: `benchmarks/libretranslate_local.py`, con latencia configurable
+- Whisper: `benchmarks/motor_simulado.py` (CPU proporcional a la duración) o
+  un modelo real pequeño con `--motor openai --modelo tiny`
+
+Las canciones se procesan con `procesar_cancion` a una concurrencia fija
+(cada trabajador toma la siguiente al terminar). Informa latencia p50/p95/p99,
+canciones por minuto, segundos de audio por segundo, memoria pico y el tiempo
+medio por etapa, y guarda todo en JSON para comparar entre commits.
+
+Uso:
+    python -m benchmarks.bench_pipeline --canciones 40 --concurrencia 4 --salida base.json
+    python -m benchmarks.bench_pipeline --canciones 40 --concurrencia 4 --comparar base.json
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+FRECUENCIA_MUESTREO = 16000
+
+class _ManejadorSilencioso(SimpleHTTPRequestHandler):
+    def copyfile(self, origen, destino):
+        # yt-dlp y ffmpeg cortan la conexión apenas leen lo que necesitan
+        try:
+            super().copyfile(origen, destino)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+def iniciar_fuente_local(directorio: Path) -> ThreadingHTTPServer:
+    """Servir `directorio` por HTTP en un puerto libre (hilo de fondo)."""
+    manejador = functools.partial(_ManejadorSilencioso, directory=str(directorio))
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+def _escribir_cancion(ruta: Path, semilla: int, segundos: float):
+    """WAV 16 kHz mono: notas con vibrato y pausas (el VAD de energía las toma como voz)."""
+    aleatorio = np.random.default_rng(semilla)
+    t = np.arange(int(segundos * FRECUENCIA_MUESTREO)) / FRECUENCIA_MUESTREO
+    frecuencias = aleatorio.uniform(200, 800, size=int(segundos) + 1)[t.astype(int)]
+    fase = 2 * np.pi * np.cumsum(frecuencias * (1 + 0.01 * np.sin(2 * np.pi * 5 * t))) / FRECUENCIA_MUESTREO
+    silabas = (np.sin(2 * np.pi * 3 * t) > -0.3).astype(np.float32)
+    audio = 0.3 * np.sin(fase) * silabas + 0.01 * aleatorio.standard_normal(len(t))
+    with wave.open(str(ruta), 'wb') as archivo:
+        archivo.setnchannels(1)
+        archivo.setsampwidth(2)
+        archivo.setframerate(FRECUENCIA_MUESTREO)
+        archivo.writeframes((np.clip(audio, -1, 1) * 32767).astype('<i2').tobytes())
+
+def _percentiles(valores: List[float]) -> Dict[str, float]:
+    if not valores:
+        return {}
+    p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+    return {
+        'p50': round(float(p50), 3), 'p95': round(float(p95), 3), 'p99': round(float(p99), 3),
+        'max': round(max(valores), 3), 'promedio': round(float(np.mean(valores)), 3),
+    }
+
+def _commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+async def _ejecutar(urls: List[str], idiomas: List[str], concurrencia: int) -> Dict[str, Any]:
+    """Procesar (url, idioma) con `concurrencia` trabajadores y medir cada canción."""
+    import database
+    from ejecutores import cerrar_ejecutores
+    from pipeline import preparar_transcripcion, estado_preparacion, procesar_cancion
+
+    database.inicializar_base_datos()
+    inicio = time.perf_counter()
+    await preparar_transcripcion()
+    preparacion = time.perf_counter() - inicio
+    if estado_preparacion()['error']:
+        raise Exception(f"No se pudo preparar Whisper: {estado_preparacion()['error']}")
+
+    pendientes: asyncio.Queue = asyncio.Queue()
+    for url in urls:
+        for idioma in idiomas:
+            pendientes.put_nowait((url, idioma))
+    latencias: List[float] = []
+    errores: List[str] = []
+
+    async def trabajador():
+        while not pendientes.empty():
+            url, idioma = pendientes.get_nowait()
+            inicio_cancion = time.perf_counter()
+            try:
+                await procesar_cancion(url, idioma)
+                latencias.append(time.perf_counter() - inicio_cancion)
+            except Exception as e:
+                errores.append(f"{url} ({idioma}): {e}")
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+    # Los procesos de Whisper terminan aquí: su RSS pico entra en RUSAGE_CHILDREN
+    cerrar_ejecutores()
+    database.cerrar_conexiones()
+    return {'latencias': latencias, 'errores': errores, 'duracion': duracion, 'preparacion': preparacion}
+
+def _comparar(anterior: Dict[str, Any], actual: Dict[str, Any]):
+    """Imprimir las diferencias con un resultado guardado."""
+    filas = [
+        ('latencia p50 (s)', ('latencia', 'p50')),
+        ('latencia p95 (s)', ('latencia', 'p95')),
+        ('latencia p99 (s)', ('latencia', 'p99')),
+        ('canciones/min', ('canciones_por_minuto',)),
+        ('audio s/s', ('segundos_audio_por_segundo',)),
+        ('RSS principal (MB)', ('memoria_pico_mb', 'principal')),
+        ('RSS hijo máx (MB)', ('memoria_pico_mb', 'hijo_maximo')),
+    ]
+    print(f"\nComparación con {anterior.get('commit') or 'anterior'}:")
+    print(f"{'':22}{'anterior':>12}{'actual':>12}{'cambio':>10}")
+    for nombre, camino in filas:
+        a, b = anterior['resultados'], actual['resultados']
+        for clave in camino:
+            a, b = (a or {}).get(clave), (b or {}).get(clave)
+        if a is None or b is None:
+            continue
+        cambio = f"{100 * (b - a) / a:+.1f}%" if a else '-'
+        print(f"{nombre:22}{a:12.3f}{b:12.3f}{cambio:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extremo a extremo sin red externa")
+    parser.add_argument('--canciones', type=int, default=20)
+    parser.add_argument('--segundos', type=float, default=180, help="Duración de cada canción")
+    parser.add_argument('--concurrencia', type=int, default=4, help="Canciones procesándose a la vez")
+    parser.add_argument('--idiomas', default='es', help="Idiomas destino por canción (es,pt...)")
+    parser.add_argument('--motor', default='benchmarks.motor_simulado:MotorSimulado',
+                        help="WHISPER_BACKEND (openai, faster o modulo:Clase)")
+    parser.add_argument('--modelo', default='tiny', help="WHISPER_MODEL")
+    parser.add_argument('--factor-tiempo-real', type=float, default=0.05,
+                        help="Segundos de CPU por segundo de audio del motor simulado")
+    parser.add_argument('--latencia-traduccion-ms', type=float, default=50)
+    parser.add_argument('--salida', help="Guardar los resultados en este JSON")
+    parser.add_argument('--comparar', help="JSON de una ejecución anterior")
+    args = parser.parse_args()
+
+    directorio = Path(tempfile.mkdtemp(prefix='bench_pipeline_'))
+    (directorio / 'audio').mkdir()
+    for i in range(args.canciones):
+        _escribir_cancion(directorio / 'audio' / f'cancion_{i:04d}.wav', i, args.segundos)
+
+    from benchmarks.libretranslate_local import iniciar_servidor
+    traductor = iniciar_servidor(args.latencia_traduccion_ms)
+    fuente = iniciar_fuente_local(directorio / 'audio')
+    host, puerto = fuente.server_address[:2]
+
+    # La configuración se lee al importar los módulos del pipeline
+    os.environ.update({
+        'WHISPER_BACKEND': args.motor,
+        'WHISPER_MODEL': args.modelo,
+        'BENCH_FACTOR_TIEMPO_REAL': str(args.factor_tiempo_real),
+        'LIBRETRANSLATE_URL': traductor.url,
+        'TRAZAS_LOG': '0',
+    })
+    import database
+    database.DB_PATH = directorio / 'lyrics.sqlite'
+    from ejecutores import MAX_TRANSCRIPCIONES, MODO_TRANSCRIPCION
+    from metricas import ETAPA_SEGUNDOS, CACHE_CONSULTAS
+
+    urls = [f"http://{host}:{puerto}/cancion_{i:04d}.wav" for i in range(args.canciones)]
+    idiomas = args.idiomas.split(',')
+    try:
+        print("\n" + "="*60)
+        print("BENCHMARK PIPELINE (LOCAL)")
+        print("="*60)
+        print(f"{args.canciones} canciones de {args.segundos:.0f} s × {len(idiomas)} idioma(s) | "
+              f"concurrencia {args.concurrencia} | motor {args.motor} ({args.modelo})")
+        medicion = asyncio.run(_ejecutar(urls, idiomas, args.concurrencia))
+    finally:
+        traductor.shutdown()
+        fuente.shutdown()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    latencias = medicion['latencias']
+    resultados = {
+        'completadas': len(latencias),
+        'errores': len(medicion['errores']),
+        'duracion_segundos': round(medicion['duracion'], 3),
+        'preparacion_segundos': round(medicion['preparacion'], 3),
+        'latencia': _percentiles(latencias),
+        'canciones_por_minuto': round(60 * len(latencias) / medicion['duracion'], 2),
+        'segundos_audio_por_segundo': round(args.canciones * args.segundos / medicion['duracion'], 2),
+        'memoria_pico_mb': {
+            # ru_maxrss en KB (Linux); en hijos es el máximo de un solo proceso
+            'principal': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'hijo_maximo': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        },
+        'etapas': {
+            etapa: {'cantidad': datos['cantidad'], 'promedio_segundos': round(datos['promedio'], 4)}
+            for etapa, datos in sorted(ETAPA_SEGUNDOS.resumen().items())
+        },
+        'caches': {
+            clave: int(valor) for clave, valor in sorted(CACHE_CONSULTAS.resumen().items())
+        },
+    }
+    informe = {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _commit_actual(),
+        'python': sys.version.split()[0],
+        'configuracion': {
+            **vars(args),
+            'procesos_whisper': MAX_TRANSCRIPCIONES,
+            'modo_transcripcion': MODO_TRANSCRIPCION,
+            'nucleos': os.cpu_count(),
+        },
+        'resultados': resultados,
+    }
+
+    print(f"\nCompletadas: {resultados['completadas']} | errores: {resultados['errores']} | "
+          f"preparación de Whisper: {resultados['preparacion_segundos']:.1f} s")
+    for error in medicion['errores'][:5]:
+        print(f"  ✗ {error}")
+    latencia = resultados['latencia']
+    if latencia:
+        print(f"Latencia (s): p50 {latencia['p50']:.2f} | p95 {latencia['p95']:.2f} | "
+              f"p99 {latencia['p99']:.2f} | máx {latencia['max']:.2f}")
+    print(f"Rendimiento: {resultados['canciones_por_minuto']:.1f} canciones/min | "
+          f"{resultados['segundos_audio_por_segundo']:.1f} s de audio por segundo")
+    print(f"Memoria pico: principal {resultados['memoria_pico_mb']['principal']:.0f} MB | "
+          f"proceso Whisper {resultados['memoria_pico_mb']['hijo_maximo']:.0f} MB")
+    print(f"\n{'etapa':16}{'cantidad':>10}{'promedio s':>12}")
+    for etapa, datos in resultados['etapas'].items():
+        print(f"{etapa:16}{datos['cantidad']:10}{datos['promedio_segundos']:12.3f}")
+
+    if args.comparar:
+        _comparar(json.loads(Path(args.comparar).read_text()), informe)
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+        print(f"\nResultados en {args.salida}")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
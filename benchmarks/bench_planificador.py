@@ -0,0 +1,77 @@
+"""
+Benchmark del planificador de lotes de Whisper frente a una llamada a
+`modelo.transcribe` por petición.
+
+Simula N peticiones simultáneas con el mismo audio y mide trabajos por
+segundo y segundos de audio transcritos por segundo.
+
+Uso:
+    python -m benchmarks.bench_planificador audio/sample.wav --trabajos 8 --lote 8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import whisper
+
+from transcriber.planificador import PlanificadorLotes
+from transcriber.whisper_transcriber import cargar_modelo
+
+def _medir_por_peticion(modelo, audio, trabajos: int, hilos: int) -> float:
+    """Una llamada a `modelo.transcribe` por trabajo, con `hilos` en paralelo."""
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        list(ejecutor.map(
+            lambda _: modelo.transcribe(audio, fp16=False, language=None, task='transcribe'),
+            range(trabajos)
+        ))
+    return time.perf_counter() - inicio
+
+def _medir_planificador(modelo, audio, trabajos: int, lote: int, espera_ms: int) -> tuple:
+    """Todos los trabajos enviados a la vez al planificador de lotes."""
+    planificador = PlanificadorLotes(modelo, lote_maximo=lote, espera_maxima_ms=espera_ms)
+    inicio = time.perf_counter()
+    futuros = [planificador.enviar(audio) for _ in range(trabajos)]
+    for futuro in futuros:
+        futuro.result()
+    duracion = time.perf_counter() - inicio
+    estadisticas = planificador.estadisticas()
+    planificador.cerrar()
+    return duracion, estadisticas
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del planificador de lotes de Whisper")
+    parser.add_argument('audio', help="Archivo de audio de prueba")
+    parser.add_argument('--trabajos', type=int, default=8, help="Peticiones simultáneas")
+    parser.add_argument('--hilos', type=int, default=1,
+                        help="Llamadas a transcribe en paralelo (comportamiento actual: 1 por proceso)")
+    parser.add_argument('--lote', type=int, default=8, help="WHISPER_LOTE_MAXIMO")
+    parser.add_argument('--espera-ms', type=int, default=100, help="WHISPER_ESPERA_MAXIMA_MS")
+    args = parser.parse_args()
+
+    audio = whisper.load_audio(args.audio)
+    segundos_audio = len(audio) / whisper.audio.SAMPLE_RATE * args.trabajos
+    modelo = cargar_modelo().modelo
+
+    print("\n" + "="*60)
+    print("BENCHMARK PLANIFICADOR DE LOTES")
+    print("="*60)
+    print(f"Audio: {args.audio} ({len(audio) / whisper.audio.SAMPLE_RATE:.1f}s) | "
+          f"Trabajos: {args.trabajos} | Lote: {args.lote} | Espera: {args.espera_ms} ms")
+
+    # Calentar el modelo para no medir la primera inicialización
+    modelo.transcribe(audio[:whisper.audio.SAMPLE_RATE], fp16=False)
+
+    por_peticion = _medir_por_peticion(modelo, audio, args.trabajos, args.hilos)
+    en_lotes, estadisticas = _medir_planificador(modelo, audio, args.trabajos, args.lote, args.espera_ms)
+
+    print(f"\n{'':24}{'segundos':>10}{'trabajos/s':>12}{'audio s/s':>12}")
+    for nombre, duracion in (("Una llamada por trabajo", por_peticion), ("Planificador de lotes", en_lotes)):
+        print(f"{nombre:24}{duracion:10.2f}{args.trabajos / duracion:12.3f}"
+              f"{segundos_audio / duracion:12.2f}")
+    print(f"\nLotes: {estadisticas['lotes']} | Tamaño medio de lote: {estadisticas['lote_medio']}")
+    print(f"Aceleración: {por_peticion / en_lotes:.2f}x")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark del cliente de LibreTranslate contra un servidor local.
+
+Compara el esquema anterior (un `requests.post` por fragmento de 5000
+caracteres, en serie y con conexión nueva) con `ClienteLibreTranslate`
+(sesión keep-alive, fragmentos por línea en paralelo), y mide cuánto tarda
+en fallar cada uno contra un servidor que no responde.
+
+Uso:
+    python -m benchmarks.bench_traduccion --caracteres 40000 --latencia-ms 200
+"""
+import argparse
+import socket
+import time
+
+import requests
+
+from benchmarks.libretranslate_local import iniciar_servidor
+from translator import ClienteLibreTranslate
+
+def _traducir_en_serie(url: str, texto: str, max_caracteres: int, timeout: float) -> str:
+    """Esquema anterior: cortes por carácter, una conexión nueva por fragmento."""
+    fragmentos = [texto[i:i + max_caracteres] for i in range(0, len(texto), max_caracteres)]
+    traducciones = []
+    for fragmento in fragmentos:
+        respuesta = requests.post(
+            f"{url}/translate",
+            json={"q": fragmento, "source": "en", "target": "es", "format": "text", "api_key": ""},
+            headers={"Content-Type": "application/json", "Connection": "close"},
+            timeout=timeout
+        )
+        traducciones.append(respuesta.json()['translatedText'])
+    return " ".join(traducciones)
+
+def _letra_sintetica(caracteres: int) -> str:
+    """Versos de largo variable hasta juntar `caracteres`."""
+    versos = []
+    total = 0
+    i = 0
+    while total < caracteres:
+        verso = f"verso {i} " + "la la " * (3 + i % 7)
+        versos.append(verso.strip())
+        total += len(verso)
+        i += 1
+    return "\n".join(versos)
+
+def _medir_caido(funcion, intentos: int) -> float:
+    """Segundos totales de `intentos` traducciones que fallan."""
+    inicio = time.perf_counter()
+    for _ in range(intentos):
+        try:
+            funcion()
+        except Exception:
+            pass
+    return time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cliente de LibreTranslate")
+    parser.add_argument('--caracteres', type=int, default=40000, help="Largo del texto a traducir")
+    parser.add_argument('--latencia-ms', type=float, default=200, help="Latencia simulada por petición")
+    parser.add_argument('--max-caracteres', type=int, default=5000, help="LIBRETRANSLATE_MAX_CARACTERES")
+    parser.add_argument('--concurrencia', type=int, default=4, help="LIBRETRANSLATE_CONCURRENCIA")
+    parser.add_argument('--timeout', type=float, default=2, help="Timeout para la prueba de servidor caído")
+    args = parser.parse_args()
+
+    texto = _letra_sintetica(args.caracteres)
+    servidor = iniciar_servidor(args.latencia_ms)
+
+    print("\n" + "="*60)
+    print("BENCHMARK CLIENTE LIBRETRANSLATE")
+    print("="*60)
+    print(f"Texto: {len(texto)} caracteres, {texto.count(chr(10)) + 1} líneas | "
+          f"Latencia: {args.latencia_ms:.0f} ms | Concurrencia: {args.concurrencia}")
+
+    inicio = time.perf_counter()
+    en_serie = _traducir_en_serie(servidor.url, texto, args.max_caracteres, 30)
+    duracion_serie = time.perf_counter() - inicio
+    conexiones_serie = len(servidor.conexiones)
+
+    servidor.conexiones.clear()
+    cliente = ClienteLibreTranslate(servidor.url, args.concurrencia, args.max_caracteres)
+    inicio = time.perf_counter()
+    en_paralelo = cliente.traducir(texto, 'en', 'es')
+    duracion_paralelo = time.perf_counter() - inicio
+    conexiones_paralelo = len(servidor.conexiones)
+
+    print(f"\n{'':28}{'segundos':>10}{'conexiones':>12}{'líneas ok':>11}")
+    print(f"{'En serie (anterior)':28}{duracion_serie:10.2f}{conexiones_serie:12}"
+          f"{str(en_serie == texto.upper()):>11}")
+    print(f"{'Sesión + paralelo':28}{duracion_paralelo:10.2f}{conexiones_paralelo:12}"
+          f"{str(en_paralelo == texto.upper()):>11}")
+    print(f"Aceleración: {duracion_serie / duracion_paralelo:.2f}x")
+    servidor.shutdown()
+
+    # Servidor caído: acepta conexiones pero nunca responde
+    agujero = socket.socket()
+    agujero.bind(('127.0.0.1', 0))
+    agujero.listen(64)
+    url_caida = f"http://127.0.0.1:{agujero.getsockname()[1]}"
+    intentos = 5
+
+    caido_serie = _medir_caido(
+        lambda: _traducir_en_serie(url_caida, texto[:1000], args.max_caracteres, args.timeout), intentos
+    )
+    cliente = ClienteLibreTranslate(url_caida, args.concurrencia, args.max_caracteres)
+    cliente.timeout = (args.timeout, args.timeout)
+    cliente.sesion.adapters['http://'].max_retries.total = 0
+    caido_circuito = _medir_caido(lambda: cliente.traducir(texto[:1000], 'en', 'es'), intentos)
+    agujero.close()
+
+    print(f"\nServidor caído ({intentos} traducciones, timeout {args.timeout:.0f}s):")
+    print(f"  En serie:            {caido_serie:6.2f}s")
+    print(f"  Con circuito:        {caido_circuito:6.2f}s  (estado: {cliente.circuito.estado})")
+    print("="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
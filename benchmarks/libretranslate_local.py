@@ -0,0 +1,115 @@
+"""
+Servidor local que imita la API `/translate` de LibreTranslate.
+
+Sirve para probar y medir el cliente de `translator.py` sin depender de un
+servicio público: "traduce" pasando el texto a mayúsculas, con latencia
+configurable y fallos simulados.
+
+Uso:
+    python -m benchmarks.libretranslate_local --puerto 5000 --latencia-ms 200
+    LIBRETRANSLATE_URL=http://127.0.0.1:5000 python app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+def _codigo_idioma_valido(codigo: str) -> bool:
+    """Los códigos de idioma son de dos letras (como en LibreTranslate)."""
+    return len(codigo) == 2 and codigo.isalpha()
+
+class _Manejador(BaseHTTPRequestHandler):
+    """Atiende POST /translate como LibreTranslate."""
+
+    def do_POST(self):
+        servidor = self.server
+        with servidor.bloqueo:
+            servidor.peticiones += 1
+            servidor.conexiones.add(self.client_address)
+            fallar = servidor.fallos_pendientes > 0
+            if fallar:
+                servidor.fallos_pendientes -= 1
+
+            servidor.en_curso += 1
+            servidor.max_en_curso = max(servidor.max_en_curso, servidor.en_curso)
+
+        largo = int(self.headers.get('Content-Length', 0))
+        datos = json.loads(self.rfile.read(largo) or b'{}')
+        time.sleep(servidor.latencia)
+        with servidor.bloqueo:
+            servidor.en_curso -= 1
+
+        if self.path != '/translate':
+            self._responder(404, {'error': 'Not Found'})
+        elif fallar:
+            self._responder(503, {'error': 'Servicio no disponible (simulado)'})
+        elif not _codigo_idioma_valido(datos.get('target', '')):
+            self._responder(400, {'error': f"{datos.get('target')} is not supported"})
+        else:
+            self._responder(200, {'translatedText': datos.get('q', '').upper()})
+
+    def _responder(self, estado: int, cuerpo: dict):
+        contenido = json.dumps(cuerpo).encode()
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def log_message(self, *args):
+        pass
+
+class ServidorLibreTranslate(ThreadingHTTPServer):
+    """Servidor HTTP con contadores de peticiones, conexiones distintas y peticiones simultáneas."""
+
+    daemon_threads = True
+    # HTTP/1.1 para que el cliente pueda reutilizar la conexión
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, direccion: Tuple[str, int], latencia_ms: float = 0, fallos: int = 0):
+        _Manejador.protocol_version = self.protocol_version
+        super().__init__(direccion, _Manejador)
+        self.latencia = latencia_ms / 1000
+        self.fallos_pendientes = fallos
+        self.peticiones = 0
+        self.conexiones = set()
+        self.en_curso = 0
+        # Máximo de peticiones atendidas a la vez (comprueba el límite de concurrencia del cliente)
+        self.max_en_curso = 0
+        self.bloqueo = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+def iniciar_servidor(latencia_ms: float = 0, fallos: int = 0, puerto: int = 0) -> ServidorLibreTranslate:
+    """
+    Arrancar el servidor en un hilo de fondo.
+
+    Args:
+        latencia_ms: Demora de cada respuesta
+        fallos: Cantidad de respuestas 503 a devolver antes de responder bien
+        puerto: Puerto (0 = uno libre)
+
+    Returns:
+        Servidor en marcha (`servidor.url`, `servidor.shutdown()`)
+    """
+    servidor = ServidorLibreTranslate(('127.0.0.1', puerto), latencia_ms, fallos)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor LibreTranslate de prueba")
+    parser.add_argument('--puerto', type=int, default=5000)
+    parser.add_argument('--latencia-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    servidor = ServidorLibreTranslate(('127.0.0.1', args.puerto), args.latencia_ms)
+    print(f"LibreTranslate local en {servidor.url}")
+    servidor.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,67 @@
 """
 Módulo de base de datos SQLite para almacenar letras y metadatos.
+
+Cada hilo reutiliza su propia conexión (modo WAL, pragmas ajustados y cache de
+sentencias preparadas) en lugar de abrir una conexión por consulta.
 """
+import os
+import re
 import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+
+from urls import clave_video
 
 DB_PATH = Path(__file__).parent / "data" / "lyrics.sqlite"
 
-def inicializar_base_datos():
-    """Crear tabla de letras si no existe."""
-    # Asegurar que el directorio data/ existe
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    
-    conexion = sqlite3.connect(DB_PATH)
-    cursor = conexion.cursor()
+# Ajustes de SQLite (configurables con variables de entorno)
+SQLITE_CACHE_KB = int(os.getenv('SQLITE_CACHE_KB', '16384'))
+SQLITE_MMAP_MB = int(os.getenv('SQLITE_MMAP_MB', '256'))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_SENTENCIAS_CACHEADAS = 256
+
+# Líneas máximas en la memoria de traducción; al superarlas se borran las menos usadas
+MEMORIA_TRADUCCION_MAX_LINEAS = int(os.getenv('MEMORIA_TRADUCCION_MAX_LINEAS', '200000'))
+# Los usos de la memoria (hits, last_used) se acumulan y se escriben juntos al
+# llegar a esta cantidad de líneas distintas o pasado este tiempo
+MEMORIA_USOS_LOTE = int(os.getenv('MEMORIA_USOS_LOTE', '1000'))
+MEMORIA_USOS_SEGUNDOS = float(os.getenv('MEMORIA_USOS_SEGUNDOS', '30'))
+# Parámetros por consulta IN (...) (SQLite admite 999 en versiones antiguas)
+LOTE_PARAMETROS = 500
+# Peso de cada columna de `transcriptions_fts` en el ranking (bm25)
+PESOS_BUSQUEDA = (10.0, 5.0, 1.0)  # title, artist, text_src
+# Si todas las palabras buscadas aparecen en más documentos que esto, no se
+# ordena por relevancia (habría que puntuar casi todo el índice) sino por más recientes
+BUSQUEDA_MAX_DOCUMENTOS = int(os.getenv('BUSQUEDA_MAX_DOCUMENTOS', '100000'))
+
+# Una conexión por hilo; la lista permite cerrarlas todas al apagar
+_local = threading.local()
+_conexiones: List[sqlite3.Connection] = []
+_bloqueo = threading.Lock()
+_ruta_inicializada: Optional[Path] = None
+
+# Memoria de traducción: usos pendientes de escribir, (línea, origen, destino) →
+# [hits, last_used], y cota superior de las líneas guardadas (None = sin contar aún)
+_usos_memoria: Dict[Tuple[str, str, str], List[float]] = {}
+_ultimo_volcado_usos = time.monotonic()
+_lineas_memoria: Optional[int] = None
+_bloqueo_memoria = threading.Lock()
+
+def _migrar_a_transcripciones_y_traducciones(cursor: sqlite3.Cursor):
+    """
+    Migración 1: separar `lyrics` en `transcriptions` (una por URL) y
+    `translations` (una por transcripción e idioma destino).
     
+    Las filas existentes de `lyrics` se copian conservando su id y la tabla
+    se reemplaza por una vista con las mismas columnas.
+    """
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS lyrics (
+        CREATE TABLE transcriptions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             title TEXT NOT NULL,
             artist TEXT NOT NULL,
@@ -25,34 +69,376 @@ def inicializar_base_datos():
             year INTEGER,
             source_url TEXT NOT NULL UNIQUE,
             language_src TEXT NOT NULL,
-            language_dst TEXT NOT NULL,
             text_src TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE translations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transcription_id INTEGER NOT NULL REFERENCES transcriptions(id) ON DELETE CASCADE,
+            language_dst TEXT NOT NULL,
             text_dst TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (transcription_id, language_dst)
+        )
+    """)
+    
+    tabla_antigua = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lyrics'"
+    ).fetchone()
+    if tabla_antigua:
+        cursor.execute("""
+            INSERT INTO transcriptions (id, title, artist, album, year, source_url,
+                                        language_src, text_src, created_at)
+            SELECT id, title, artist, album, year, source_url,
+                   language_src, text_src, created_at
+            FROM lyrics
+        """)
+        cursor.execute("""
+            INSERT INTO translations (transcription_id, language_dst, text_dst, created_at)
+            SELECT id, language_dst, text_dst, created_at FROM lyrics
+        """)
+        cursor.execute("DROP TABLE lyrics")
+    
+    # Vista compatible con el formato anterior: una fila por traducción
+    cursor.execute("""
+        CREATE VIEW lyrics AS
+        SELECT t.id AS id, t.title, t.artist, t.album, t.year, t.source_url,
+               t.language_src, tr.language_dst, t.text_src, tr.text_dst,
+               tr.created_at AS created_at
+        FROM transcriptions t
+        JOIN translations tr ON tr.transcription_id = t.id
+    """)
+
+def _migrar_clave_video(cursor: sqlite3.Cursor):
+    """
+    Migración 2: columna `video_key` (extractor:id) indexada, para que enlaces
+    equivalentes (youtu.be, móvil, con tiempo...) encuentren la misma transcripción.
+    """
+    cursor.execute("ALTER TABLE transcriptions ADD COLUMN video_key TEXT")
+    cursor.connection.create_function("clave_video", 1, clave_video, deterministic=True)
+    cursor.execute("UPDATE transcriptions SET video_key = clave_video(source_url)")
+    cursor.execute(
+        "CREATE INDEX idx_transcriptions_video_key ON transcriptions(video_key)"
+    )
+    
+    cursor.execute("DROP VIEW lyrics")
+    cursor.execute("""
+        CREATE VIEW lyrics AS
+        SELECT t.id AS id, t.title, t.artist, t.album, t.year, t.source_url,
+               t.language_src, tr.language_dst, t.text_src, tr.text_dst,
+               tr.created_at AS created_at, t.video_key
+        FROM transcriptions t
+        JOIN translations tr ON tr.transcription_id = t.id
+    """)
+
+def _migrar_modelo_trabajos(cursor: sqlite3.Cursor):
+    """Migración 3: modelo Whisper elegido por trabajo (NULL = WHISPER_MODEL)."""
+    cursor.execute("ALTER TABLE jobs ADD COLUMN model TEXT")
+
+def _migrar_memoria_traduccion(cursor: sqlite3.Cursor):
+    """
+    Migración 4: memoria de traducción por línea, clave (línea normalizada,
+    idioma origen, idioma destino). `last_used` ordena el desalojo.
+    """
+    cursor.execute("""
+        CREATE TABLE translation_memory (
+            line_src TEXT NOT NULL,
+            language_src TEXT NOT NULL,
+            language_dst TEXT NOT NULL,
+            line_dst TEXT NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (line_src, language_src, language_dst)
+        )
+    """)
+    cursor.execute("CREATE INDEX idx_translation_memory_last_used ON translation_memory(last_used)")
+
+def _migrar_lotes(cursor: sqlite3.Cursor):
+    """Migración 5: lotes de ingesta masiva (playlists, listas de URLs) y su relación con `jobs`."""
+    cursor.execute("""
+        CREATE TABLE batches (
+            id TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            target_lang TEXT NOT NULL,
+            model TEXT,
+            total INTEGER NOT NULL,
+            skipped INTEGER NOT NULL DEFAULT 0,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    cursor.execute("ALTER TABLE jobs ADD COLUMN batch_id TEXT REFERENCES batches(id)")
+    cursor.execute("CREATE INDEX idx_jobs_batch_id ON jobs(batch_id)")
+
+def _migrar_tiempos(cursor: sqlite3.Cursor):
+    """
+    Migración 6: tiempos por línea (`segments`) y por palabra (`words`) de cada
+    transcripción, codificados en binario (ver `subtitulos.py`).
+    """
+    cursor.execute("ALTER TABLE transcriptions ADD COLUMN segments BLOB")
+    cursor.execute("ALTER TABLE transcriptions ADD COLUMN words BLOB")
+
+def _migrar_busqueda(cursor: sqlite3.Cursor):
+    """
+    Migración 7: índices FTS5 sobre título, artista y letra original
+    (`transcriptions_fts`) y sobre las traducciones (`translations_fts`).
     
-    conexion.commit()
-    conexion.close()
+    Son tablas de contenido externo (no duplican el texto) y se mantienen
+    al día con triggers; las filas existentes se indexan con 'rebuild'.
+    """
+    # remove_diacritics: "corazon" encuentra "corazón"
+    cursor.execute("""
+        CREATE VIRTUAL TABLE transcriptions_fts USING fts5(
+            title, artist, text_src,
+            content='transcriptions', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    cursor.execute("""
+        CREATE VIRTUAL TABLE translations_fts USING fts5(
+            text_dst,
+            content='translations', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER transcriptions_fts_insert AFTER INSERT ON transcriptions BEGIN
+            INSERT INTO transcriptions_fts (rowid, title, artist, text_src)
+            VALUES (new.id, new.title, new.artist, new.text_src);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER transcriptions_fts_delete AFTER DELETE ON transcriptions BEGIN
+            INSERT INTO transcriptions_fts (transcriptions_fts, rowid, title, artist, text_src)
+            VALUES ('delete', old.id, old.title, old.artist, old.text_src);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER transcriptions_fts_update
+        AFTER UPDATE OF title, artist, text_src ON transcriptions BEGIN
+            INSERT INTO transcriptions_fts (transcriptions_fts, rowid, title, artist, text_src)
+            VALUES ('delete', old.id, old.title, old.artist, old.text_src);
+            INSERT INTO transcriptions_fts (rowid, title, artist, text_src)
+            VALUES (new.id, new.title, new.artist, new.text_src);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER translations_fts_insert AFTER INSERT ON translations BEGIN
+            INSERT INTO translations_fts (rowid, text_dst) VALUES (new.id, new.text_dst);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER translations_fts_delete AFTER DELETE ON translations BEGIN
+            INSERT INTO translations_fts (translations_fts, rowid, text_dst)
+            VALUES ('delete', old.id, old.text_dst);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER translations_fts_update AFTER UPDATE OF text_dst ON translations BEGIN
+            INSERT INTO translations_fts (translations_fts, rowid, text_dst)
+            VALUES ('delete', old.id, old.text_dst);
+            INSERT INTO translations_fts (rowid, text_dst) VALUES (new.id, new.text_dst);
+        END
+    """)
+    # Cantidad de documentos por término (decide si vale la pena ordenar por relevancia)
+    cursor.execute("CREATE VIRTUAL TABLE transcriptions_fts_terms USING fts5vocab(transcriptions_fts, 'row')")
+    cursor.execute("CREATE VIRTUAL TABLE translations_fts_terms USING fts5vocab(translations_fts, 'row')")
+    cursor.execute("INSERT INTO transcriptions_fts (transcriptions_fts) VALUES ('rebuild')")
+    cursor.execute("INSERT INTO translations_fts (translations_fts) VALUES ('rebuild')")
 
-def guardar_letra(datos: Dict[str, Any]) -> int:
+def _migrar_huellas(cursor: sqlite3.Cursor):
     """
-    Guardar letra transcrita y traducida en la base de datos.
+    Migración 8: huellas acústicas por transcripción (`huellas.py`, opcional) y
+    su índice (muestra de claves → transcripción y posición en la huella).
+    """
+    cursor.execute("""
+        CREATE TABLE audio_fingerprints (
+            transcription_id INTEGER PRIMARY KEY REFERENCES transcriptions(id) ON DELETE CASCADE,
+            fingerprint BLOB NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE audio_fingerprint_index (
+            hash INTEGER NOT NULL,
+            transcription_id INTEGER NOT NULL REFERENCES transcriptions(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (hash, transcription_id, position)
+        ) WITHOUT ROWID
+    """)
+    # Para el borrado en cascada desde `transcriptions`
+    cursor.execute(
+        "CREATE INDEX idx_audio_fingerprint_index_transcription ON audio_fingerprint_index(transcription_id)"
+    )
+
+# Migraciones en orden; `PRAGMA user_version` guarda cuántas se aplicaron
+MIGRACIONES = [
+    _migrar_a_transcripciones_y_traducciones,
+    _migrar_clave_video,
+    _migrar_modelo_trabajos,
+    _migrar_memoria_traduccion,
+    _migrar_lotes,
+    _migrar_tiempos,
+    _migrar_busqueda,
+    _migrar_huellas,
+]
+
+def _aplicar_migraciones(conexion: sqlite3.Connection):
+    """Aplicar las migraciones pendientes, cada una en su propia transacción."""
+    version = conexion.execute("PRAGMA user_version").fetchone()[0]
+    for numero, migracion in enumerate(MIGRACIONES[version:], start=version + 1):
+        # BEGIN explícito: sqlite3 no abre transacción por sí solo ante un CREATE
+        cursor = conexion.cursor()
+        cursor.execute("BEGIN")
+        try:
+            migracion(cursor)
+            cursor.execute(f"PRAGMA user_version = {numero}")
+            conexion.commit()
+        except Exception:
+            conexion.rollback()
+            raise
+
+def _abrir_conexion() -> sqlite3.Connection:
+    """Abrir una conexión nueva con los pragmas de rendimiento aplicados."""
+    conexion = sqlite3.connect(
+        DB_PATH,
+        timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=SQLITE_SENTENCIAS_CACHEADAS,
+        # Cada conexión se usa desde un solo hilo; sólo se cierra desde otro al apagar
+        check_same_thread=False
+    )
+    conexion.row_factory = sqlite3.Row
+    # WAL: lectores concurrentes sin bloquear al escritor
+    conexion.execute("PRAGMA journal_mode = WAL")
+    # NORMAL es seguro en WAL (sólo se puede perder la última transacción ante un corte de luz)
+    conexion.execute("PRAGMA synchronous = NORMAL")
+    conexion.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_KB}")
+    conexion.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_MB * 1024 * 1024}")
+    conexion.execute("PRAGMA temp_store = MEMORY")
+    conexion.execute("PRAGMA foreign_keys = ON")
+    conexion.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    return conexion
+
+def obtener_conexion() -> sqlite3.Connection:
+    """
+    Obtener la conexión del hilo actual (se crea la primera vez).
     
-    Args:
-        datos: Diccionario con campos title, artist, album, year, source_url,
-               language_src, language_dst, text_src, text_dst
+    La base de datos se inicializa de forma perezosa en la primera llamada,
+    no al importar el módulo.
     
     Returns:
-        ID del registro insertado
+        Conexión SQLite reutilizable por el hilo actual
+    """
+    if _ruta_inicializada != DB_PATH:
+        inicializar_base_datos()
+    
+    conexion = getattr(_local, 'conexion', None)
+    if conexion is None or getattr(_local, 'ruta', None) != DB_PATH:
+        conexion = _abrir_conexion()
+        _local.conexion = conexion
+        _local.ruta = DB_PATH
+        with _bloqueo:
+            _conexiones.append(conexion)
+    return conexion
+
+def cerrar_conexiones():
+    """Cerrar todas las conexiones abiertas (al apagar la aplicación)."""
+    try:
+        volcar_usos_memoria()
+    except sqlite3.Error:
+        pass
+    with _bloqueo:
+        for conexion in _conexiones:
+            try:
+                conexion.close()
+            except sqlite3.Error:
+                pass
+        _conexiones.clear()
+    _local.__dict__.clear()
+
+@contextmanager
+def transaccion() -> Iterator[sqlite3.Cursor]:
     """
-    conexion = sqlite3.connect(DB_PATH)
+    Transacción de escritura en la conexión del hilo actual.
+    
+    Usa `BEGIN IMMEDIATE` para tomar el bloqueo de escritura al inicio: así
+    las lecturas previas a un INSERT no compiten con otros escritores y
+    `busy_timeout` se encarga de esperar en lugar de fallar.
+    
+    Yields:
+        Cursor dentro de la transacción (commit al salir, rollback si hay error)
+    """
+    conexion = obtener_conexion()
     cursor = conexion.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        yield cursor
+        conexion.commit()
+    except BaseException:
+        conexion.rollback()
+        raise
+
+def inicializar_base_datos():
+    """Crear tablas de letras y trabajos si no existen y aplicar migraciones."""
+    global _ruta_inicializada, _lineas_memoria
     
+    with _bloqueo:
+        if _ruta_inicializada == DB_PATH:
+            return
+        
+        # Otra base de datos: el estado en memoria de la anterior no aplica
+        with _bloqueo_memoria:
+            _usos_memoria.clear()
+            _lineas_memoria = None
+        
+        # Asegurar que el directorio data/ existe
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        
+        conexion = _abrir_conexion()
+        try:
+            _crear_tablas(conexion)
+        finally:
+            conexion.close()
+        _ruta_inicializada = DB_PATH
+
+def _crear_tablas(conexion: sqlite3.Connection):
+    """Crear tablas base y aplicar las migraciones pendientes."""
+    cursor = conexion.cursor()
+    
+    # Trabajos en cola (sobreviven a reinicios del servidor)
     cursor.execute("""
-        INSERT INTO lyrics (title, artist, album, year, source_url, 
-                           language_src, language_dst, text_src, text_dst)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            source_url TEXT NOT NULL,
+            target_lang TEXT NOT NULL,
+            status TEXT NOT NULL,
+            stage TEXT,
+            progress REAL NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+    conexion.commit()
+    
+    _aplicar_migraciones(conexion)
+
+def _insertar_transcripcion(cursor: sqlite3.Cursor, datos: Dict[str, Any]) -> int:
+    """Insertar una transcripción (o reutilizar la existente del mismo video)."""
+    clave = clave_video(datos["source_url"])
+    fila = cursor.execute(
+        "SELECT id FROM transcriptions WHERE video_key = ? OR source_url = ? LIMIT 1",
+        (clave, datos["source_url"])
+    ).fetchone()
+    if fila:
+        return fila[0]
+    
+    cursor.execute("""
+        INSERT INTO transcriptions (title, artist, album, year, source_url,
+                                    language_src, text_src, video_key, segments, words)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     """, (
         datos["title"],
         datos["artist"],
@@ -60,39 +446,588 @@ def guardar_letra(datos: Dict[str, Any]) -> int:
         datos.get("year"),
         datos["source_url"],
         datos["language_src"],
-        datos["language_dst"],
         datos["text_src"],
-        datos["text_dst"]
+        clave,
+        datos.get("segments"),
+        datos.get("words")
     ))
+    return cursor.lastrowid
+
+def _insertar_traduccion(cursor: sqlite3.Cursor, id_transcripcion: int,
+                         idioma_destino: str, texto: str) -> int:
+    """Insertar (o reemplazar) la traducción de una transcripción a un idioma."""
+    cursor.execute("""
+        INSERT INTO translations (transcription_id, language_dst, text_dst)
+        VALUES (?, ?, ?)
+        ON CONFLICT(transcription_id, language_dst) DO UPDATE SET text_dst = excluded.text_dst
+    """, (id_transcripcion, idioma_destino, texto))
+    fila = cursor.execute(
+        "SELECT id FROM translations WHERE transcription_id = ? AND language_dst = ?",
+        (id_transcripcion, idioma_destino)
+    ).fetchone()
+    return fila[0]
+
+def guardar_transcripcion(datos: Dict[str, Any]) -> int:
+    """
+    Guardar una transcripción (sin traducción).
     
-    id_registro = cursor.lastrowid
-    conexion.commit()
-    conexion.close()
+    Args:
+        datos: Diccionario con campos title, artist, album, year, source_url,
+               language_src, text_src
+    
+    Returns:
+        ID de la transcripción (la existente si la URL ya estaba guardada)
+    """
+    with transaccion() as cursor:
+        return _insertar_transcripcion(cursor, datos)
+
+def guardar_traduccion(id_transcripcion: int, idioma_destino: str, texto: str) -> int:
+    """
+    Guardar la traducción de una transcripción a un idioma.
+    
+    Args:
+        id_transcripcion: ID de la transcripción traducida
+        idioma_destino: Código de idioma destino (es, en, pt)
+        texto: Texto traducido
+    
+    Returns:
+        ID de la traducción
+    """
+    with transaccion() as cursor:
+        return _insertar_traduccion(cursor, id_transcripcion, idioma_destino, texto)
+
+def guardar_letra(datos: Dict[str, Any]) -> int:
+    """
+    Guardar letra transcrita y traducida en la base de datos.
+    
+    Si la URL ya tenía transcripción, sólo se agrega (o actualiza) la
+    traducción al nuevo idioma.
     
-    return id_registro
+    Args:
+        datos: Diccionario con campos title, artist, album, year, source_url,
+               language_src, language_dst, text_src, text_dst
+    
+    Returns:
+        ID de la transcripción
+    """
+    with transaccion() as cursor:
+        id_transcripcion = _insertar_transcripcion(cursor, datos)
+        _insertar_traduccion(cursor, id_transcripcion, datos["language_dst"], datos["text_dst"])
+    return id_transcripcion
 
-def buscar_por_url(url: str) -> Optional[Dict[str, Any]]:
+def guardar_letras(lista_datos: List[Dict[str, Any]]) -> List[int]:
     """
-    Buscar letra existente por URL de origen.
+    Guardar varias letras en una sola transacción (escritura por lotes).
+    
+    Args:
+        lista_datos: Lista de diccionarios con el formato de `guardar_letra`
+    
+    Returns:
+        IDs de las transcripciones, en el mismo orden
+    """
+    ids = []
+    with transaccion() as cursor:
+        for datos in lista_datos:
+            id_transcripcion = _insertar_transcripcion(cursor, datos)
+            _insertar_traduccion(cursor, id_transcripcion, datos["language_dst"], datos["text_dst"])
+            ids.append(id_transcripcion)
+    return ids
+
+def buscar_transcripcion(url: str) -> Optional[Dict[str, Any]]:
+    """
+    Buscar transcripción existente por URL de origen (sin importar el idioma destino).
+    
+    La búsqueda usa la clave canónica del video, así cualquier enlace
+    equivalente encuentra la misma transcripción.
     
     Args:
         url: URL del video/audio original
     
+    Returns:
+        Diccionario con datos de la transcripción o None si no existe
+    """
+    return buscar_transcripcion_por_clave(clave_video(url))
+
+def obtener_transcripcion(id_transcripcion: int) -> Optional[Dict[str, Any]]:
+    """Obtener una transcripción por su id."""
+    resultado = obtener_conexion().execute(
+        "SELECT * FROM transcriptions WHERE id = ?", (id_transcripcion,)
+    ).fetchone()
+    return dict(resultado) if resultado else None
+
+def buscar_transcripcion_por_clave(clave: str) -> Optional[Dict[str, Any]]:
+    """
+    Buscar transcripción existente por clave canónica (`extractor:id`).
+    
+    Args:
+        clave: Clave de `clave_video` o de `clave_desde_info`
+    
+    Returns:
+        Diccionario con datos de la transcripción o None si no existe
+    """
+    conexion = obtener_conexion()
+    resultado = conexion.execute(
+        "SELECT * FROM transcriptions WHERE video_key = ? LIMIT 1", (clave,)
+    ).fetchone()
+    if resultado:
+        return dict(resultado)
+    return None
+
+def buscar_por_url(url: str, idioma_destino: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Buscar letra existente por URL de origen (o cualquier enlace equivalente).
+    
+    Args:
+        url: URL del video/audio original
+        idioma_destino: Si se indica, sólo devuelve la traducción a ese idioma
+    
     Returns:
         Diccionario con datos de la letra o None si no existe
     """
-    conexion = sqlite3.connect(DB_PATH)
-    conexion.row_factory = sqlite3.Row
+    conexion = obtener_conexion()
     cursor = conexion.cursor()
     
-    cursor.execute("SELECT * FROM lyrics WHERE source_url = ?", (url,))
+    clave = clave_video(url)
+    if idioma_destino:
+        cursor.execute(
+            "SELECT * FROM lyrics WHERE video_key = ? AND language_dst = ? LIMIT 1",
+            (clave, idioma_destino)
+        )
+    else:
+        cursor.execute("SELECT * FROM lyrics WHERE video_key = ? LIMIT 1", (clave,))
     resultado = cursor.fetchone()
     
-    conexion.close()
+    if resultado:
+        return dict(resultado)
+    return None
+
+def _palabras_busqueda(texto: str) -> List[str]:
+    """
+    Palabras de una búsqueda como las indexa FTS5 (`unicode61 remove_diacritics`):
+    en minúsculas y sin tildes.
+    
+    Raises:
+        ValueError: Si el texto no tiene ninguna palabra
+    """
+    descompuesto = unicodedata.normalize('NFD', texto.lower())
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    palabras = re.findall(r"\w+", sin_tildes)
+    if not palabras:
+        raise ValueError("La búsqueda no tiene palabras")
+    return palabras
+
+def consulta_fts(texto: str) -> str:
+    """
+    Convertir texto libre en una consulta FTS5 segura.
+    
+    Cada palabra se busca como término literal (sin operadores de FTS5) y
+    deben aparecer todas. No se usan prefijos (`palabra*`): con términos
+    cortos FTS5 tiene que unir las listas de cientos de palabras.
+    
+    Args:
+        texto: Fragmento de letra, título o artista
+    
+    Returns:
+        Expresión para `MATCH`
     
+    Raises:
+        ValueError: Si el texto no tiene ninguna palabra
+    """
+    return ' '.join(f'"{palabra}"' for palabra in _palabras_busqueda(texto))
+
+def _orden_busqueda(conexion: sqlite3.Connection, tabla: str, palabras: List[str]) -> str:
+    """
+    ORDER BY para consultar `tabla`: por relevancia, salvo que todas las palabras
+    sean tan comunes que puntuarlas implique recorrer casi todo el índice.
+    """
+    for palabra in set(palabras):
+        fila = conexion.execute(f"SELECT doc FROM {tabla}_terms WHERE term = ?", (palabra,)).fetchone()
+        if fila is None or fila[0] <= BUSQUEDA_MAX_DOCUMENTOS:
+            return "rank"
+    return "rowid DESC"
+
+def buscar_letras(texto: str, limite: int = 20, desplazamiento: int = 0) -> List[Dict[str, Any]]:
+    """
+    Búsqueda de texto completo en título, artista, letra original y traducciones.
+    
+    Cada transcripción aparece una vez, con su mejor coincidencia (ranking
+    bm25, con más peso en título y artista que en la letra). Si todas las
+    palabras están en más de `BUSQUEDA_MAX_DOCUMENTOS` letras, las
+    coincidencias se devuelven de la más reciente a la más antigua.
+    
+    Args:
+        texto: Fragmento de letra, título o artista
+        limite: Resultados por página
+        desplazamiento: Resultados a saltar (paginación)
+    
+    Returns:
+        Lista de {id, title, artist, album, year, source_url, language_src,
+        language_match, snippet, score}, de mejor a peor
+    
+    Raises:
+        ValueError: Si el texto no tiene ninguna palabra
+    """
+    consulta = consulta_fts(texto)
+    palabras = _palabras_busqueda(texto)
+    necesarios = desplazamiento + limite
+    conexion = obtener_conexion()
+    
+    # Cada índice aporta sólo sus mejores filas (ORDER BY ... LIMIT no ordena todas
+    # las coincidencias); se consultan por separado para que SQLite use esa optimización.
+    # Sin ranking el puntaje es 0 y quedan detrás de las puntuadas, por fecha.
+    orden = _orden_busqueda(conexion, 'transcriptions_fts', palabras)
+    mejores: Dict[int, Tuple[float, str, int, Optional[str]]] = {}
+    for fila in conexion.execute(
+        f"SELECT rowid, {'rank' if orden == 'rank' else '0.0'} FROM transcriptions_fts "
+        f"WHERE transcriptions_fts MATCH ? AND rank MATCH ? ORDER BY {orden} LIMIT ?",
+        (consulta, f"bm25({', '.join(map(str, PESOS_BUSQUEDA))})", necesarios)
+    ):
+        mejores[fila[0]] = (fila[1], 'transcriptions_fts', fila[0], None)
+    # A lo sumo una traducción por idioma destino (es, en, pt): con el triple de
+    # filas ninguna transcripción de la página queda afuera
+    orden = _orden_busqueda(conexion, 'translations_fts', palabras)
+    traducciones = conexion.execute(
+        f"SELECT rowid, {'rank' if orden == 'rank' else '0.0'} FROM translations_fts "
+        f"WHERE translations_fts MATCH ? ORDER BY {orden} LIMIT ?",
+        (consulta, necesarios * 3)
+    ).fetchall()
+    if traducciones:
+        marcadores = ', '.join('?' * len(traducciones))
+        destinos = {
+            fila['id']: (fila['transcription_id'], fila['language_dst'])
+            for fila in conexion.execute(
+                f"SELECT id, transcription_id, language_dst FROM translations WHERE id IN ({marcadores})",
+                [fila[0] for fila in traducciones]
+            )
+        }
+        for id_traduccion, puntaje in traducciones:
+            id_transcripcion, idioma = destinos[id_traduccion]
+            if id_transcripcion not in mejores or puntaje < mejores[id_transcripcion][0]:
+                mejores[id_transcripcion] = (puntaje, 'translations_fts', id_traduccion, idioma)
+    
+    # bm25 es negativo (más negativo = más relevante)
+    pagina = sorted(mejores.items(), key=lambda item: item[1][0])[desplazamiento:necesarios]
+    resultados = []
+    for id_transcripcion, (puntaje, tabla, id_fts, idioma) in pagina:
+        resultado = dict(conexion.execute(
+            "SELECT id, title, artist, album, year, source_url, language_src "
+            "FROM transcriptions WHERE id = ?", (id_transcripcion,)
+        ).fetchone())
+        # El fragmento se arma sólo para los resultados de la página
+        resultado['snippet'] = conexion.execute(
+            f"SELECT snippet({tabla}, -1, '[', ']', '…', 12) FROM {tabla} "
+            f"WHERE {tabla} MATCH ? AND rowid = ?",
+            (consulta, id_fts)
+        ).fetchone()[0]
+        resultado['language_match'] = idioma or resultado['language_src']
+        resultado['score'] = abs(round(puntaje, 4))
+        resultados.append(resultado)
+    return resultados
+
+def copiar_traducciones(id_origen: int, id_destino: int) -> None:
+    """
+    Copiar las traducciones de una transcripción a otra con el mismo texto
+    (resubida de la misma grabación, ver `huellas.py`).
+    """
+    with transaccion() as cursor:
+        cursor.execute("""
+            INSERT OR IGNORE INTO translations (transcription_id, language_dst, text_dst)
+            SELECT ?, language_dst, text_dst FROM translations WHERE transcription_id = ?
+        """, (id_destino, id_origen))
+
+def guardar_huella(id_transcripcion: int, huella: bytes, entradas: List[Tuple[int, int]]) -> None:
+    """
+    Guardar la huella acústica de una transcripción y sus entradas de índice.
+    
+    Args:
+        id_transcripcion: Transcripción a la que pertenece
+        huella: Huella codificada
+        entradas: Pares (clave, posición) a indexar
+    """
+    with transaccion() as cursor:
+        cursor.execute(
+            "INSERT OR REPLACE INTO audio_fingerprints (transcription_id, fingerprint) VALUES (?, ?)",
+            (id_transcripcion, huella)
+        )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO audio_fingerprint_index (hash, transcription_id, position) "
+            "VALUES (?, ?, ?)",
+            [(clave, id_transcripcion, posicion) for clave, posicion in entradas]
+        )
+
+def obtener_huella(id_transcripcion: int) -> Optional[bytes]:
+    """Huella codificada de una transcripción, o None si no tiene."""
+    fila = obtener_conexion().execute(
+        "SELECT fingerprint FROM audio_fingerprints WHERE transcription_id = ?", (id_transcripcion,)
+    ).fetchone()
+    return fila[0] if fila else None
+
+def buscar_en_indice_huellas(claves: List[int]) -> List[Tuple[int, int, int]]:
+    """
+    Buscar claves en el índice de huellas.
+    
+    Args:
+        claves: Claves de `huellas.entradas_indice` (sin repetir)
+    
+    Returns:
+        Lista de (clave, transcription_id, posición)
+    """
+    encontradas = []
+    conexion = obtener_conexion()
+    for inicio in range(0, len(claves), LOTE_PARAMETROS):
+        lote = claves[inicio:inicio + LOTE_PARAMETROS]
+        marcadores = ', '.join('?' * len(lote))
+        encontradas.extend(
+            tuple(fila) for fila in conexion.execute(
+                f"SELECT hash, transcription_id, position FROM audio_fingerprint_index "
+                f"WHERE hash IN ({marcadores})", lote
+            )
+        )
+    return encontradas
+
+def buscar_en_memoria(lineas: List[str], idioma_origen: str, idioma_destino: str) -> Dict[str, str]:
+    """
+    Buscar traducciones de líneas ya normalizadas en la memoria de traducción.
+    
+    Las líneas encontradas se marcan como usadas (para el desalojo) en
+    memoria; `volcar_usos_memoria` las escribe por lotes, así una consulta
+    no abre una transacción de escritura.
+    
+    Args:
+        lineas: Líneas normalizadas (sin repetir)
+        idioma_origen: Código de idioma origen
+        idioma_destino: Código de idioma destino
+    
+    Returns:
+        Diccionario línea → traducción, sólo con las encontradas
+    """
+    if not lineas:
+        return {}
+    
+    encontradas: Dict[str, str] = {}
+    conexion = obtener_conexion()
+    for inicio in range(0, len(lineas), LOTE_PARAMETROS):
+        lote = lineas[inicio:inicio + LOTE_PARAMETROS]
+        marcadores = ', '.join('?' * len(lote))
+        for fila in conexion.execute(
+            f"SELECT line_src, line_dst FROM translation_memory "
+            f"WHERE language_src = ? AND language_dst = ? AND line_src IN ({marcadores})",
+            (idioma_origen, idioma_destino, *lote)
+        ):
+            encontradas[fila['line_src']] = fila['line_dst']
+    
+    if encontradas:
+        ahora = time.time()
+        with _bloqueo_memoria:
+            for linea in encontradas:
+                uso = _usos_memoria.setdefault((linea, idioma_origen, idioma_destino), [0, ahora])
+                uso[0] += 1
+                uso[1] = ahora
+            volcar = (len(_usos_memoria) >= MEMORIA_USOS_LOTE
+                      or time.monotonic() - _ultimo_volcado_usos >= MEMORIA_USOS_SEGUNDOS)
+        if volcar:
+            volcar_usos_memoria()
+    return encontradas
+
+def volcar_usos_memoria() -> None:
+    """Escribir en una sola transacción los usos acumulados de la memoria de traducción."""
+    global _ultimo_volcado_usos
+    
+    with _bloqueo_memoria:
+        usos = list(_usos_memoria.items())
+        _usos_memoria.clear()
+        _ultimo_volcado_usos = time.monotonic()
+    if not usos:
+        return
+    with transaccion() as cursor:
+        cursor.executemany(
+            "UPDATE translation_memory SET hits = hits + ?, last_used = max(last_used, ?) "
+            "WHERE line_src = ? AND language_src = ? AND language_dst = ?",
+            [(int(hits), ultimo, *clave) for clave, (hits, ultimo) in usos]
+        )
+
+def guardar_en_memoria(traducciones: Dict[str, str], idioma_origen: str, idioma_destino: str) -> None:
+    """
+    Guardar traducciones de líneas en la memoria de traducción.
+    
+    La cantidad de líneas se lleva en memoria (cota superior: las guardadas
+    son líneas que no estaban); sólo cuando supera
+    `MEMORIA_TRADUCCION_MAX_LINEAS` se cuenta la tabla y se borran las líneas
+    usadas hace más tiempo hasta quedar en el 90% del límite.
+    
+    Args:
+        traducciones: Diccionario línea normalizada → traducción
+        idioma_origen: Código de idioma origen
+        idioma_destino: Código de idioma destino
+    """
+    global _lineas_memoria
+    
+    if not traducciones:
+        return
+    
+    ahora = time.time()
+    with transaccion() as cursor:
+        cursor.executemany(
+            "INSERT OR REPLACE INTO translation_memory "
+            "(line_src, language_src, language_dst, line_dst, last_used) VALUES (?, ?, ?, ?, ?)",
+            [(linea, idioma_origen, idioma_destino, traduccion, ahora)
+             for linea, traduccion in traducciones.items()]
+        )
+    
+    with _bloqueo_memoria:
+        if _lineas_memoria is not None:
+            _lineas_memoria += len(traducciones)
+        lineas = _lineas_memoria
+    if lineas is None or lineas > MEMORIA_TRADUCCION_MAX_LINEAS:
+        _desalojar_memoria()
+
+def _desalojar_memoria() -> None:
+    """Contar la memoria de traducción y borrar las líneas menos usadas si pasa del límite."""
+    global _lineas_memoria
+    
+    # Con los usos pendientes escritos, `last_used` ordena bien el desalojo
+    volcar_usos_memoria()
+    with transaccion() as cursor:
+        total = cursor.execute("SELECT COUNT(*) FROM translation_memory").fetchone()[0]
+        if total > MEMORIA_TRADUCCION_MAX_LINEAS:
+            cursor.execute(
+                "DELETE FROM translation_memory WHERE rowid IN ("
+                "SELECT rowid FROM translation_memory ORDER BY last_used LIMIT ?)",
+                (total - int(MEMORIA_TRADUCCION_MAX_LINEAS * 0.9),)
+            )
+            total -= cursor.rowcount
+    with _bloqueo_memoria:
+        _lineas_memoria = total
+
+def contar_lineas_memoria() -> int:
+    """Cantidad de líneas guardadas en la memoria de traducción."""
+    conexion = obtener_conexion()
+    return conexion.execute("SELECT COUNT(*) FROM translation_memory").fetchone()[0]
+
+def crear_trabajo(id_trabajo: str, url: str, idioma_destino: str, estado: str,
+                  modelo: Optional[str] = None) -> None:
+    """
+    Registrar un trabajo nuevo en la cola persistente.
+    
+    Args:
+        id_trabajo: Identificador único del trabajo
+        url: URL del video a procesar
+        idioma_destino: Código de idioma destino (es, en, pt)
+        estado: Estado inicial del trabajo
+        modelo: Modelo Whisper elegido (None = WHISPER_MODEL)
+    """
+    with transaccion() as cursor:
+        cursor.execute(
+            "INSERT INTO jobs (id, source_url, target_lang, status, model) VALUES (?, ?, ?, ?, ?)",
+            (id_trabajo, url, idioma_destino, estado, modelo)
+        )
+
+def actualizar_trabajo(id_trabajo: str, **campos: Any) -> None:
+    """
+    Actualizar campos de un trabajo (status, stage, progress, result, error).
+    
+    Args:
+        id_trabajo: Identificador del trabajo
+        **campos: Columnas a actualizar con su nuevo valor
+    """
+    columnas_validas = {'status', 'stage', 'progress', 'result', 'error'}
+    desconocidas = set(campos) - columnas_validas
+    if desconocidas:
+        raise ValueError(f"Columnas de trabajo no válidas: {desconocidas}")
+    
+    asignaciones = ", ".join(f"{columna} = ?" for columna in campos)
+    with transaccion() as cursor:
+        cursor.execute(
+            f"UPDATE jobs SET {asignaciones}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (*campos.values(), id_trabajo)
+        )
+
+def obtener_trabajo(id_trabajo: str) -> Optional[Dict[str, Any]]:
+    """
+    Obtener un trabajo por su identificador.
+    
+    Args:
+        id_trabajo: Identificador del trabajo
+    
+    Returns:
+        Diccionario con los datos del trabajo o None si no existe
+    """
+    conexion = obtener_conexion()
+    resultado = conexion.execute("SELECT * FROM jobs WHERE id = ?", (id_trabajo,)).fetchone()
     if resultado:
         return dict(resultado)
     return None
 
-# Inicializar base de datos al importar el módulo
-inicializar_base_datos()
+def listar_trabajos_pendientes(estados: List[str]) -> List[Dict[str, Any]]:
+    """
+    Listar trabajos no terminados, en orden de llegada.
+    
+    Args:
+        estados: Estados considerados pendientes
+    
+    Returns:
+        Lista de trabajos como diccionarios
+    """
+    marcadores = ", ".join("?" for _ in estados)
+    conexion = obtener_conexion()
+    filas = conexion.execute(
+        f"SELECT * FROM jobs WHERE status IN ({marcadores}) ORDER BY created_at, rowid",
+        estados
+    ).fetchall()
+    return [dict(fila) for fila in filas]
+
+def crear_lote(id_lote: str, fuente: str, idioma_destino: str, trabajos: List[Tuple[str, str]],
+               omitidas: int, estado: str, modelo: Optional[str] = None) -> None:
+    """
+    Registrar un lote y todos sus trabajos en una sola transacción.
+    
+    Args:
+        id_lote: Identificador único del lote
+        fuente: Playlist, archivo o descripción de las URLs de origen
+        idioma_destino: Código de idioma destino (es, en, pt)
+        trabajos: Lista de (id de trabajo, URL)
+        omitidas: URLs descartadas por estar ya guardadas o repetidas
+        estado: Estado inicial de los trabajos
+        modelo: Modelo Whisper elegido (None = WHISPER_MODEL)
+    """
+    with transaccion() as cursor:
+        cursor.execute(
+            "INSERT INTO batches (id, source, target_lang, model, total, skipped) VALUES (?, ?, ?, ?, ?, ?)",
+            (id_lote, fuente, idioma_destino, modelo, len(trabajos), omitidas)
+        )
+        cursor.executemany(
+            "INSERT INTO jobs (id, source_url, target_lang, status, model, batch_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(id_trabajo, url, idioma_destino, estado, modelo, id_lote) for id_trabajo, url in trabajos]
+        )
+
+def obtener_lote(id_lote: str) -> Optional[Dict[str, Any]]:
+    """
+    Obtener un lote con la cantidad de trabajos por estado.
+    
+    Args:
+        id_lote: Identificador del lote
+    
+    Returns:
+        Diccionario con los datos del lote, `estados` ({estado: cantidad}) y
+        `segundos` (desde la creación hasta el último trabajo actualizado), o
+        None si no existe
+    """
+    conexion = obtener_conexion()
+    lote = conexion.execute("SELECT * FROM batches WHERE id = ?", (id_lote,)).fetchone()
+    if lote is None:
+        return None
+    
+    lote = dict(lote)
+    lote['estados'] = {
+        fila['status']: fila['cantidad']
+        for fila in conexion.execute(
+            "SELECT status, COUNT(*) AS cantidad FROM jobs WHERE batch_id = ? GROUP BY status",
+            (id_lote,)
+        )
+    }
+    lote['segundos'] = conexion.execute(
+        "SELECT (julianday(MAX(updated_at)) - julianday(?)) * 86400 FROM jobs WHERE batch_id = ?",
+        (lote['created_at'], id_lote)
+    ).fetchone()[0] or 0.0
+    return lote
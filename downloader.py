@@ -1,15 +1,49 @@
 """
 Módulo para descargar y extraer audio desde URLs (principalmente YouTube).
-Utiliza yt-dlp para descarga y ffmpeg para conversión a formato WAV normalizado.
+Utiliza yt-dlp para descarga y ffmpeg para conversión a formato WAV normalizado,
+o para decodificar el stream directamente a PCM en memoria (sin pasar por disco).
 """
 import os
-import tempfile
+import subprocess
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Tuple
-import yt_dlp
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
 import shutil
+# yt-dlp se importa en las funciones que lo usan: importarlo cuesta más que el
+# resto del módulo y la API lo necesita recién al procesar una URL nueva
 
-TMP_DIR = Path(__file__).parent / "tmp"
+from almacen_temporal import almacen_temporal, estimar_bytes
+from metricas import registrar_cache
+from urls import clave_video
+
+# Formato que espera Whisper: mono, 16 kHz
+FRECUENCIA_MUESTREO = 16000
+
+# Decodificar el audio en memoria en lugar de escribir un WAV en tmp/
+AUDIO_EN_MEMORIA = os.getenv('AUDIO_EN_MEMORIA', '1') == '1'
+
+# Protocolos que ffmpeg puede leer directamente desde la URL del formato
+PROTOCOLOS_DIRECTOS = {'http', 'https', 'm3u8', 'm3u8_native'}
+
+# Sondeo de metadatos (sin descargar): se reutiliza durante este tiempo. Las URLs
+# de los formatos que entrega yt-dlp caducan (en YouTube, a las ~6 horas)
+METADATOS_TTL_SEGUNDOS = float(os.getenv('METADATOS_TTL_SEGUNDOS', '1800'))
+METADATOS_MAX_ENTRADAS = 1024
+
+# Límites comprobados con los metadatos, antes de descargar nada (0 = sin límite)
+MAX_DURACION_SEGUNDOS = float(os.getenv('DESCARGA_MAX_DURACION_SEGUNDOS', '7200'))
+MAX_TAMANO_MB = float(os.getenv('DESCARGA_MAX_MB', '500'))
+
+# Campos de la información de yt-dlp que se conservan en la cache (el resto,
+# como la lista completa de formatos, ocupa cientos de KB por video)
+CAMPOS_METADATOS = (
+    'id', 'extractor_key', 'webpage_url', 'title', 'artist', 'creator', 'uploader',
+    'album', 'release_year', 'upload_date', 'duration', 'is_live', 'filesize',
+    'filesize_approx', 'url', 'protocol', 'http_headers',
+)
 
 # Localizar ffmpeg en el sistema
 FFMPEG_LOCATION = None
@@ -17,6 +51,47 @@ ffmpeg_path = shutil.which("ffmpeg")
 if ffmpeg_path:
     FFMPEG_LOCATION = str(Path(ffmpeg_path).parent)
 
+class LimiteExcedido(Exception):
+    """El audio supera la duración o el tamaño máximos: no se descarga."""
+
+class CacheMetadatos:
+    """
+    Cache LRU con vencimiento de los metadatos sondeados con yt-dlp.
+    
+    Se comparte entre los hilos de descarga; la clave es la de `clave_video`.
+    """
+    
+    def __init__(self, ttl_segundos: float, max_entradas: int):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._bloqueo = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+    
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        """Metadatos vigentes de `clave` o None."""
+        with self._bloqueo:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                self._entradas.pop(clave, None)
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+    
+    def guardar(self, clave: str, info: Dict[str, Any]):
+        """Guardar metadatos hasta que venzan (desaloja los menos usados si está llena)."""
+        with self._bloqueo:
+            self._entradas[clave] = (time.monotonic() + self.ttl_segundos, info)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+_cache_metadatos = CacheMetadatos(METADATOS_TTL_SEGUNDOS, METADATOS_MAX_ENTRADAS)
+_estadisticas_sondeo = {'sondeos': 0, 'rechazadas': 0}
+
 def extraer_metadata(info: dict) -> Dict[str, any]:
     """
     Extraer metadatos relevantes de la información del video.
@@ -35,10 +110,11 @@ def extraer_metadata(info: dict) -> Dict[str, any]:
             'year': None
         }
     
-    title = info.get('title', 'Desconocido')
+    # Los metadatos sondeados tienen todos los campos (None si el sitio no los da)
+    title = info.get('title') or 'Desconocido'
     
     # Intentar obtener artista del campo 'artist' o 'uploader'
-    artist = info.get('artist') or info.get('creator') or info.get('uploader', 'Desconocido')
+    artist = info.get('artist') or info.get('creator') or info.get('uploader') or 'Desconocido'
     
     # Álbum y año pueden no estar disponibles
     album = info.get('album')
@@ -60,6 +136,85 @@ def extraer_metadata(info: dict) -> Dict[str, any]:
         'year': year
     }
 
+def verificar_limites(info: Dict[str, Any]):
+    """
+    Rechazar transmisiones en vivo y audios más largos o pesados que los límites.
+    
+    Args:
+        info: Metadatos de `sondear_metadatos`
+    
+    Raises:
+        LimiteExcedido: Si no se debe descargar
+    """
+    if info.get('is_live'):
+        raise LimiteExcedido("Las transmisiones en vivo no se procesan")
+    duracion = info.get('duration')
+    if MAX_DURACION_SEGUNDOS and duracion and duracion > MAX_DURACION_SEGUNDOS:
+        raise LimiteExcedido(
+            f"El audio dura {duracion / 60:.0f} min (máximo {MAX_DURACION_SEGUNDOS / 60:.0f} min)"
+        )
+    tamano = info.get('filesize') or info.get('filesize_approx')
+    if MAX_TAMANO_MB and tamano and tamano > MAX_TAMANO_MB * 2**20:
+        raise LimiteExcedido(
+            f"El audio pesa {tamano / 2**20:.0f} MB (máximo {MAX_TAMANO_MB:.0f} MB)"
+        )
+
+def sondear_metadatos(url: str) -> Dict[str, Any]:
+    """
+    Obtener los metadatos de una URL sin descargar el audio (cacheados por
+    `METADATOS_TTL_SEGUNDOS`) y comprobar los límites de duración y tamaño.
+    
+    Incluye el formato de audio elegido (`url`, `protocol`, `http_headers`),
+    así la descarga posterior no vuelve a consultar el sitio.
+    
+    Args:
+        url: URL del video (YouTube u otro soportado por yt-dlp)
+    
+    Returns:
+        Diccionario con los campos de `CAMPOS_METADATOS`
+    
+    Raises:
+        LimiteExcedido: Si el audio supera los límites
+        Exception: Si yt-dlp no puede leer la URL
+    """
+    clave = clave_video(url)
+    info = _cache_metadatos.obtener(clave)
+    registrar_cache('metadatos', info is not None)
+    if info is None:
+        import yt_dlp
+        opciones = {
+            'format': 'bestaudio/best',
+            'quiet': True,
+            'no_warnings': True,
+        }
+        try:
+            with yt_dlp.YoutubeDL(opciones) as ydl:
+                completa = ydl.extract_info(url, download=False)
+        except yt_dlp.utils.DownloadError as e:
+            raise Exception(f"Error al descargar desde la URL: {str(e)}")
+        
+        if not completa:
+            raise Exception("No se pudo extraer información del video")
+        
+        _estadisticas_sondeo['sondeos'] += 1
+        info = {campo: completa.get(campo) for campo in CAMPOS_METADATOS}
+        _cache_metadatos.guardar(clave, info)
+    
+    try:
+        verificar_limites(info)
+    except LimiteExcedido:
+        _estadisticas_sondeo['rechazadas'] += 1
+        raise
+    return info
+
+def estadisticas_sondeo() -> Dict[str, Any]:
+    """Sondeos de metadatos hechos, aciertos de la cache y audios rechazados por los límites."""
+    return {
+        **_estadisticas_sondeo,
+        'aciertos_cache': _cache_metadatos.aciertos,
+        'fallos_cache': _cache_metadatos.fallos,
+    }
+
 def descargar_audio(url: str) -> Tuple[Path, Dict[str, any]]:
     """
     Descargar audio desde URL y convertir a WAV mono 16kHz.
@@ -71,19 +226,24 @@ def descargar_audio(url: str) -> Tuple[Path, Dict[str, any]]:
         Tupla (ruta_archivo_audio, metadatos)
     
     Raises:
+        LimiteExcedido: Si el audio supera los límites (antes de descargar)
+        EspacioTemporalAgotado: Si no se libera espacio temporal a tiempo
         Exception: Si falla la descarga o conversión
     """
-    # Asegurar que existe el directorio temporal
-    TMP_DIR.mkdir(exist_ok=True)
+    # Comprobar límites con los metadatos (cacheados si ya se sondeó la URL)
+    info = sondear_metadatos(url)
     
-    # Generar nombre de archivo temporal único
-    temp_id = tempfile.mktemp(prefix='audio_', suffix='', dir=TMP_DIR)
-    archivo_salida = Path(temp_id).with_suffix('.wav')
+    # Directorio propio para este trabajo (original, .part y WAV); espera si
+    # las descargas en curso ya ocupan el presupuesto de espacio temporal
+    directorio = almacen_temporal.crear_directorio(estimar_bytes(info))
+    plantilla = directorio / 'audio'
+    archivo_salida = plantilla.with_suffix('.wav')
     
     # Configuración de yt-dlp
+    import yt_dlp
     opciones = {
         'format': 'bestaudio/best',
-        'outtmpl': str(temp_id),
+        'outtmpl': str(plantilla),
         'quiet': False,  # Mostrar salida para debug
         'no_warnings': False,
         'extract_flat': False,
@@ -97,6 +257,10 @@ def descargar_audio(url: str) -> Tuple[Path, Dict[str, any]]:
         ],
     }
     
+    # Por si el sitio no informó el tamaño: yt-dlp corta la descarga al superarlo
+    if MAX_TAMANO_MB:
+        opciones['max_filesize'] = int(MAX_TAMANO_MB * 2**20)
+    
     # Agregar ubicación de ffmpeg si se encontró
     if FFMPEG_LOCATION:
         opciones['ffmpeg_location'] = FFMPEG_LOCATION
@@ -118,23 +282,152 @@ def descargar_audio(url: str) -> Tuple[Path, Dict[str, any]]:
         return archivo_salida, metadata
     
     except yt_dlp.utils.DownloadError as e:
-        # Limpiar archivo si existe
-        if archivo_salida.exists():
-            archivo_salida.unlink()
+        # Borrar lo que haya quedado (descarga parcial, original sin convertir)
+        almacen_temporal.liberar_directorio(directorio)
         raise Exception(f"Error al descargar desde la URL: {str(e)}")
     except Exception as e:
-        # Limpiar archivo si existe
-        if archivo_salida.exists():
-            archivo_salida.unlink()
+        almacen_temporal.liberar_directorio(directorio)
         raise Exception(f"Error al descargar audio: {str(e)}")
 
+def decodificar_pcm(entrada: str, cabeceras: Optional[Dict[str, str]] = None) -> np.ndarray:
+    """
+    Decodificar audio a PCM float32 mono 16 kHz con un solo proceso ffmpeg.
+    
+    La salida de ffmpeg va por una tubería directo a memoria: no se escribe
+    ningún archivo intermedio.
+    
+    Args:
+        entrada: Ruta local o URL (http/https/HLS) del audio
+        cabeceras: Cabeceras HTTP para la URL (las que indica yt-dlp)
+    
+    Returns:
+        Array float32 con las muestras en el rango [-1, 1]
+    
+    Raises:
+        Exception: Si ffmpeg falla o no produce audio
+    """
+    ejecutable = str(Path(FFMPEG_LOCATION) / "ffmpeg") if FFMPEG_LOCATION else "ffmpeg"
+    comando = [ejecutable, '-nostdin', '-hide_banner', '-loglevel', 'error']
+    if entrada.startswith(('http://', 'https://')):
+        comando += ['-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5']
+        if cabeceras:
+            comando += ['-headers', ''.join(f"{k}: {v}\r\n" for k, v in cabeceras.items())]
+    comando += ['-i', entrada]
+    # Por si el sitio no informó la duración
+    if MAX_DURACION_SEGUNDOS:
+        comando += ['-t', str(MAX_DURACION_SEGUNDOS)]
+    comando += [
+        '-vn',
+        '-f', 'f32le',
+        '-acodec', 'pcm_f32le',
+        '-ac', '1',
+        '-ar', str(FRECUENCIA_MUESTREO),
+        'pipe:1'
+    ]
+    
+    proceso = subprocess.run(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proceso.returncode != 0:
+        raise Exception(f"ffmpeg no pudo decodificar el audio: {proceso.stderr.decode(errors='replace')[-500:]}")
+    
+    audio = np.frombuffer(proceso.stdout, dtype=np.float32)
+    if audio.size == 0:
+        raise Exception("ffmpeg no produjo muestras de audio")
+    return audio
+
+def descargar_audio_pcm(url: str, info: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, Dict[str, any]]:
+    """
+    Obtener el audio de una URL como PCM en memoria (float32 mono 16 kHz).
+    
+    yt-dlp sólo resuelve la URL del mejor formato de audio (o se reutiliza la
+    del sondeo); ffmpeg descarga y decodifica en un único paso. Si el formato
+    usa un protocolo que ffmpeg no puede leer directamente (p. ej. DASH
+    fragmentado), se descarga a `tmp/` como antes y se decodifica desde el archivo.
+    
+    Args:
+        url: URL del video (YouTube u otro soportado por yt-dlp)
+        info: Metadatos ya sondeados con `sondear_metadatos` (None = sondear ahora)
+    
+    Returns:
+        Tupla (muestras_audio, metadatos)
+    
+    Raises:
+        LimiteExcedido: Si el audio supera los límites (antes de descargar)
+        Exception: Si falla la extracción o la decodificación
+    """
+    if info is None:
+        info = sondear_metadatos(url)
+    
+    metadata = extraer_metadata(info)
+    
+    if info.get('url') and info.get('protocol') in PROTOCOLOS_DIRECTOS:
+        audio = decodificar_pcm(info['url'], info.get('http_headers'))
+        return audio, metadata
+    
+    # Protocolo no soportado por ffmpeg: pasar por archivo temporal
+    ruta_audio, _ = descargar_audio(url)
+    try:
+        return decodificar_pcm(str(ruta_audio)), metadata
+    finally:
+        limpiar_archivo(ruta_audio)
+
+def expandir_playlist(url: str) -> List[str]:
+    """
+    Obtener las URLs de los videos de una playlist (o canal) sin descargarlos.
+    
+    Usa la extracción "plana" de yt-dlp: sólo lee el listado, sin resolver
+    formatos de cada video. Una URL que no es playlist se devuelve tal cual.
+    
+    Args:
+        url: URL de la playlist, canal o video
+    
+    Returns:
+        Lista de URLs de videos, en el orden de la playlist
+    
+    Raises:
+        Exception: Si yt-dlp no puede leer la URL
+    """
+    import yt_dlp
+    
+    opciones = {
+        'extract_flat': 'in_playlist',
+        'quiet': True,
+        'no_warnings': True,
+    }
+    
+    try:
+        with yt_dlp.YoutubeDL(opciones) as ydl:
+            info = ydl.extract_info(url, download=False)
+    except yt_dlp.utils.DownloadError as e:
+        raise Exception(f"Error al leer la playlist: {str(e)}")
+    
+    if not info or info.get('_type') not in ('playlist', 'multi_video'):
+        return [url]
+    
+    urls = []
+    for entrada in info.get('entries') or []:
+        if not entrada:
+            continue
+        # Las entradas planas traen 'url' (a veces sólo el id) y/o 'webpage_url'
+        enlace = entrada.get('webpage_url') or entrada.get('url')
+        if enlace and '://' not in enlace and entrada.get('ie_key') == 'Youtube':
+            enlace = f"https://www.youtube.com/watch?v={enlace}"
+        if enlace:
+            urls.append(enlace)
+    return urls
+
 def limpiar_archivo(ruta: Path):
     """
     Eliminar archivo de audio temporal de forma segura.
     
+    Si es el WAV de `descargar_audio`, se borra su directorio de trabajo
+    entero (con los restos de yt-dlp) y se libera su reserva de espacio.
+    
     Args:
         ruta: Path al archivo a eliminar
     """
+    if almacen_temporal.es_directorio_trabajo(ruta.parent):
+        almacen_temporal.liberar_directorio(ruta.parent)
+        return
     try:
         if ruta.exists():
             ruta.unlink()
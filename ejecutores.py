@@ -0,0 +1,148 @@
+"""
+Módulo de ejecutores por etapa del pipeline.
+Cada etapa (descarga, transcripción, traducción) corre en su propio pool
+para no bloquear el event loop de FastAPI mientras se procesa una canción.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+from metricas import en_contexto
+from transcriber.whisper_transcriber import PRESUPUESTO_MEMORIA_MB, memoria_precarga
+
+NUCLEOS = os.cpu_count() or 1
+
+def _procesos_transcripcion_por_defecto() -> int:
+    """Un proceso por núcleo, sin que sus modelos precargados superen WHISPER_PRESUPUESTO_MB."""
+    por_proceso = memoria_precarga()
+    if not por_proceso:
+        return NUCLEOS
+    return max(1, min(NUCLEOS, PRESUPUESTO_MEMORIA_MB // por_proceso))
+
+# Límites de concurrencia por etapa (configurables con variables de entorno)
+MAX_DESCARGAS = int(os.getenv('MAX_DESCARGAS', '4'))
+MAX_TRANSCRIPCIONES = int(os.getenv('MAX_TRANSCRIPCIONES', '0')) or _procesos_transcripcion_por_defecto()
+MAX_TRADUCCIONES = int(os.getenv('MAX_TRADUCCIONES', '8'))
+
+# Modo de transcripción: 'procesos' (un modelo por proceso, una llamada por
+# petición) o 'lotes' (un modelo compartido que agrupa ventanas de varias
+# peticiones, ver `transcriber/planificador.py`)
+MODO_PROCESOS = 'procesos'
+MODO_LOTES = 'lotes'
+MODO_TRANSCRIPCION = os.getenv('WHISPER_PLANIFICADOR', MODO_PROCESOS)
+
+# Cargar y calentar los modelos de WHISPER_MODELOS_PRECARGA al crear cada proceso
+PRECARGAR_MODELOS = os.getenv('WHISPER_PRECARGAR', '1') == '1'
+
+# Cómo se crean los procesos de Whisper: con 'fork' heredan los modelos que el
+# proceso ya tenga cargados (p. ej. por `gunicorn_conf.py`) en páginas compartidas
+INICIO_PROCESOS = os.getenv(
+    'WHISPER_INICIO_PROCESOS', 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+ETAPA_DESCARGA = 'descarga'
+ETAPA_TRANSCRIPCION = 'transcripcion'
+ETAPA_TRADUCCION = 'traduccion'
+
+# Ejecutores creados bajo demanda (uno por etapa)
+_ejecutores: Dict[str, Executor] = {}
+
+def _inicializar_proceso_whisper(hilos: int, precargar: bool, presupuesto_mb: int):
+    """
+    Inicializar un proceso del pool de Whisper.
+
+    Limita los hilos de PyTorch (y de CTranslate2, vía WHISPER_HILOS) para
+    que varios procesos en paralelo no compitan por los mismos núcleos, fija
+    su parte del presupuesto de memoria y, si `precargar`, carga y calienta
+    los modelos antes de aceptar trabajo.
+
+    Args:
+        hilos: Número de hilos de cómputo por proceso
+        precargar: Calentar los modelos de WHISPER_MODELOS_PRECARGA
+        presupuesto_mb: Memoria para modelos de este proceso
+    """
+    from transcriber.whisper_transcriber import fijar_presupuesto
+
+    os.environ['WHISPER_HILOS'] = str(hilos)
+    fijar_presupuesto(presupuesto_mb)
+    try:
+        import torch
+        torch.set_num_threads(hilos)
+    except ImportError:
+        pass
+
+    if precargar:
+        from transcriber.whisper_transcriber import calentar_modelos
+        try:
+            calentar_modelos()
+        except Exception as e:
+            # Un error aquí rompería el pool entero; el modelo se reintenta al usarlo
+            print(f"Error al precargar modelos Whisper: {e}")
+
+def _crear_ejecutor(etapa: str) -> Executor:
+    """Crear el ejecutor correspondiente a una etapa."""
+    if etapa == ETAPA_DESCARGA:
+        return ThreadPoolExecutor(max_workers=MAX_DESCARGAS, thread_name_prefix='descarga')
+    if etapa == ETAPA_TRANSCRIPCION:
+        # Inferencia de Whisper: CPU intensiva, un proceso por núcleo
+        hilos_por_proceso = max(1, NUCLEOS // MAX_TRANSCRIPCIONES)
+        # Cada proceso carga sus propios modelos: el presupuesto total se reparte
+        presupuesto_por_proceso = PRESUPUESTO_MEMORIA_MB // MAX_TRANSCRIPCIONES
+        if presupuesto_por_proceso < memoria_precarga():
+            print(f"Aviso: {MAX_TRANSCRIPCIONES} procesos de Whisper con {presupuesto_por_proceso} MB "
+                  f"cada uno no alcanzan para WHISPER_MODELOS_PRECARGA ({memoria_precarga()} MB); "
+                  f"subir WHISPER_PRESUPUESTO_MB o bajar MAX_TRANSCRIPCIONES")
+        return ProcessPoolExecutor(
+            max_workers=MAX_TRANSCRIPCIONES,
+            mp_context=multiprocessing.get_context(INICIO_PROCESOS),
+            initializer=_inicializar_proceso_whisper,
+            initargs=(hilos_por_proceso, PRECARGAR_MODELOS, presupuesto_por_proceso)
+        )
+    if etapa == ETAPA_TRADUCCION:
+        return ThreadPoolExecutor(max_workers=MAX_TRADUCCIONES, thread_name_prefix='traduccion')
+    raise ValueError(f"Etapa desconocida: {etapa}")
+
+def obtener_ejecutor(etapa: str) -> Executor:
+    """
+    Obtener (o crear) el ejecutor de una etapa del pipeline.
+
+    Args:
+        etapa: Nombre de la etapa (descarga, transcripcion, traduccion)
+
+    Returns:
+        Ejecutor asociado a la etapa
+    """
+    if etapa not in _ejecutores:
+        _ejecutores[etapa] = _crear_ejecutor(etapa)
+    return _ejecutores[etapa]
+
+async def ejecutar_en_etapa(etapa: str, funcion: Callable, *args, **kwargs) -> Any:
+    """
+    Ejecutar una función bloqueante en el pool de su etapa sin bloquear el event loop.
+
+    En las etapas con hilos la función conserva la traza de la petición
+    (tramos y perfilado, ver `metricas.py`); en procesos se mide desde afuera.
+
+    Args:
+        etapa: Nombre de la etapa (descarga, transcripcion, traduccion)
+        funcion: Función a ejecutar (debe ser serializable si la etapa usa procesos)
+        *args, **kwargs: Argumentos de la función
+
+    Returns:
+        Resultado de la función
+    """
+    loop = asyncio.get_running_loop()
+    ejecutor = obtener_ejecutor(etapa)
+    llamada = partial(funcion, *args, **kwargs)
+    if isinstance(ejecutor, ThreadPoolExecutor):
+        llamada = en_contexto(llamada)
+    return await loop.run_in_executor(ejecutor, llamada)
+
+def cerrar_ejecutores():
+    """Cerrar todos los ejecutores (al apagar la aplicación)."""
+    for ejecutor in _ejecutores.values():
+        ejecutor.shutdown(wait=False, cancel_futures=True)
+    _ejecutores.clear()
@@ -0,0 +1,70 @@
+"""
+Configuración de gunicorn para producción (Linux): un worker de uvicorn con los
+modelos Whisper cargados en el proceso maestro antes del fork.
+
+Siempre un solo worker: la cola de trabajos (`trabajos.py`), la coalescencia
+de peticiones (`vuelo_unico.py`) y las transmisiones SSE viven en memoria del
+proceso. Con varios workers cada uno recuperaría los mismos trabajos
+pendientes al arrancar, un cliente SSE podría esperar un trabajo que corre
+en otro worker y cada worker crearía su propio pool de Whisper (workers ×
+núcleos procesos). Para escalar se amplían los pools por etapa de
+`ejecutores.py` (MAX_TRANSCRIPCIONES, MAX_DESCARGAS, MAX_TRADUCCIONES): la
+transcripción ya corre en un pool de procesos.
+
+Con `preload_app` el maestro importa la app y, si WHISPER_PRECARGA_MAESTRO=1,
+carga los pesos de WHISPER_MODELOS_PRECARGA antes de crear el worker con
+fork: las páginas de los pesos quedan compartidas (copy-on-write) con los
+procesos de Whisper que crea el worker (WHISPER_INICIO_PROCESOS=fork) y con
+el worker que gunicorn levanta si el anterior muere. El calentamiento
+(primera inferencia) ocurre después del fork.
+
+Uso:
+    pip install gunicorn
+    gunicorn -c gunicorn_conf.py app:app
+
+Para medir import, RSS y memoria compartida por proceso creado con fork:
+    python -m benchmarks.bench_arranque --workers 4
+"""
+import os
+import time
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Fijo: el estado de trabajos y transmisiones es por proceso (ver arriba)
+workers = 1
+worker_class = 'uvicorn.workers.UvicornWorker'
+# Importar la app en el maestro: los workers heredan módulos y modelos ya cargados
+preload_app = True
+# Una canción puede tardar varios minutos en el endpoint síncrono
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '900'))
+
+# Cargar los pesos de Whisper en el maestro, antes del fork
+PRECARGA_MAESTRO = os.getenv('WHISPER_PRECARGA_MAESTRO', '1') == '1'
+
+def _hilos_torch(hilos: int):
+    """Fijar los hilos de PyTorch (sólo con el motor openai: faster-whisper no lo usa)."""
+    from transcriber.motores import MOTOR_WHISPER
+    if MOTOR_WHISPER == 'openai':
+        import torch
+        torch.set_num_threads(hilos)
+
+def on_starting(server):
+    """Cargar los modelos en el maestro (sin inferencia: sin hilos de OpenMP antes del fork)."""
+    if os.getenv('WEB_CONCURRENCY', '1') != '1':
+        server.log.warning("WEB_CONCURRENCY se ignora: se usa un solo worker; "
+                           "para escalar ampliar MAX_TRANSCRIPCIONES y los demás pools por etapa")
+    if not PRECARGA_MAESTRO:
+        return
+    from transcriber.whisper_transcriber import cargar_modelos
+
+    # Un solo hilo de cómputo mientras se cargan los pesos: un pool de OpenMP
+    # creado en el maestro no sobrevive al fork y puede bloquear a los hijos
+    _hilos_torch(1)
+    inicio = time.perf_counter()
+    modelos = cargar_modelos()
+    server.log.info(f"Modelos cargados antes del fork: {', '.join(modelos)} "
+                    f"({time.perf_counter() - inicio:.1f} s)")
+
+def post_fork(server, worker):
+    """Devolver al worker todos los núcleos (los procesos de Whisper fijan los suyos)."""
+    if PRECARGA_MAESTRO:
+        _hilos_torch(os.cpu_count() or 1)
@@ -0,0 +1,218 @@
+"""
+Huellas acústicas para reconocer resubidas de una misma canción.
+
+La misma canción aparece bajo muchas URLs (videos con letra, resubidas,
+espejos). Con una huella compacta del audio decodificado se reconoce una
+grabación ya transcrita y se reutiliza su letra en lugar de pasar otra vez
+por Whisper.
+
+La huella sigue el esquema de Chromaprint / Haitsma-Kalker: un entero de 32
+bits cada 125 ms, con el signo de la diferencia de energía entre 33 bandas
+vecinas (300-2000 Hz) y el tramo anterior. Es robusta a cambios de volumen,
+recompresión y ruido moderado; dos audios se comparan por la proporción de
+bits distintos una vez alineados.
+
+Para buscar candidatos sin recorrer todas las huellas se indexa una muestra
+de los enteros, elegida por su contenido (la misma en cualquier copia).
+
+Desactivado por defecto (HUELLAS_AUDIO=0): las huellas son un derivado del
+audio original y la política del proyecto es no conservar nada del audio.
+"""
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+FRECUENCIA_MUESTREO = 16000
+
+# Calcular huellas y buscar resubidas antes de transcribir
+HUELLAS_ACTIVADAS = os.getenv('HUELLAS_AUDIO', '0') == '1'
+# Proporción máxima de bits distintos para considerar que es la misma grabación
+# (audios distintos rondan 0.5)
+UMBRAL_BITS_DISTINTOS = float(os.getenv('HUELLAS_UMBRAL', '0.35'))
+
+# Tramos de 256 ms cada 125 ms (8 enteros por segundo)
+MUESTRAS_VENTANA = 4096
+MUESTRAS_SALTO = 2000
+SEGUNDOS_POR_ENTERO = MUESTRAS_SALTO / FRECUENCIA_MUESTREO
+BANDAS_HZ = (300, 2000)
+TRAMOS_POR_BLOQUE = 1000
+
+# Índice: bits de las bandas graves (las más estables) de uno de cada 8 enteros
+MASCARA_INDICE = (1 << 20) - 1
+MUESTREO_INDICE = 8
+# Solapamiento mínimo entre dos huellas para compararlas
+MIN_SEGUNDOS_SOLAPADOS = 20
+# Candidatos (mejores alineaciones por votos) que se verifican bit a bit
+MAX_CANDIDATOS = 5
+
+_estadisticas: Dict[str, float] = {'calculadas': 0, 'coincidencias': 0, 'segundos': 0.0}
+
+def _limites_bandas() -> np.ndarray:
+    """Índices de FFT que delimitan 33 bandas logarítmicas entre BANDAS_HZ."""
+    frecuencias = np.geomspace(BANDAS_HZ[0], BANDAS_HZ[1], 34)
+    return np.round(frecuencias * MUESTRAS_VENTANA / FRECUENCIA_MUESTREO).astype(int)
+
+def calcular_huella(audio: np.ndarray) -> np.ndarray:
+    """
+    Calcular la huella de un audio.
+
+    Args:
+        audio: Muestras PCM float32 mono 16 kHz
+
+    Returns:
+        Array uint32 con un entero cada `SEGUNDOS_POR_ENTERO` segundos
+    """
+    n_tramos = max(0, (len(audio) - MUESTRAS_VENTANA) // MUESTRAS_SALTO + 1)
+    if n_tramos < 2:
+        return np.zeros(0, dtype=np.uint32)
+
+    limites = _limites_bandas()
+    hann = np.hanning(MUESTRAS_VENTANA).astype(np.float32)
+    energias = np.empty((n_tramos, 33), dtype=np.float32)
+    for desde in range(0, n_tramos, TRAMOS_POR_BLOQUE):
+        hasta = min(desde + TRAMOS_POR_BLOQUE, n_tramos)
+        indices = (np.arange(desde, hasta)[:, None] * MUESTRAS_SALTO + np.arange(MUESTRAS_VENTANA))
+        espectro = np.abs(np.fft.rfft(audio[indices] * hann, axis=1)).astype(np.float32) ** 2
+        # Suma por banda con sumas acumuladas (33 bandas contiguas)
+        acumulado = np.cumsum(espectro[:, limites[0]:limites[-1]], axis=1)
+        acumulado = np.concatenate([np.zeros((len(acumulado), 1), np.float32), acumulado], axis=1)
+        energias[desde:hasta] = np.diff(acumulado[:, limites - limites[0]], axis=1)
+
+    # Bit m del tramo n: (E[n,m] - E[n,m+1]) - (E[n-1,m] - E[n-1,m+1]) > 0
+    diferencias = energias[:, :-1] - energias[:, 1:]
+    bits = (diferencias[1:] - diferencias[:-1]) > 0
+    pesos = (1 << np.arange(32, dtype=np.uint64))
+    return (bits.astype(np.uint64) @ pesos).astype(np.uint32)
+
+def codificar_huella(huella: np.ndarray) -> bytes:
+    """Huella como bytes (uint32 little-endian, 4 bytes por cada 125 ms)."""
+    return huella.astype('<u4').tobytes()
+
+def decodificar_huella(datos: bytes) -> np.ndarray:
+    """Decodificar una huella guardada."""
+    return np.frombuffer(datos, dtype='<u4')
+
+def entradas_indice(huella: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Muestra de la huella que se indexa: (clave, posición).
+
+    La muestra depende sólo del valor de cada clave, así dos copias de la
+    misma grabación indexan las mismas claves aunque empiecen en otro punto.
+    """
+    claves = huella & MASCARA_INDICE
+    # Mezclar los bits antes de elegir la muestra (multiplicación de Knuth)
+    elegidas = ((claves.astype(np.uint64) * 2654435761) >> 16) % MUESTREO_INDICE == 0
+    posiciones = np.nonzero(elegidas)[0]
+    return [(int(claves[p]), int(p)) for p in posiciones]
+
+def proporcion_bits_distintos(a: np.ndarray, b: np.ndarray, desplazamiento: int) -> Tuple[float, int]:
+    """
+    Comparar dos huellas con `b` desplazada (`a[i]` contra `b[i + desplazamiento]`).
+
+    Returns:
+        Tupla (proporción de bits distintos, enteros solapados)
+    """
+    inicio_a = max(0, -desplazamiento)
+    fin_a = min(len(a), len(b) - desplazamiento)
+    if fin_a <= inicio_a:
+        return 1.0, 0
+    distintos = np.bitwise_xor(a[inicio_a:fin_a], b[inicio_a + desplazamiento:fin_a + desplazamiento])
+    bits = np.unpackbits(distintos.view(np.uint8)).sum()
+    return float(bits) / (32 * (fin_a - inicio_a)), fin_a - inicio_a
+
+def buscar_duplicado(huella: np.ndarray) -> Optional[Dict[str, Any]]:
+    """
+    Buscar una transcripción guardada de la misma grabación.
+
+    Los candidatos salen del índice por votos (misma transcripción con el
+    mismo desplazamiento); los mejores se verifican comparando las huellas
+    completas alineadas.
+
+    Args:
+        huella: Huella del audio nuevo
+
+    Returns:
+        {transcription_id, desplazamiento_segundos, bits_distintos} o None.
+        `desplazamiento_segundos` es lo que hay que sumar a los tiempos
+        guardados para que coincidan con el audio nuevo.
+    """
+    from database import buscar_en_indice_huellas, obtener_huella
+
+    entradas = entradas_indice(huella)
+    if not entradas:
+        return None
+    posiciones_consulta: Dict[int, List[int]] = {}
+    for clave, posicion in entradas:
+        posiciones_consulta.setdefault(clave, []).append(posicion)
+
+    votos: Counter = Counter()
+    for clave, id_transcripcion, posicion in buscar_en_indice_huellas(list(posiciones_consulta)):
+        for posicion_consulta in posiciones_consulta[clave]:
+            votos[(id_transcripcion, posicion - posicion_consulta)] += 1
+
+    min_solapados = MIN_SEGUNDOS_SOLAPADOS / SEGUNDOS_POR_ENTERO
+    mejor = None
+    for (id_transcripcion, desplazamiento), cantidad in votos.most_common(MAX_CANDIDATOS):
+        if cantidad < 2:
+            break
+        datos = obtener_huella(id_transcripcion)
+        if datos is None:
+            continue
+        guardada = decodificar_huella(datos)
+        # Tolerar un tramo de diferencia en la alineación
+        for ajuste in (-1, 0, 1):
+            distintos, solapados = proporcion_bits_distintos(huella, guardada, desplazamiento + ajuste)
+            minimo = min(min_solapados, 0.5 * min(len(huella), len(guardada)))
+            if solapados >= minimo and distintos <= UMBRAL_BITS_DISTINTOS:
+                if mejor is None or distintos < mejor['bits_distintos']:
+                    mejor = {
+                        'transcription_id': id_transcripcion,
+                        # Un instante t de la guardada está en t - desplazamiento en la nueva
+                        'desplazamiento_segundos': -(desplazamiento + ajuste) * SEGUNDOS_POR_ENTERO,
+                        'bits_distintos': round(distintos, 3),
+                    }
+    return mejor
+
+def identificar_audio(audio: Union[np.ndarray, Path]) -> Tuple[np.ndarray, Optional[Dict[str, Any]]]:
+    """
+    Calcular la huella de un audio y buscar una grabación ya transcrita.
+
+    Args:
+        audio: PCM float32 mono 16 kHz o ruta a un archivo de audio
+
+    Returns:
+        Tupla (huella, duplicado de `buscar_duplicado` o None)
+    """
+    inicio = time.perf_counter()
+    if isinstance(audio, Path):
+        from downloader import decodificar_pcm
+        audio = decodificar_pcm(str(audio))
+    huella = calcular_huella(audio)
+    duplicado = buscar_duplicado(huella)
+    _estadisticas['calculadas'] += 1
+    _estadisticas['segundos'] += time.perf_counter() - inicio
+    if duplicado:
+        _estadisticas['coincidencias'] += 1
+    return huella, duplicado
+
+def registrar_huella(id_transcripcion: int, huella: np.ndarray):
+    """Guardar la huella de una transcripción nueva y sus entradas de índice."""
+    from database import guardar_huella
+
+    if len(huella):
+        guardar_huella(id_transcripcion, codificar_huella(huella), entradas_indice(huella))
+
+def estadisticas_huellas() -> Dict[str, Any]:
+    """Huellas calculadas, resubidas reconocidas (tasa de aciertos) y costo medio por canción."""
+    calculadas = _estadisticas['calculadas']
+    return {
+        'activadas': HUELLAS_ACTIVADAS,
+        'calculadas': int(calculadas),
+        'coincidencias': int(_estadisticas['coincidencias']),
+        'tasa_aciertos': round(_estadisticas['coincidencias'] / calculadas, 3) if calculadas else 0.0,
+        'ms_por_cancion': round(1000 * _estadisticas['segundos'] / calculadas, 1) if calculadas else 0.0,
+    }
@@ -0,0 +1,171 @@
+"""
+Ingesta masiva: playlists y listas de URLs como lotes de trabajos.
+Cada URL nueva se convierte en un trabajo de la cola persistente (`trabajos.py`),
+así el lote se procesa con los mismos límites por etapa que el resto y se
+retoma solo si el proceso se reinicia.
+
+Uso por línea de comandos:
+    python ingesta.py https://www.youtube.com/playlist?list=... --idioma es
+    python ingesta.py --archivo urls.txt --idioma en
+    python ingesta.py --reanudar <batch_id>
+"""
+import asyncio
+import uuid
+from typing import Any, Dict, List, Optional
+
+from database import buscar_por_url, crear_lote as registrar_lote, obtener_lote
+from ejecutores import ETAPA_DESCARGA, ejecutar_en_etapa
+from trabajos import ESTADO_EN_COLA, ESTADO_EN_PROCESO, ESTADO_ERROR, ESTADOS_FINALES, poner_en_cola
+from urls import clave_video
+
+def leer_archivo_urls(ruta: str) -> List[str]:
+    """
+    Leer una URL por línea (se ignoran líneas vacías y comentarios con #).
+
+    Args:
+        ruta: Ruta del archivo de texto
+
+    Returns:
+        Lista de URLs
+    """
+    with open(ruta, encoding='utf-8') as archivo:
+        return [
+            linea.strip() for linea in archivo
+            if linea.strip() and not linea.lstrip().startswith('#')
+        ]
+
+async def crear_lote(
+    fuentes: List[str],
+    idioma_destino: str,
+    modelo: Optional[str] = None,
+    descripcion: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Expandir playlists, descartar URLs ya procesadas y encolar el resto como un lote.
+
+    Args:
+        fuentes: URLs de videos y/o playlists
+        idioma_destino: Código de idioma destino (es, en, pt)
+        modelo: Modelo Whisper (None = WHISPER_MODEL)
+        descripcion: Origen del lote para mostrar (por defecto, las fuentes)
+
+    Returns:
+        Estado del lote (ver `consultar_lote`)
+    """
+    from downloader import expandir_playlist
+
+    # Las playlists se leen en el pool de descargas (yt-dlp hace peticiones de red)
+    expandidas = await asyncio.gather(*(
+        ejecutar_en_etapa(ETAPA_DESCARGA, expandir_playlist, fuente) for fuente in fuentes
+    ))
+
+    urls = []
+    vistas = set()
+    omitidas = 0
+    for url in (url for lista in expandidas for url in lista):
+        clave = clave_video(url)
+        # Repetida en el lote o ya guardada en `lyrics` para este idioma
+        if clave in vistas or buscar_por_url(url, idioma_destino):
+            omitidas += 1
+            continue
+        vistas.add(clave)
+        urls.append(url)
+
+    id_lote = uuid.uuid4().hex
+    trabajos = [(uuid.uuid4().hex, url) for url in urls]
+    registrar_lote(
+        id_lote, descripcion or ' '.join(fuentes), idioma_destino,
+        trabajos, omitidas, ESTADO_EN_COLA, modelo
+    )
+    await poner_en_cola([id_trabajo for id_trabajo, _ in trabajos])
+    return consultar_lote(id_lote)
+
+def consultar_lote(id_lote: str) -> Optional[Dict[str, Any]]:
+    """
+    Consultar el avance y el rendimiento de un lote.
+
+    Args:
+        id_lote: Identificador del lote
+
+    Returns:
+        Estado público del lote o None si no existe
+    """
+    lote = obtener_lote(id_lote)
+    if lote is None:
+        return None
+
+    estados = lote['estados']
+    terminados = sum(estados.get(estado, 0) for estado in ESTADOS_FINALES)
+    segundos = lote['segundos']
+    return {
+        'batch_id': lote['id'],
+        'source': lote['source'],
+        'target_lang': lote['target_lang'],
+        'model': lote['model'],
+        'total': lote['total'],
+        'skipped': lote['skipped'],
+        'queued': estados.get(ESTADO_EN_COLA, 0),
+        'running': estados.get(ESTADO_EN_PROCESO, 0),
+        'done': terminados - estados.get(ESTADO_ERROR, 0),
+        'error': estados.get(ESTADO_ERROR, 0),
+        'finished': terminados == lote['total'],
+        'elapsed_seconds': round(segundos, 1),
+        'songs_per_hour': round(terminados / segundos * 3600, 1) if segundos > 0 else 0.0,
+    }
+
+async def _ejecutar_cli(args):
+    """Procesar un lote en este proceso, mostrando el avance hasta que termina."""
+    from database import inicializar_base_datos, cerrar_conexiones
+    from ejecutores import cerrar_ejecutores
+    from trabajos import iniciar_trabajadores, detener_trabajadores
+
+    inicializar_base_datos()
+    # Retoma también los trabajos pendientes de ejecuciones anteriores
+    await iniciar_trabajadores()
+    try:
+        if args.reanudar:
+            lote = consultar_lote(args.reanudar)
+            if lote is None:
+                raise SystemExit(f"Lote no encontrado: {args.reanudar}")
+        else:
+            fuentes = list(args.urls)
+            if args.archivo:
+                fuentes += leer_archivo_urls(args.archivo)
+            if not fuentes:
+                raise SystemExit("Indica URLs, una playlist o --archivo")
+            lote = await crear_lote(fuentes, args.idioma, args.modelo, args.archivo)
+            print(f"Lote {lote['batch_id']}: {lote['total']} canciones "
+                  f"({lote['skipped']} omitidas por estar ya guardadas o repetidas)")
+
+        while not lote['finished']:
+            await asyncio.sleep(args.intervalo)
+            lote = consultar_lote(lote['batch_id'])
+            print(f"[{lote['elapsed_seconds']:7.0f}s] listas {lote['done']}/{lote['total']} | "
+                  f"errores {lote['error']} | en proceso {lote['running']} | "
+                  f"{lote['songs_per_hour']} canciones/h")
+        print(f"Lote {lote['batch_id']} terminado: {lote['done']} listas, {lote['error']} con error, "
+              f"{lote['elapsed_seconds']:.0f}s ({lote['songs_per_hour']} canciones/h)")
+    finally:
+        await detener_trabajadores()
+        cerrar_ejecutores()
+        cerrar_conexiones()
+
+def main():
+    import argparse
+    from transcriber.whisper_transcriber import MODELOS_PERMITIDOS
+
+    parser = argparse.ArgumentParser(description="Ingesta masiva de playlists y listas de URLs")
+    parser.add_argument('urls', nargs='*', help="URLs de videos o playlists")
+    parser.add_argument('--archivo', help="Archivo con una URL por línea")
+    parser.add_argument('--idioma', default='es', choices=['es', 'en', 'pt'], help="Idioma destino")
+    # Los mismos modelos que acepta POST /batches: un error de tipeo falla aquí y no en cada trabajo
+    parser.add_argument('--modelo', choices=MODELOS_PERMITIDOS,
+                        help="Modelo Whisper (por defecto WHISPER_MODEL)")
+    parser.add_argument('--reanudar', metavar='BATCH_ID', help="Seguir un lote interrumpido")
+    parser.add_argument('--intervalo', type=float, default=10, help="Segundos entre reportes de avance")
+    args = parser.parse_args()
+
+    asyncio.run(_ejecutar_cli(args))
+
+if __name__ == "__main__":
+    main()
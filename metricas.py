@@ -0,0 +1,356 @@
+"""
+Métricas y trazas por etapa del pipeline.
+
+- Histogramas y contadores en memoria, expuestos en formato de texto de
+  Prometheus por `GET /metrics` (sin dependencias externas).
+- Trazas por petición: cada etapa (`tramo`) registra su duración y atributos
+  (bytes por segundo, factor de tiempo real, servicio de traducción, aciertos
+  de cache) y al terminar se registra una línea JSON con todos los tramos en
+  el logger `lyricsnatcher.trazas` (formato `FormatoJSON`).
+- Perfilado opcional por petición con cProfile (PERFILES_DIRECTORIO): un
+  archivo .prof por petición, con los hilos de descarga y traducción
+  incluidos. Para Whisper (otro proceso) ver `py-spy` en el README.
+"""
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Registrar una línea JSON por petición con sus tramos
+TRAZAS_LOG = os.getenv('TRAZAS_LOG', '1') == '1'
+# Directorio para los perfiles de cProfile (vacío = perfilado desactivado)
+PERFILES_DIRECTORIO = os.getenv('PERFILES_DIRECTORIO', '')
+
+class FormatoJSON(logging.Formatter):
+    """
+    Un objeto JSON por línea: hora, nivel, logger, mensaje y los campos
+    pasados en `extra={'campos': {...}}`, para que los recolectores de logs
+    los indexen sin parsear texto.
+    """
+
+    def format(self, registro: logging.LogRecord) -> str:
+        datos = {
+            'hora': self.formatTime(registro),
+            'nivel': registro.levelname,
+            'logger': registro.name,
+            'mensaje': registro.getMessage(),
+            **getattr(registro, 'campos', {}),
+        }
+        if registro.exc_info:
+            datos['excepcion'] = self.formatException(registro.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+registro_trazas = logging.getLogger('lyricsnatcher.trazas')
+# Sin manejadores propios (la aplicación no configuró este logger): JSON a stdout
+if TRAZAS_LOG and not registro_trazas.handlers:
+    _manejador = logging.StreamHandler(sys.stdout)
+    _manejador.setFormatter(FormatoJSON())
+    registro_trazas.addHandler(_manejador)
+    registro_trazas.setLevel(logging.INFO)
+    registro_trazas.propagate = False
+
+BUCKETS_SEGUNDOS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+class Contador:
+    """Contador monótono con etiquetas."""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._bloqueo = threading.Lock()
+
+    def incrementar(self, cantidad: float = 1, **etiquetas: str):
+        clave = tuple(str(etiquetas[e]) for e in self.etiquetas)
+        with self._bloqueo:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def exponer(self) -> List[str]:
+        with self._bloqueo:
+            valores = dict(self._valores)
+        return [
+            f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+            for clave, valor in sorted(valores.items())
+        ]
+
+    def resumen(self) -> Dict[str, float]:
+        """Valor por combinación de etiquetas (valores unidos con '/')."""
+        with self._bloqueo:
+            return {'/'.join(clave): valor for clave, valor in self._valores.items()}
+
+class Histograma:
+    """Histograma acumulativo con etiquetas (buckets fijos, como Prometheus)."""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        # Por combinación de etiquetas: [cuentas por bucket..., suma, cantidad]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._bloqueo = threading.Lock()
+
+    def observar(self, valor: float, **etiquetas: str):
+        clave = tuple(str(etiquetas[e]) for e in self.etiquetas)
+        with self._bloqueo:
+            serie = self._series.setdefault(clave, [0] * (len(self.buckets) + 2))
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def exponer(self) -> List[str]:
+        with self._bloqueo:
+            series = {clave: list(serie) for clave, serie in self._series.items()}
+        lineas = []
+        for clave, serie in sorted(series.items()):
+            for limite, cuenta in zip(self.buckets, serie):
+                etiquetas = _etiquetas(self.etiquetas + ('le',), clave + (_numero(limite),))
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {_numero(cuenta)}")
+            etiquetas = _etiquetas(self.etiquetas + ('le',), clave + ('+Inf',))
+            lineas.append(f"{self.nombre}_bucket{etiquetas} {_numero(serie[-1])}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(serie[-2])}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {_numero(serie[-1])}")
+        return lineas
+
+    def resumen(self) -> Dict[str, Dict[str, float]]:
+        """Cantidad y promedio por combinación de etiquetas (valores unidos con '/')."""
+        with self._bloqueo:
+            return {
+                '/'.join(clave): {'cantidad': int(serie[-1]), 'promedio': serie[-2] / serie[-1]}
+                for clave, serie in self._series.items() if serie[-1]
+            }
+
+def _etiquetas(nombres: Sequence[str], valores: Sequence[str]) -> str:
+    if not nombres:
+        return ''
+    pares = ','.join(
+        f'{nombre}="{valor.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for nombre, valor in zip(nombres, valores)
+    )
+    return '{' + pares + '}'
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+# Métricas del pipeline
+ETAPA_SEGUNDOS = Histograma(
+    'lyricsnatcher_etapa_segundos', 'Duración de cada etapa del pipeline', ['etapa']
+)
+PETICION_SEGUNDOS = Histograma(
+    'lyricsnatcher_peticion_segundos', 'Duración total de procesar una canción', ['resultado']
+)
+DESCARGA_BYTES_POR_SEGUNDO_ESTIMADOS = Histograma(
+    'lyricsnatcher_descarga_bytes_por_segundo_estimados',
+    'Velocidad de descarga estimada (tamaño informado por el sitio / duración de la etapa)', [],
+    buckets=(1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7, 5e7, 1e8)
+)
+AUDIO_SEGUNDOS = Histograma(
+    'lyricsnatcher_audio_segundos', 'Duración del audio transcrito', [],
+    buckets=(30, 60, 120, 180, 240, 300, 420, 600, 900, 1800, 3600, 7200)
+)
+FACTOR_TIEMPO_REAL = Histograma(
+    'lyricsnatcher_factor_tiempo_real', 'Segundos de inferencia por segundo de audio', ['modelo'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+)
+TRADUCCION_SEGUNDOS = Histograma(
+    'lyricsnatcher_traduccion_segundos', 'Latencia de cada servicio de traducción', ['servicio', 'resultado']
+)
+CACHE_CONSULTAS = Contador(
+    'lyricsnatcher_cache_consultas_total', 'Consultas a caches y su resultado', ['cache', 'resultado']
+)
+
+_METRICAS = [
+    ETAPA_SEGUNDOS, PETICION_SEGUNDOS, DESCARGA_BYTES_POR_SEGUNDO_ESTIMADOS, AUDIO_SEGUNDOS,
+    FACTOR_TIEMPO_REAL, TRADUCCION_SEGUNDOS, CACHE_CONSULTAS,
+]
+
+def exponer_metricas() -> str:
+    """Todas las métricas en formato de texto de Prometheus (versión 0.0.4)."""
+    lineas = []
+    for metrica in _METRICAS:
+        lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+        lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+        lineas.extend(metrica.exponer())
+    return '\n'.join(lineas) + '\n'
+
+def registrar_cache(cache: str, acierto: bool, cantidad: int = 1):
+    """Contar consultas a una cache (letra, transcripción, metadatos, huella, memoria...)."""
+    if cantidad:
+        CACHE_CONSULTAS.incrementar(cantidad, cache=cache, resultado='acierto' if acierto else 'fallo')
+        traza = _traza_actual.get()
+        if traza is not None:
+            traza.anotar(f"cache_{cache}", 'acierto' if acierto else 'fallo')
+
+def registrar_servicio_traduccion(servicio: str, segundos: float, exito: bool):
+    """Medir una llamada a un servicio de traducción (libretranslate, argos)."""
+    TRADUCCION_SEGUNDOS.observar(segundos, servicio=servicio, resultado='ok' if exito else 'error')
+    traza = _traza_actual.get()
+    if traza is not None:
+        traza.agregar({
+            'etapa': f"servicio_{servicio}",
+            'segundos': round(segundos, 4),
+            'resultado': 'ok' if exito else 'error',
+        })
+        if exito:
+            traza.anotar('servicio_traduccion', servicio)
+
+class Traza:
+    """Tramos de una petición (una canción) y, si se pidió, sus perfiles de cProfile."""
+
+    def __init__(self, nombre: str, atributos: Dict[str, Any], perfilar: bool = False):
+        self.id = uuid.uuid4().hex[:12]
+        self.nombre = nombre
+        self.atributos = dict(atributos)
+        self.tramos: List[Dict[str, Any]] = []
+        self.perfilar = perfilar
+        self.perfiles: List[cProfile.Profile] = []
+        self._bloqueo = threading.Lock()
+        self._inicio = time.perf_counter()
+
+    def agregar(self, tramo: Dict[str, Any]):
+        with self._bloqueo:
+            self.tramos.append(tramo)
+
+    def anotar(self, clave: str, valor: Any):
+        with self._bloqueo:
+            self.atributos[clave] = valor
+
+    @property
+    def segundos(self) -> float:
+        return time.perf_counter() - self._inicio
+
+_traza_actual: contextvars.ContextVar[Optional[Traza]] = contextvars.ContextVar('traza', default=None)
+
+@contextmanager
+def tramo(etapa: str, **atributos: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Medir una etapa: duración en `lyricsnatcher_etapa_segundos` y tramo en la traza actual.
+
+    Yields:
+        Diccionario del tramo: al salir incluye `segundos`, y lo que se le
+        agregue (durante la etapa o después) aparece en la línea de la traza
+    """
+    datos = {'etapa': etapa, **atributos}
+    inicio = time.perf_counter()
+    try:
+        yield datos
+    except BaseException as e:
+        datos['error'] = type(e).__name__
+        raise
+    finally:
+        segundos = time.perf_counter() - inicio
+        datos['segundos'] = round(segundos, 4)
+        ETAPA_SEGUNDOS.observar(segundos, etapa=etapa)
+        traza = _traza_actual.get()
+        if traza is not None:
+            traza.agregar(datos)
+
+@contextmanager
+def traza_peticion(nombre: str, perfilar: bool = False, **atributos: Any) -> Iterator[Traza]:
+    """
+    Abrir la traza de una petición: al salir se mide la duración total, se
+    registra la línea JSON (TRAZAS_LOG) y se guarda el perfil si se pidió.
+
+    Args:
+        nombre: Nombre de la operación (aparece en el log y en el archivo de perfil)
+        perfilar: Perfilar con cProfile (sólo si PERFILES_DIRECTORIO está configurado)
+        **atributos: Datos de la petición (URL, idioma...)
+    """
+    traza = Traza(nombre, atributos, perfilar and bool(PERFILES_DIRECTORIO))
+    token = _traza_actual.set(traza)
+    resultado = 'ok'
+    try:
+        with perfilado():
+            yield traza
+    except BaseException:
+        resultado = 'error'
+        raise
+    finally:
+        _traza_actual.reset(token)
+        segundos = traza.segundos
+        PETICION_SEGUNDOS.observar(segundos, resultado=resultado)
+        if traza.perfiles:
+            traza.anotar('perfil', str(_guardar_perfil(traza)))
+        if TRAZAS_LOG:
+            registro_trazas.info(traza.nombre, extra={'campos': {
+                'traza': traza.id,
+                'nombre': traza.nombre,
+                'resultado': resultado,
+                'segundos': round(segundos, 3),
+                **traza.atributos,
+                'tramos': traza.tramos,
+            }})
+
+_hilo_perfilado = threading.local()
+
+@contextmanager
+def perfilado() -> Iterator[None]:
+    """
+    Perfilar el hilo actual con cProfile si la traza actual lo pidió.
+
+    En el hilo del event loop el perfil incluye lo que hagan otras peticiones
+    mientras tanto; si ya hay un perfil activo en el hilo no se abre otro.
+    """
+    traza = _traza_actual.get()
+    if traza is None or not traza.perfilar or getattr(_hilo_perfilado, 'activo', False):
+        yield
+        return
+    perfil = cProfile.Profile()
+    try:
+        perfil.enable()
+    except ValueError:
+        # Otro perfilador activo (p. ej. en Python 3.12+ con varios hilos)
+        yield
+        return
+    _hilo_perfilado.activo = True
+    try:
+        yield
+    finally:
+        perfil.disable()
+        _hilo_perfilado.activo = False
+        with traza._bloqueo:
+            traza.perfiles.append(perfil)
+
+def en_contexto(funcion: Callable) -> Callable:
+    """
+    Envolver una función para otro hilo conservando la traza actual (los
+    ejecutores de hilos no copian el contexto) y perfilándola si corresponde.
+    """
+    contexto = contextvars.copy_context()
+
+    def envoltura():
+        def ejecutar():
+            with perfilado():
+                return funcion()
+        return contexto.run(ejecutar)
+    return envoltura
+
+def _guardar_perfil(traza: Traza) -> Path:
+    """Unir los perfiles de la traza (event loop e hilos) en un archivo .prof."""
+    directorio = Path(PERFILES_DIRECTORIO)
+    directorio.mkdir(parents=True, exist_ok=True)
+    nombre = re.sub(r'[^A-Za-z0-9_-]+', '_', traza.nombre)
+    ruta = directorio / f"{time.strftime('%Y%m%d-%H%M%S')}-{nombre}-{traza.id}.prof"
+    estadisticas = pstats.Stats(traza.perfiles[0])
+    for perfil in traza.perfiles[1:]:
+        estadisticas.add(perfil)
+    estadisticas.dump_stats(str(ruta))
+    return ruta
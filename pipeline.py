@@ -0,0 +1,633 @@
+"""
+Pipeline de procesamiento de una canción: descarga → transcripción → traducción → guardado.
+Compartido por el endpoint síncrono y por el sistema de trabajos en cola.
+"""
+import asyncio
+import os
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from ejecutores import (
+    ETAPA_DESCARGA, ETAPA_TRANSCRIPCION, ETAPA_TRADUCCION, MAX_TRANSCRIPCIONES,
+    MODO_LOTES, MODO_TRANSCRIPCION, PRECARGAR_MODELOS, ejecutar_en_etapa, obtener_ejecutor
+)
+from huellas import FRECUENCIA_MUESTREO, HUELLAS_ACTIVADAS, identificar_audio, registrar_huella
+from metricas import (
+    AUDIO_SEGUNDOS, DESCARGA_BYTES_POR_SEGUNDO_ESTIMADOS, FACTOR_TIEMPO_REAL, registrar_cache, traza_peticion, tramo
+)
+from subtitulos import (
+    codificar_palabras, codificar_tiempos, decodificar_tiempos, desplazar_tiempos, lineas_con_tiempos
+)
+from urls import clave_desde_info, clave_video
+from vuelo_unico import GrupoVueloUnico
+
+# Etapas visibles para el cliente (estado de un trabajo)
+ETAPA_DESCARGANDO = 'downloading'
+ETAPA_TRANSCRIBIENDO = 'transcribing'
+ETAPA_TRADUCIENDO = 'translating'
+
+# Progreso aproximado al inicio de cada etapa (0.0 - 1.0)
+PROGRESO_ETAPA = {
+    ETAPA_DESCARGANDO: 0.05,
+    ETAPA_TRANSCRIBIENDO: 0.3,
+    ETAPA_TRADUCIENDO: 0.85,
+}
+
+# Coalescer también traducción y guardado por (URL, idioma destino)
+COALESCER_TRADUCCIONES = os.getenv('COALESCER_TRADUCCIONES', '1') == '1'
+
+# Descarga + Whisper: una sola vez por video (clave canónica) aunque lleguen muchas peticiones a la vez
+vuelos_transcripcion = GrupoVueloUnico('transcripcion')
+# Resultado completo: una sola vez por (URL, idioma destino)
+vuelos_resultado = GrupoVueloUnico('resultado')
+
+# Transmisión en vivo: fragmentos de audio cortados en silencios (uno por tarea
+# de Whisper) y líneas por llamada al traductor
+SEGUNDOS_FRAGMENTO_VIVO = float(os.getenv('VIVO_SEGUNDOS_FRAGMENTO', '30'))
+LINEAS_LOTE_VIVO = int(os.getenv('VIVO_LINEAS_LOTE', '4'))
+# Caracteres finales del fragmento anterior que condicionan al siguiente
+LARGO_CONTEXTO_VIVO = 400
+
+Notificador = Callable[[str, float], None]
+# Recibe (evento, datos) de la transmisión en vivo
+Emisor = Callable[[str, Dict[str, Any]], None]
+
+# Audio omitido por el VAD antes de Whisper (ver `transcriber/vad.py`)
+_estadisticas_vad: Dict[str, Any] = {'audios': 0, 'segundos_omitidos': 0.0}
+# Descargas evitadas porque los metadatos llevaron a una transcripción guardada
+_estadisticas_descarga: Dict[str, int] = {'evitadas': 0}
+
+# Preparación de los modelos al arrancar (readiness)
+_preparacion: Dict[str, Any] = {'listo': False, 'modelos': [], 'error': None}
+
+def estadisticas_coalescencia() -> Dict[str, Any]:
+    """Métricas de peticiones duplicadas colapsadas por etapa."""
+    return {
+        'transcripcion': vuelos_transcripcion.estadisticas(),
+        'resultado': vuelos_resultado.estadisticas(),
+    }
+
+def estadisticas_vad() -> Dict[str, Any]:
+    """Audios transcritos con VAD y segundos sin voz que no llegaron a Whisper."""
+    return {
+        'audios': _estadisticas_vad['audios'],
+        'segundos_omitidos': round(_estadisticas_vad['segundos_omitidos'], 1),
+    }
+
+def estadisticas_descargas() -> Dict[str, Any]:
+    """Sondeos de metadatos, aciertos de su cache, audios rechazados y descargas evitadas."""
+    from downloader import estadisticas_sondeo
+    return {**estadisticas_sondeo(), 'evitadas': _estadisticas_descarga['evitadas']}
+
+def estado_preparacion() -> Dict[str, Any]:
+    """Si los modelos ya están cargados y calientes, y cuáles."""
+    return dict(_preparacion)
+
+async def preparar_transcripcion():
+    """
+    Cargar y calentar los modelos de WHISPER_MODELOS_PRECARGA al arrancar.
+
+    En modo 'procesos' lanza una tarea por proceso para crear el pool completo;
+    cada proceso calienta sus modelos en el inicializador (ver `ejecutores.py`).
+    En modo 'lotes' los modelos viven en este proceso junto al planificador.
+    """
+    from transcriber.whisper_transcriber import (
+        MODELOS_PRECARGA, calentar_modelos, estadisticas_modelos
+    )
+
+    if not PRECARGAR_MODELOS:
+        _preparacion['listo'] = True
+        return
+
+    try:
+        if MODO_TRANSCRIPCION == MODO_LOTES:
+            from transcriber.planificador import obtener_planificador
+            modelos = await asyncio.to_thread(calentar_modelos)
+            await asyncio.to_thread(obtener_planificador)
+        else:
+            estados = await asyncio.gather(*(
+                ejecutar_en_etapa(ETAPA_TRANSCRIPCION, estadisticas_modelos)
+                for _ in range(MAX_TRANSCRIPCIONES)
+            ))
+            modelos = estados[0]['modelos']
+            for estado in estados:
+                faltantes = set(MODELOS_PRECARGA) - set(estado['modelos'])
+                if faltantes:
+                    raise Exception(f"No se pudieron cargar: {', '.join(sorted(faltantes))}")
+        _preparacion.update(listo=True, modelos=modelos, error=None)
+    except Exception as e:
+        _preparacion['error'] = str(e)
+
+def cerrar_transcripcion():
+    """
+    Detener el planificador de lotes al apagar (modo 'lotes').
+
+    Falla las ventanas que siguen en cola y suelta el modelo que retiene su
+    hilo. En modo 'procesos' no hace nada: los modelos viven en el pool de
+    transcripción, que cierra `cerrar_ejecutores`.
+    """
+    if MODO_TRANSCRIPCION == MODO_LOTES:
+        from transcriber.planificador import cerrar_planificador
+        cerrar_planificador()
+
+class LetraEnVivo:
+    """
+    Líneas de una canción a medida que se transcriben, con su traducción.
+
+    Cada línea nueva se emite enseguida como evento `segment`; una tarea
+    aparte las traduce en lotes de hasta LINEAS_LOTE_VIVO (lo pendiente en
+    ese momento) y emite cada traducción como evento `translation`, sin
+    frenar la transcripción del fragmento siguiente.
+    """
+
+    def __init__(self, idioma_destino: str, emitir: Emisor):
+        self.idioma_destino = idioma_destino
+        self.emitir = emitir
+        self.idioma_origen: Optional[str] = None
+        self.lineas: List[Dict[str, Any]] = []
+        self.traducciones: List[str] = []
+        self._nuevas = asyncio.Event()
+        self._terminado = False
+        self._tarea: Optional[asyncio.Task] = None
+
+    def agregar(self, segmentos: List[Dict[str, Any]], idioma_origen: str):
+        """Emitir las líneas de un fragmento recién transcrito y encolarlas para traducir."""
+        self.idioma_origen = self.idioma_origen or idioma_origen
+        for segmento in lineas_con_tiempos(segmentos):
+            self.emitir('segment', {
+                'index': len(self.lineas),
+                'start': round(segmento['start'], 2),
+                'end': round(segmento['end'], 2),
+                'text': segmento['text'],
+            })
+            self.lineas.append(segmento)
+        if self._tarea is None:
+            self._tarea = asyncio.ensure_future(self._traducir_pendientes())
+        self._nuevas.set()
+
+    async def _traducir_pendientes(self):
+        from translator import traducir_texto
+
+        while True:
+            desde = len(self.traducciones)
+            if desde < len(self.lineas):
+                textos = [linea['text'] for linea in self.lineas[desde:desde + LINEAS_LOTE_VIVO]]
+                traducido = await ejecutar_en_etapa(
+                    ETAPA_TRADUCCION, traducir_texto, '\n'.join(textos), self.idioma_origen, self.idioma_destino
+                )
+                traducidas = traducido.split('\n')
+                # El servicio unió o partió líneas: mantener una traducción por línea
+                if len(traducidas) > len(textos):
+                    traducidas = traducidas[:len(textos) - 1] + [' '.join(traducidas[len(textos) - 1:])]
+                traducidas += [''] * (len(textos) - len(traducidas))
+                for i, texto in enumerate(traducidas):
+                    self.emitir('translation', {'index': desde + i, 'text': texto})
+                self.traducciones.extend(traducidas)
+                continue
+            if self._terminado:
+                return
+            self._nuevas.clear()
+            await self._nuevas.wait()
+
+    def cancelar(self):
+        """Detener la tarea de traducción si la transmisión terminó antes de tiempo."""
+        if self._tarea is not None and not self._tarea.done():
+            self._tarea.cancel()
+
+    async def completar(self, transcripcion: Dict[str, Any]) -> str:
+        """
+        Terminar de traducir y devolver la traducción completa de `text_src`.
+
+        Si la transcripción no pasó por `agregar` (ya estaba guardada, la hizo
+        otra petición o es una resubida) se emiten ahora todas sus líneas.
+        """
+        from translator import traducir_texto
+
+        if not self.lineas and transcripcion['text_src']:
+            textos = transcripcion['text_src'].split('\n')
+            tiempos = (
+                decodificar_tiempos(transcripcion['segments']) if transcripcion.get('segments') else None
+            )
+            if tiempos is None or len(tiempos) != len(textos):
+                tiempos = [(0.0, 0.0)] * len(textos)
+            self.agregar([
+                {'start': float(inicio), 'end': float(fin), 'text': texto}
+                for texto, (inicio, fin) in zip(textos, tiempos)
+            ], transcripcion['language_src'])
+        self._terminado = True
+        self._nuevas.set()
+        if self._tarea is not None:
+            await self._tarea
+
+        if [linea['text'] for linea in self.lineas] == transcripcion['text_src'].split('\n'):
+            return '\n'.join(self.traducciones)
+        # Líneas vacías u otro orden: traducir el texto final (con memoria, sin llamadas nuevas)
+        return await ejecutar_en_etapa(
+            ETAPA_TRADUCCION, traducir_texto,
+            transcripcion['text_src'], transcripcion['language_src'], self.idioma_destino
+        )
+
+async def _transcribir_en_vivo(audio: Any, modelo: Optional[str], en_vivo: LetraEnVivo) -> Dict[str, Any]:
+    """
+    Transcribir en fragmentos de ~SEGUNDOS_FRAGMENTO_VIVO cortados en silencios,
+    en orden, entregando las líneas de cada uno a `en_vivo` apenas se decodifica.
+
+    Cada fragmento es una tarea del pool de Whisper (o del planificador de
+    lotes), con el idioma del primero y el final del texto anterior como
+    contexto, como hace Whisper entre sus ventanas de 30 s.
+    """
+    from transcriber.whisper_transcriber import (
+        desplazar_segmentos, dividir_en_silencios, transcribir_fragmento, unir_fragmentos
+    )
+
+    if not isinstance(audio, np.ndarray):
+        from downloader import decodificar_pcm
+        audio = await asyncio.to_thread(decodificar_pcm, str(audio))
+
+    resultados = []
+    idioma = contexto = None
+    for inicio, fin in dividir_en_silencios(audio, SEGUNDOS_FRAGMENTO_VIVO):
+        desplazamiento = inicio / FRECUENCIA_MUESTREO
+        if MODO_TRANSCRIPCION == MODO_LOTES and not modelo:
+            resultado = desplazar_segmentos(await _transcribir(audio[inicio:fin]), desplazamiento)
+        else:
+            resultado = await ejecutar_en_etapa(
+                ETAPA_TRANSCRIPCION, transcribir_fragmento, audio[inicio:fin], idioma, desplazamiento,
+                modelo, contexto
+            )
+        idioma = idioma or resultado['language']
+        contexto = resultado['text'][-LARGO_CONTEXTO_VIVO:] or contexto
+        resultados.append(resultado)
+        en_vivo.agregar(resultado['segments'], idioma)
+    resultado = unir_fragmentos(resultados)
+    resultado['language'] = idioma
+    return resultado
+
+async def _transcribir(audio: Any, modelo: Optional[str] = None,
+                       en_vivo: Optional[LetraEnVivo] = None) -> Dict[str, Any]:
+    """
+    Transcribir según `WHISPER_PLANIFICADOR`: en el pool de procesos (por
+    fragmentos si el audio es largo) o en el planificador de lotes compartido.
+    Con `modelo` (vista previa) en modo 'lotes' se usa el pool de modelos del
+    proceso, fuera del planificador. Con `en_vivo` las líneas se entregan a
+    medida que salen (ver `_transcribir_en_vivo`).
+    """
+    from transcriber.whisper_transcriber import (
+        FRAGMENTAR_DESDE_SEGUNDOS, transcribir_audio, transcribir_por_fragmentos
+    )
+
+    if en_vivo is not None:
+        return await _transcribir_en_vivo(audio, modelo, en_vivo)
+
+    if MODO_TRANSCRIPCION == MODO_LOTES:
+        if modelo:
+            return await asyncio.to_thread(transcribir_audio, audio, None, modelo)
+        from transcriber.planificador import obtener_planificador
+        # Cargar el modelo o el archivo de audio no debe bloquear el event loop
+        planificador = await asyncio.to_thread(obtener_planificador)
+        futuro = await asyncio.to_thread(planificador.enviar, audio)
+        return await asyncio.wrap_future(futuro)
+
+    if FRAGMENTAR_DESDE_SEGUNDOS > 0:
+        # Audios largos: fragmentos en paralelo en el mismo pool de procesos
+        return await asyncio.to_thread(
+            transcribir_por_fragmentos, audio, obtener_ejecutor(ETAPA_TRANSCRIPCION), modelo
+        )
+    return await ejecutar_en_etapa(ETAPA_TRANSCRIPCION, transcribir_audio, audio, None, modelo)
+
+async def _obtener_transcripcion(
+    url_str: str,
+    avisar: Callable[[str], None],
+    modelo: Optional[str] = None,
+    en_vivo: Optional[LetraEnVivo] = None
+) -> Dict[str, Any]:
+    """
+    Obtener la transcripción de una URL: de la base de datos o descargando y
+    transcribiendo (ejecutado por el líder del vuelo).
+
+    Las vistas previas (`modelo` distinto del configurado) no se guardan.
+    Con `en_vivo` las líneas se entregan a medida que Whisper las decodifica.
+
+    Returns:
+        Diccionario con los campos de la tabla `transcriptions` (`id` es None
+        en vistas previas)
+    """
+    from downloader import (
+        AUDIO_EN_MEMORIA, descargar_audio, descargar_audio_pcm, limpiar_archivo, sondear_metadatos
+    )
+    from database import (
+        buscar_transcripcion, buscar_transcripcion_por_clave, guardar_transcripcion, obtener_transcripcion
+    )
+
+    from transcriber.whisper_transcriber import MODELO_WHISPER
+
+    # Otro idioma destino ya pidió esta URL: reutilizar la transcripción
+    transcripcion = buscar_transcripcion(url_str)
+    if transcripcion:
+        registrar_cache('transcripcion', True)
+        return transcripcion
+
+    # 1. Sondear metadatos sin descargar (cacheados con TTL): rechaza audios
+    # demasiado largos o pesados y reconoce enlaces que la URL no delata
+    avisar(ETAPA_DESCARGANDO)
+    with tramo('sondeo'):
+        info = await ejecutar_en_etapa(ETAPA_DESCARGA, sondear_metadatos, url_str)
+    clave = clave_desde_info(info)
+    if clave and clave != clave_video(url_str):
+        transcripcion = buscar_transcripcion_por_clave(clave)
+        if transcripcion:
+            _estadisticas_descarga['evitadas'] += 1
+            registrar_cache('transcripcion', True)
+            return transcripcion
+    registrar_cache('transcripcion', False)
+
+    ruta_audio = None
+
+    try:
+        # 2. Descargar audio (a memoria si AUDIO_EN_MEMORIA, si no a tmp/)
+        with tramo('descarga') as datos_tramo:
+            if AUDIO_EN_MEMORIA:
+                audio, metadata = await ejecutar_en_etapa(ETAPA_DESCARGA, descargar_audio_pcm, url_str, info)
+            else:
+                ruta_audio, metadata = await ejecutar_en_etapa(ETAPA_DESCARGA, descargar_audio, url_str)
+                audio = ruta_audio
+        _medir_descarga(datos_tramo, info)
+
+        # Huella acústica: una resubida de una grabación ya transcrita no pasa por Whisper
+        huella = None
+        if HUELLAS_ACTIVADAS and not modelo:
+            with tramo('huella'):
+                huella, duplicado = await asyncio.to_thread(identificar_audio, audio)
+            original = obtener_transcripcion(duplicado['transcription_id']) if duplicado else None
+            registrar_cache('huella', original is not None)
+            if original:
+                return _guardar_resubida(url_str, metadata, original, duplicado['desplazamiento_segundos'])
+
+        # 3. Transcribir con Whisper
+        avisar(ETAPA_TRANSCRIBIENDO)
+        with tramo('transcripcion', modelo=modelo or MODELO_WHISPER) as datos_tramo:
+            resultado_transcripcion = await _transcribir(audio, modelo, en_vivo)
+        _medir_transcripcion(datos_tramo, info, audio, resultado_transcripcion)
+        if 'segundos_omitidos' in resultado_transcripcion:
+            _estadisticas_vad['audios'] += 1
+            _estadisticas_vad['segundos_omitidos'] += resultado_transcripcion['segundos_omitidos']
+
+    finally:
+        # Limpiar archivo temporal
+        if ruta_audio:
+            limpiar_archivo(ruta_audio)
+
+    segmentos = lineas_con_tiempos(resultado_transcripcion.get('segments', []))
+    transcripcion = {
+        'title': metadata['title'],
+        'artist': metadata['artist'],
+        'album': metadata.get('album'),
+        'year': metadata.get('year'),
+        'source_url': url_str,
+        'language_src': resultado_transcripcion['language'],
+        # Una línea por segmento: conserva el formato de letra y permite
+        # reutilizar traducciones de líneas repetidas (memoria de traducción)
+        'text_src': '\n'.join(s['text'] for s in segmentos) or resultado_transcripcion['text'],
+        # Tiempos alineados con las líneas de text_src (LRC/SRT/VTT sin volver a transcribir)
+        'segments': codificar_tiempos(segmentos) if segmentos else None,
+        'words': codificar_palabras(segmentos),
+    }
+    # Guardar la transcripción antes de traducir: otros idiomas la reutilizan
+    transcripcion['id'] = None if modelo else guardar_transcripcion(transcripcion)
+    if huella is not None:
+        registrar_huella(transcripcion['id'], huella)
+    return transcripcion
+
+def _medir_descarga(datos_tramo: Dict[str, Any], info: Dict[str, Any]):
+    """
+    Velocidad de descarga estimada: tamaño informado por el sitio (si lo informó)
+    sobre la duración de la etapa. No son bytes contados (ffmpeg lee la URL
+    directamente) y la etapa incluye la decodificación.
+    """
+    tamano = info.get('filesize') or info.get('filesize_approx')
+    if tamano and datos_tramo['segundos'] > 0:
+        bytes_por_segundo = tamano / datos_tramo['segundos']
+        DESCARGA_BYTES_POR_SEGUNDO_ESTIMADOS.observar(bytes_por_segundo)
+        datos_tramo.update(bytes_estimados=int(tamano), bytes_por_segundo_estimados=round(bytes_por_segundo))
+
+def _medir_transcripcion(datos_tramo: Dict[str, Any], info: Dict[str, Any], audio: Any,
+                         resultado: Dict[str, Any]):
+    """
+    Duración del audio y factor de tiempo real: segundos de inferencia medidos
+    dentro de `transcribir_audio` (sin la espera en la cola del pool o del
+    planificador) por segundo de audio.
+    """
+    if isinstance(audio, np.ndarray):
+        duracion = len(audio) / FRECUENCIA_MUESTREO
+    else:
+        duracion = info.get('duration')
+    if duracion:
+        AUDIO_SEGUNDOS.observar(duracion)
+        datos_tramo['audio_segundos'] = round(duracion, 1)
+    inferencia = resultado.get('segundos_inferencia')
+    if duracion and inferencia is not None:
+        factor = inferencia / duracion
+        FACTOR_TIEMPO_REAL.observar(factor, modelo=datos_tramo['modelo'])
+        datos_tramo.update(segundos_inferencia=round(inferencia, 3), factor_tiempo_real=round(factor, 3))
+
+def _guardar_resubida(
+    url_str: str,
+    metadata: Dict[str, Any],
+    original: Dict[str, Any],
+    desplazamiento: float
+) -> Dict[str, Any]:
+    """
+    Guardar para `url_str` la letra de otra URL con la misma grabación
+    (reconocida por su huella), con los tiempos corridos según su alineación.
+    Las traducciones ya hechas se copian.
+    """
+    from database import copiar_traducciones, guardar_transcripcion
+
+    transcripcion = {
+        'title': metadata['title'],
+        'artist': metadata['artist'],
+        'album': metadata.get('album'),
+        'year': metadata.get('year'),
+        'source_url': url_str,
+        'language_src': original['language_src'],
+        'text_src': original['text_src'],
+        'segments': desplazar_tiempos(original['segments'], desplazamiento),
+        'words': desplazar_tiempos(original['words'], desplazamiento, palabras=True),
+    }
+    transcripcion['id'] = guardar_transcripcion(transcripcion)
+    copiar_traducciones(original['id'], transcripcion['id'])
+    return transcripcion
+
+async def _transcribir_y_traducir(
+    url_str: str,
+    idioma_destino: str,
+    avisar: Callable[[str], None],
+    modelo: Optional[str] = None,
+    en_vivo: Optional[LetraEnVivo] = None
+) -> Dict[str, Any]:
+    """
+    Ejecutar transcripción (coalescida por URL y modelo), traducción y guardado.
+
+    Con `en_vivo` la traducción se hace por lotes mientras se transcribe; si
+    otra petición ya está transcribiendo la URL, las líneas llegan al final.
+    """
+    from translator import traducir_texto
+    from database import buscar_por_url, guardar_traduccion
+
+    clave_url = clave_video(url_str)
+    if modelo:
+        clave_url = f"{clave_url}@{modelo}"
+    # Las etapas del líder llegan a todas las peticiones que esperan esta URL
+    transcripcion = await vuelos_transcripcion.ejecutar(
+        clave_url,
+        lambda: _obtener_transcripcion(
+            url_str, partial(vuelos_transcripcion.difundir, clave_url), modelo, en_vivo
+        ),
+        oyente=avisar
+    )
+
+    # Traducción ya guardada: copiada de una resubida reconocida por su huella
+    if transcripcion['id'] is not None:
+        letra_existente = buscar_por_url(url_str, idioma_destino)
+        if letra_existente:
+            return letra_existente
+
+    # 4. Traducir (único paso si la transcripción ya estaba guardada)
+    avisar(ETAPA_TRADUCIENDO)
+    with tramo('traduccion', idioma_origen=transcripcion['language_src'], idioma_destino=idioma_destino):
+        if en_vivo is not None:
+            texto_traducido = await en_vivo.completar(transcripcion)
+        else:
+            texto_traducido = await ejecutar_en_etapa(
+                ETAPA_TRADUCCION,
+                traducir_texto,
+                transcripcion['text_src'],
+                transcripcion['language_src'],
+                idioma_destino
+            )
+
+    # 5. Guardar la traducción junto a su transcripción
+    if transcripcion['id'] is not None:
+        with tramo('guardado'):
+            guardar_traduccion(transcripcion['id'], idioma_destino, texto_traducido)
+
+    return {
+        'title': transcripcion['title'],
+        'artist': transcripcion['artist'],
+        'album': transcripcion.get('album'),
+        'year': transcripcion.get('year'),
+        'source_url': transcripcion['source_url'],
+        'language_src': transcripcion['language_src'],
+        'language_dst': idioma_destino,
+        'text_src': transcripcion['text_src'],
+        'text_dst': texto_traducido
+    }
+
+async def procesar_cancion(
+    url_str: str,
+    idioma_destino: str,
+    notificar: Optional[Notificador] = None,
+    modelo: Optional[str] = None,
+    perfilar: bool = False
+) -> Dict[str, Any]:
+    """
+    Procesar una URL completa: cache, descarga, transcripción, traducción y guardado.
+
+    Las peticiones simultáneas para la misma URL comparten una sola descarga y
+    una sola pasada de Whisper (ver `vuelo_unico.py`). Si la URL ya fue
+    transcrita para otro idioma, sólo se ejecuta la traducción.
+
+    Con un `modelo` distinto de WHISPER_MODEL (p. ej. tiny para una vista
+    previa) se devuelve lo ya guardado si existe, pero el resultado nuevo no
+    se guarda: la base de datos sólo contiene transcripciones del modelo final.
+
+    Args:
+        url_str: URL del video
+        idioma_destino: Código de idioma destino (es, en, pt)
+        notificar: Función opcional llamada con (etapa, progreso) al cambiar de etapa
+        modelo: Modelo Whisper a usar (por defecto WHISPER_MODEL)
+        perfilar: Guardar un perfil de cProfile de la petición (ver `metricas.py`)
+
+    Returns:
+        Diccionario con los campos de la letra (formato tabla `lyrics`)
+
+    Raises:
+        Exception: Si falla alguna etapa
+    """
+    from database import buscar_por_url
+    from transcriber.whisper_transcriber import MODELO_WHISPER
+
+    if modelo == MODELO_WHISPER:
+        modelo = None
+
+    def avisar(etapa: str):
+        if notificar:
+            notificar(etapa, PROGRESO_ETAPA[etapa])
+
+    with traza_peticion('procesar_cancion', perfilar, url=url_str, idioma_destino=idioma_destino,
+                        modelo=modelo or MODELO_WHISPER):
+        # Verificar si ya existe la traducción a este idioma
+        letra_existente = buscar_por_url(url_str, idioma_destino)
+        registrar_cache('letra', letra_existente is not None)
+        if letra_existente:
+            return letra_existente
+
+        if not COALESCER_TRADUCCIONES:
+            return await _transcribir_y_traducir(url_str, idioma_destino, avisar, modelo)
+
+        clave_resultado = (clave_video(url_str), idioma_destino, modelo)
+        return await vuelos_resultado.ejecutar(
+            clave_resultado,
+            lambda: _transcribir_y_traducir(
+                url_str, idioma_destino, partial(vuelos_resultado.difundir, clave_resultado), modelo
+            ),
+            oyente=avisar
+        )
+
+async def procesar_cancion_en_vivo(
+    url_str: str,
+    idioma_destino: str,
+    emitir: Emisor,
+    modelo: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Procesar una URL como `procesar_cancion`, emitiendo el avance a medida que ocurre.
+
+    Eventos que recibe `emitir(evento, datos)`:
+    - `status`: {stage, progress} al cambiar de etapa
+    - `segment`: {index, start, end, text} por cada línea transcrita
+    - `translation`: {index, text} por cada línea traducida (en lotes)
+
+    La transcripción se comparte con otras peticiones de la misma URL (ver
+    `vuelo_unico.py`), pero la traducción no: cada transmisión traduce sus
+    propias líneas (la memoria de traducción evita repetir llamadas). El
+    resultado se guarda igual que en `procesar_cancion`.
+
+    Returns:
+        Diccionario con los campos de la letra (formato tabla `lyrics`)
+
+    Raises:
+        Exception: Si falla alguna etapa
+    """
+    from database import buscar_por_url
+    from transcriber.whisper_transcriber import MODELO_WHISPER
+
+    if modelo == MODELO_WHISPER:
+        modelo = None
+
+    def avisar(etapa: str):
+        emitir('status', {'stage': etapa, 'progress': PROGRESO_ETAPA[etapa]})
+
+    with traza_peticion('procesar_cancion_en_vivo', False, url=url_str, idioma_destino=idioma_destino,
+                        modelo=modelo or MODELO_WHISPER):
+        letra_existente = buscar_por_url(url_str, idioma_destino)
+        registrar_cache('letra', letra_existente is not None)
+        if letra_existente:
+            return letra_existente
+        en_vivo = LetraEnVivo(idioma_destino, emitir)
+        try:
+            return await _transcribir_y_traducir(url_str, idioma_destino, avisar, modelo, en_vivo)
+        finally:
+            en_vivo.cancelar()
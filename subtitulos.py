@@ -0,0 +1,214 @@
+"""
+Letras sincronizadas: codificación compacta de tiempos y salida LRC/SRT/VTT.
+
+Los tiempos se guardan alineados con las líneas de `text_src` (un segmento de
+Whisper por línea), así no se repite el texto:
+
+- segments: float32 little-endian [inicio, fin] por línea (8 bytes por línea)
+- words: uint32 cantidad de líneas, uint32 palabras por línea, float32
+  [inicio, fin] por palabra y el texto de las palabras en UTF-8 separado por
+  '\\n' (sólo si la transcripción se hizo con WHISPER_PALABRAS=1)
+
+Las traducciones se alinean a los mismos tiempos línea por línea.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+FORMATO_LRC = 'lrc'
+FORMATO_SRT = 'srt'
+FORMATO_VTT = 'vtt'
+
+TIPOS_MIME = {
+    FORMATO_LRC: 'text/plain; charset=utf-8',
+    FORMATO_SRT: 'application/x-subrip; charset=utf-8',
+    FORMATO_VTT: 'text/vtt; charset=utf-8',
+}
+
+Palabras = List[List[Tuple[float, float, str]]]
+
+def lineas_con_tiempos(segmentos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Segmentos de Whisper con texto, limpios, en el orden de las líneas de `text_src`.
+
+    Args:
+        segmentos: Lista de {start, end, text, words?}
+
+    Returns:
+        Segmentos no vacíos con el texto sin espacios sobrantes
+    """
+    return [
+        dict(segmento, text=segmento['text'].strip())
+        for segmento in segmentos if segmento['text'].strip()
+    ]
+
+def codificar_tiempos(segmentos: List[Dict[str, Any]]) -> bytes:
+    """Codificar [inicio, fin] de cada línea como float32 (8 bytes por línea)."""
+    tiempos = np.array([[s['start'], s['end']] for s in segmentos], dtype='<f4').reshape(-1, 2)
+    return tiempos.tobytes()
+
+def decodificar_tiempos(datos: bytes) -> np.ndarray:
+    """Decodificar tiempos de líneas a una matriz (n, 2) de segundos."""
+    return np.frombuffer(datos, dtype='<f4').reshape(-1, 2)
+
+def codificar_palabras(segmentos: List[Dict[str, Any]]) -> Optional[bytes]:
+    """
+    Codificar los tiempos por palabra de cada línea.
+
+    Returns:
+        Bytes con el formato descrito en el módulo, o None si los segmentos
+        no traen palabras
+    """
+    if not segmentos or not all(s.get('words') for s in segmentos):
+        return None
+    cantidades = np.array([len(s['words']) for s in segmentos], dtype='<u4')
+    palabras = [p for s in segmentos for p in s['words']]
+    tiempos = np.array([[p['start'], p['end']] for p in palabras], dtype='<f4')
+    texto = '\n'.join(p['word'].strip().replace('\n', ' ') for p in palabras).encode('utf-8')
+    return (
+        np.array([len(cantidades)], dtype='<u4').tobytes()
+        + cantidades.tobytes() + tiempos.tobytes() + texto
+    )
+
+def decodificar_palabras(datos: bytes) -> Palabras:
+    """Decodificar tiempos por palabra a una lista (por línea) de (inicio, fin, palabra)."""
+    n_lineas = int(np.frombuffer(datos, dtype='<u4', count=1)[0])
+    cantidades = np.frombuffer(datos, dtype='<u4', count=n_lineas, offset=4)
+    total = int(cantidades.sum())
+    desplazamiento = 4 + 4 * n_lineas
+    tiempos = np.frombuffer(datos, dtype='<f4', count=total * 2, offset=desplazamiento).reshape(-1, 2)
+    textos = datos[desplazamiento + 8 * total:].decode('utf-8').split('\n') if total else []
+
+    lineas: Palabras = []
+    indice = 0
+    for cantidad in cantidades:
+        lineas.append([
+            (float(tiempos[i, 0]), float(tiempos[i, 1]), textos[i])
+            for i in range(indice, indice + int(cantidad))
+        ])
+        indice += int(cantidad)
+    return lineas
+
+def desplazar_tiempos(datos: Optional[bytes], segundos: float, palabras: bool = False) -> Optional[bytes]:
+    """
+    Sumar `segundos` a todos los tiempos codificados (p. ej. la misma grabación
+    con una intro más larga). Los tiempos no bajan de 0.
+
+    Args:
+        datos: Columna `segments` (o `words` con `palabras=True`)
+        segundos: Desplazamiento
+        palabras: Si `datos` usa el formato de tiempos por palabra
+
+    Returns:
+        Datos con los tiempos desplazados (None si `datos` es None)
+    """
+    if not datos or not segundos:
+        return datos
+    if not palabras:
+        return np.maximum(decodificar_tiempos(datos) + segundos, 0).astype('<f4').tobytes()
+    n_lineas = int(np.frombuffer(datos, dtype='<u4', count=1)[0])
+    total = int(np.frombuffer(datos, dtype='<u4', count=n_lineas, offset=4).sum())
+    desplazamiento = 4 + 4 * n_lineas
+    tiempos = np.frombuffer(datos, dtype='<f4', count=total * 2, offset=desplazamiento)
+    return (
+        datos[:desplazamiento]
+        + np.maximum(tiempos + segundos, 0).astype('<f4').tobytes()
+        + datos[desplazamiento + 8 * total:]
+    )
+
+def alinear_lineas(lineas: List[str], cantidad: int) -> List[str]:
+    """
+    Ajustar las líneas de una traducción a `cantidad` líneas con tiempo.
+
+    Si la traducción conservó las líneas (lo normal con la memoria de
+    traducción) la correspondencia es 1:1; si no, se reparten en proporción
+    para que cada tiempo tenga texto.
+
+    Args:
+        lineas: Líneas traducidas (sin vacías)
+        cantidad: Cantidad de líneas de la transcripción original
+
+    Returns:
+        Lista de exactamente `cantidad` líneas
+    """
+    if len(lineas) == cantidad or cantidad == 0:
+        return lineas[:cantidad]
+    alineadas = [[] for _ in range(cantidad)]
+    for i, linea in enumerate(lineas):
+        alineadas[min(i * cantidad // len(lineas), cantidad - 1)].append(linea)
+    return [' '.join(grupo) for grupo in alineadas]
+
+def _tiempo_lrc(segundos: float) -> str:
+    centesimas = int(round(segundos * 100))
+    return f"{centesimas // 6000:02d}:{centesimas // 100 % 60:02d}.{centesimas % 100:02d}"
+
+def _tiempo_srt(segundos: float, separador: str = ',') -> str:
+    milisegundos = int(round(segundos * 1000))
+    horas, resto = divmod(milisegundos, 3600000)
+    minutos, resto = divmod(resto, 60000)
+    return f"{horas:02d}:{minutos:02d}:{resto // 1000:02d}{separador}{resto % 1000:03d}"
+
+def generar_lrc(lineas: List[str], tiempos: np.ndarray, metadatos: Dict[str, Any],
+                palabras: Optional[Palabras] = None) -> str:
+    """
+    Generar una letra LRC; con `palabras`, LRC extendido (karaoke) con la marca de cada palabra.
+    """
+    salida = [f"[ti:{metadatos.get('title') or ''}]", f"[ar:{metadatos.get('artist') or ''}]"]
+    if metadatos.get('album'):
+        salida.append(f"[al:{metadatos['album']}]")
+    for i, linea in enumerate(lineas):
+        if palabras is not None:
+            linea = ' '.join(f"<{_tiempo_lrc(inicio)}>{palabra}" for inicio, _, palabra in palabras[i])
+        salida.append(f"[{_tiempo_lrc(float(tiempos[i, 0]))}]{linea}")
+    return '\n'.join(salida) + '\n'
+
+def generar_srt(lineas: List[str], tiempos: np.ndarray) -> str:
+    """Generar subtítulos SRT."""
+    return ''.join(
+        f"{i + 1}\n{_tiempo_srt(float(tiempos[i, 0]))} --> {_tiempo_srt(float(tiempos[i, 1]))}\n{linea}\n\n"
+        for i, linea in enumerate(lineas)
+    )
+
+def generar_vtt(lineas: List[str], tiempos: np.ndarray) -> str:
+    """Generar subtítulos WebVTT."""
+    return 'WEBVTT\n\n' + ''.join(
+        f"{_tiempo_srt(float(tiempos[i, 0]), '.')} --> {_tiempo_srt(float(tiempos[i, 1]), '.')}\n{linea}\n\n"
+        for i, linea in enumerate(lineas)
+    )
+
+def generar_subtitulos(formato: str, transcripcion: Dict[str, Any],
+                       texto_traducido: Optional[str] = None) -> str:
+    """
+    Generar letra sincronizada a partir de una transcripción guardada (sin Whisper).
+
+    Args:
+        formato: 'lrc', 'srt' o 'vtt'
+        transcripcion: Fila de `transcriptions` (con `segments` y opcionalmente `words`)
+        texto_traducido: Si se indica, se usan sus líneas con los tiempos del original
+
+    Returns:
+        Contenido del archivo
+
+    Raises:
+        ValueError: Si la transcripción no tiene tiempos guardados o el formato no existe
+    """
+    if not transcripcion.get('segments'):
+        raise ValueError("La transcripción no tiene tiempos guardados")
+    tiempos = decodificar_tiempos(transcripcion['segments'])
+    lineas = [linea for linea in transcripcion['text_src'].split('\n') if linea.strip()]
+    if len(lineas) != len(tiempos):
+        raise ValueError("Los tiempos guardados no coinciden con las líneas de la letra")
+
+    palabras = None
+    if texto_traducido is not None:
+        lineas = alinear_lineas([l for l in texto_traducido.split('\n') if l.strip()], len(tiempos))
+    elif transcripcion.get('words'):
+        palabras = decodificar_palabras(transcripcion['words'])
+
+    if formato == FORMATO_LRC:
+        return generar_lrc(lineas, tiempos, transcripcion, palabras)
+    if formato == FORMATO_SRT:
+        return generar_srt(lineas, tiempos)
+    if formato == FORMATO_VTT:
+        return generar_vtt(lineas, tiempos)
+    raise ValueError(f"Formato desconocido: {formato}")
@@ -0,0 +1,17 @@
+"""Configuración común de las pruebas: importar los módulos desde la raíz del repositorio."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+@pytest.fixture
+def ruta_base_datos(tmp_path, monkeypatch):
+    """Apuntar `database` a un archivo SQLite temporal (se inicializa al primer uso)."""
+    import database
+
+    ruta = tmp_path / "lyrics.sqlite"
+    monkeypatch.setattr(database, 'DB_PATH', ruta)
+    yield ruta
+    database.cerrar_conexiones()
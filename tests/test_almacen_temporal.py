@@ -0,0 +1,31 @@
+"""Pruebas de los directorios de trabajo temporales y su barrido."""
+import os
+
+from almacen_temporal import PREFIJO_TRABAJO, AlmacenTemporal
+
+def test_barrido_borra_directorios_propios_sin_reserva(tmp_path):
+    almacen = AlmacenTemporal(tmp_path, 2**30, 0)
+    en_uso = almacen.crear_directorio(1)
+    perdido = tmp_path / f"{PREFIJO_TRABAJO}{os.getpid()}_perdido"
+    perdido.mkdir()
+    ajeno = tmp_path / "otra_cosa"
+    ajeno.mkdir()
+
+    assert almacen.barrer() == 1
+    assert en_uso.exists() and ajeno.exists()
+    assert not perdido.exists()
+
+def test_barrido_respeta_directorios_creados_mientras_recorre(tmp_path):
+    almacen = AlmacenTemporal(tmp_path, 2**30, 0)
+    creados = []
+
+    class RaizConCarrera(type(tmp_path)):
+        def iterdir(self):
+            # Una descarga crea su directorio justo cuando empieza el recorrido
+            creados.append(almacen.crear_directorio(1))
+            return super().iterdir()
+
+    almacen.raiz = RaizConCarrera(tmp_path)
+    assert almacen.barrer() == 0
+    assert creados[0].exists()
+    assert almacen.es_directorio_trabajo(creados[0])
@@ -0,0 +1,116 @@
+"""Pruebas de las migraciones de la base de datos (`PRAGMA user_version`)."""
+import sqlite3
+
+import database
+
+ESQUEMA_ORIGINAL = """
+    CREATE TABLE lyrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        artist TEXT NOT NULL,
+        album TEXT,
+        year INTEGER,
+        source_url TEXT NOT NULL UNIQUE,
+        language_src TEXT NOT NULL,
+        language_dst TEXT NOT NULL,
+        text_src TEXT NOT NULL,
+        text_dst TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+def _version(ruta) -> int:
+    conexion = sqlite3.connect(ruta)
+    try:
+        return conexion.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conexion.close()
+
+def test_base_nueva_aplica_todas_las_migraciones(ruta_base_datos):
+    database.inicializar_base_datos()
+
+    assert _version(ruta_base_datos) == len(database.MIGRACIONES)
+    id_transcripcion = database.guardar_letra({
+        'title': "Canción", 'artist': "Artista", 'source_url': "https://youtu.be/dQw4w9WgXcQ",
+        'language_src': 'en', 'language_dst': 'es', 'text_src': "hello", 'text_dst': "hola",
+    })
+    letra = database.buscar_por_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42", 'es')
+    assert letra['id'] == id_transcripcion
+    assert letra['text_dst'] == "hola"
+
+def test_migra_la_tabla_lyrics_original(ruta_base_datos):
+    conexion = sqlite3.connect(ruta_base_datos)
+    conexion.execute(ESQUEMA_ORIGINAL)
+    conexion.executemany(
+        "INSERT INTO lyrics (title, artist, source_url, language_src, language_dst, text_src, text_dst) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("Corazón", "Alguien", "https://youtu.be/dQw4w9WgXcQ", 'es', 'en', "mi corazón", "my heart"),
+            ("Otra", "Otro", "https://vimeo.com/76979871", 'en', 'pt', "night sky", "céu noturno"),
+        ]
+    )
+    conexion.commit()
+    conexion.close()
+
+    database.inicializar_base_datos()
+
+    assert _version(ruta_base_datos) == len(database.MIGRACIONES)
+    conexion = database.obtener_conexion()
+    assert conexion.execute("SELECT COUNT(*) FROM transcriptions").fetchone()[0] == 2
+    assert conexion.execute("SELECT COUNT(*) FROM translations").fetchone()[0] == 2
+    # `lyrics` queda como vista compatible, con la clave canónica calculada
+    letra = database.buscar_por_url("https://m.youtube.com/watch?v=dQw4w9WgXcQ")
+    assert (letra['id'], letra['text_dst'], letra['video_key']) == (1, "my heart", 'youtube:dQw4w9WgXcQ')
+    assert database.buscar_por_url("https://player.vimeo.com/video/76979871", 'pt')['title'] == "Otra"
+    # Las filas migradas quedan indexadas para la búsqueda de texto completo
+    assert [r['id'] for r in database.buscar_letras("corazon")] == [1]
+    assert [r['language_match'] for r in database.buscar_letras("noturno")] == ['pt']
+
+def test_reabrir_no_repite_migraciones(ruta_base_datos, monkeypatch):
+    database.inicializar_base_datos()
+    database.guardar_transcripcion({
+        'title': "T", 'artist': "A", 'source_url': "https://dai.ly/x7tgad0",
+        'language_src': 'es', 'text_src': "texto",
+    })
+    database.cerrar_conexiones()
+
+    # Simular un proceso nuevo: la base ya está en la última versión
+    monkeypatch.setattr(database, '_ruta_inicializada', None)
+    database.inicializar_base_datos()
+
+    assert _version(ruta_base_datos) == len(database.MIGRACIONES)
+    assert database.buscar_transcripcion("https://www.dailymotion.com/video/x7tgad0")['text_src'] == "texto"
+
+def test_memoria_acumula_usos_y_los_escribe_por_lotes(ruta_base_datos, monkeypatch):
+    monkeypatch.setattr(database, 'MEMORIA_USOS_LOTE', 3)
+    monkeypatch.setattr(database, 'MEMORIA_USOS_SEGUNDOS', 3600)
+    database.guardar_en_memoria({"hola": "hello", "adiós": "bye"}, 'es', 'en')
+
+    def hits():
+        return dict(database.obtener_conexion().execute(
+            "SELECT line_src, hits FROM translation_memory"
+        ).fetchall())
+
+    assert database.buscar_en_memoria(["hola", "nueva"], 'es', 'en') == {"hola": "hello"}
+    database.buscar_en_memoria(["hola", "adiós"], 'es', 'en')
+    assert hits() == {"hola": 0, "adiós": 0}
+
+    database.volcar_usos_memoria()
+    assert hits() == {"hola": 2, "adiós": 1}
+
+def test_memoria_desaloja_las_menos_usadas(ruta_base_datos, monkeypatch):
+    monkeypatch.setattr(database, 'MEMORIA_TRADUCCION_MAX_LINEAS', 10)
+    # Un instante distinto por llamada: el orden de `last_used` no depende del reloj
+    reloj = iter(range(1, 1000))
+    monkeypatch.setattr(database.time, 'time', lambda: float(next(reloj)))
+    for i in range(10):
+        database.guardar_en_memoria({f"linea {i}": f"line {i}"}, 'es', 'en')
+    # Un uso pendiente de escribir cuenta para el desalojo
+    database.buscar_en_memoria(["linea 0"], 'es', 'en')
+
+    database.guardar_en_memoria({"linea 10": "line 10"}, 'es', 'en')
+
+    assert database.contar_lineas_memoria() == 9
+    guardadas = database.buscar_en_memoria([f"linea {i}" for i in range(11)], 'es', 'en')
+    # 11 líneas sobre un límite de 10: quedan 9, sin las dos usadas hace más tiempo
+    assert sorted(guardadas) == sorted(["linea 0"] + [f"linea {i}" for i in range(3, 11)])
@@ -0,0 +1,50 @@
+"""Pruebas de las huellas acústicas: codificación y reconocimiento de resubidas."""
+import numpy as np
+
+import database
+from huellas import (
+    FRECUENCIA_MUESTREO, MUESTRAS_SALTO, MUESTRAS_VENTANA, buscar_duplicado, calcular_huella,
+    codificar_huella, decodificar_huella, proporcion_bits_distintos, registrar_huella
+)
+
+def _audio(segundos: float, semilla: int) -> np.ndarray:
+    """Ruido con envolvente variable: energía distinta por banda y por tramo."""
+    generador = np.random.default_rng(semilla)
+    muestras = int(segundos * FRECUENCIA_MUESTREO)
+    envolvente = np.repeat(generador.uniform(0.2, 1.0, muestras // 1600 + 1), 1600)[:muestras]
+    return (generador.standard_normal(muestras) * envolvente * 0.3).astype(np.float32)
+
+def _guardar(url: str) -> int:
+    return database.guardar_transcripcion({
+        'title': "T", 'artist': "A", 'source_url': url, 'language_src': 'es', 'text_src': "letra",
+    })
+
+def test_huella_ida_y_vuelta():
+    huella = calcular_huella(_audio(10, 1))
+    assert huella.dtype == np.uint32
+    # Un entero por salto, menos la ventana inicial y el primer tramo (se compara con el anterior)
+    assert len(huella) == (10 * FRECUENCIA_MUESTREO - MUESTRAS_VENTANA) // MUESTRAS_SALTO
+    np.testing.assert_array_equal(decodificar_huella(codificar_huella(huella)), huella)
+    assert proporcion_bits_distintos(huella, huella, 0) == (0.0, len(huella))
+
+def test_audio_corto_no_tiene_huella():
+    assert len(calcular_huella(np.zeros(4000, dtype=np.float32))) == 0
+
+def test_reconoce_resubida_con_intro_mas_larga(ruta_base_datos):
+    original = _audio(60, 2)
+    id_transcripcion = _guardar("https://ejemplo.com/original.mp3")
+    registrar_huella(id_transcripcion, calcular_huella(original))
+
+    # La misma grabación con 3 s más de intro y un poco de ruido
+    intro = np.zeros(3 * FRECUENCIA_MUESTREO, dtype=np.float32)
+    ruido = np.random.default_rng(3).standard_normal(len(original)).astype(np.float32) * 0.003
+    duplicado = buscar_duplicado(calcular_huella(np.concatenate([intro, original + ruido])))
+
+    assert duplicado['transcription_id'] == id_transcripcion
+    assert duplicado['desplazamiento_segundos'] == 3.0
+    assert duplicado['bits_distintos'] < 0.1
+
+def test_otra_grabacion_no_coincide(ruta_base_datos):
+    registrar_huella(_guardar("https://ejemplo.com/a.mp3"), calcular_huella(_audio(60, 4)))
+
+    assert buscar_duplicado(calcular_huella(_audio(60, 5))) is None
@@ -0,0 +1,31 @@
+"""Pruebas de la resolución y creación de motores de transcripción."""
+import numpy as np
+import pytest
+
+from benchmarks.motor_simulado import MotorSimulado
+from transcriber.motores import MotorTranscripcion, clase_motor, crear_motor
+
+class MotorSinDeteccion(MotorTranscripcion):
+    def transcribir(self, audio, idioma=None, contexto=None):
+        return {'text': '', 'language': idioma or 'es', 'segments': []}
+
+class MotorDelegado(MotorSinDeteccion):
+    def detectar_idioma(self, audio):
+        return super().detectar_idioma(audio)
+
+def test_motor_incompleto_falla_al_crearse():
+    with pytest.raises(TypeError):
+        crear_motor('tiny', f"{__name__}:MotorSinDeteccion")
+
+def test_motor_puede_delegar_la_deteccion():
+    motor = crear_motor('tiny', f"{__name__}:MotorDelegado")
+    assert motor.detectar_idioma(np.zeros(16000, dtype=np.float32)) == 'es'
+
+def test_ruta_que_no_es_un_motor():
+    with pytest.raises(TypeError):
+        clase_motor('numpy:zeros')
+    with pytest.raises(ValueError):
+        clase_motor('inexistente')
+
+def test_motor_externo_por_ruta():
+    assert clase_motor('benchmarks.motor_simulado:MotorSimulado') is MotorSimulado
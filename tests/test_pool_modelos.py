@@ -0,0 +1,65 @@
+"""Pruebas del pool de modelos: cargas fuera del bloqueo y desalojo LRU."""
+import threading
+import time
+
+import pytest
+
+from transcriber import whisper_transcriber
+from transcriber.whisper_transcriber import PoolModelos
+
+def test_carga_lenta_no_bloquea_a_los_modelos_cargados(monkeypatch):
+    liberar = threading.Event()
+    creados = []
+
+    def crear_motor(modelo):
+        creados.append(modelo)
+        if modelo == 'medium':
+            liberar.wait(5)
+        return object()
+
+    monkeypatch.setattr(whisper_transcriber, 'crear_motor', crear_motor)
+    pool = PoolModelos(presupuesto_mb=10_000)
+    cargado = pool.obtener('tiny')
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(pool.obtener('medium'))) for _ in range(2)]
+    for hilo in hilos:
+        hilo.start()
+    time.sleep(0.05)
+
+    # Mientras 'medium' se carga, 'tiny' se entrega sin esperar
+    inicio = time.monotonic()
+    assert pool.obtener('tiny') is cargado
+    assert time.monotonic() - inicio < 0.5
+
+    liberar.set()
+    for hilo in hilos:
+        hilo.join(5)
+    # Las dos peticiones de 'medium' comparten una sola carga
+    assert creados == ['tiny', 'medium']
+    assert len(resultados) == 2 and resultados[0] is resultados[1]
+    assert pool.estadisticas()['cargas'] == 2
+
+def test_carga_fallida_se_reintenta(monkeypatch):
+    intentos = []
+
+    def crear_motor(modelo):
+        intentos.append(modelo)
+        if len(intentos) == 1:
+            raise RuntimeError("sin red")
+        return object()
+
+    monkeypatch.setattr(whisper_transcriber, 'crear_motor', crear_motor)
+    pool = PoolModelos(presupuesto_mb=10_000)
+    with pytest.raises(RuntimeError):
+        pool.obtener('tiny')
+    assert pool.obtener('tiny') is not None
+    assert len(intentos) == 2
+
+def test_desaloja_el_menos_usado_cuando_no_cabe(monkeypatch):
+    monkeypatch.setattr(whisper_transcriber, 'crear_motor', lambda modelo: object())
+    pool = PoolModelos(presupuesto_mb=whisper_transcriber.memoria_estimada('small') + 1)
+    pool.obtener('small')
+    pool.obtener('base')
+    assert pool.cargados() == ['base']
+    assert pool.estadisticas()['desalojos'] == 1
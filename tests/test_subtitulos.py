@@ -0,0 +1,75 @@
+"""Pruebas de la codificación compacta de tiempos y la salida LRC/SRT/VTT."""
+import numpy as np
+import pytest
+
+from subtitulos import (
+    alinear_lineas, codificar_palabras, codificar_tiempos, decodificar_palabras,
+    decodificar_tiempos, desplazar_tiempos, generar_subtitulos
+)
+
+SEGMENTOS = [
+    {'start': 0.5, 'end': 2.25, 'text': " Hola mundo", 'words': [
+        {'start': 0.5, 'end': 1.0, 'word': " Hola"},
+        {'start': 1.25, 'end': 2.25, 'word': " mundo"},
+    ]},
+    {'start': 3.0, 'end': 4.5, 'text': " Adiós", 'words': [
+        {'start': 3.0, 'end': 4.5, 'word': " Adiós"},
+    ]},
+]
+
+def test_tiempos_ida_y_vuelta():
+    tiempos = decodificar_tiempos(codificar_tiempos(SEGMENTOS))
+    np.testing.assert_array_equal(tiempos, [[0.5, 2.25], [3.0, 4.5]])
+    assert len(codificar_tiempos(SEGMENTOS)) == 8 * len(SEGMENTOS)
+
+def test_palabras_ida_y_vuelta():
+    assert decodificar_palabras(codificar_palabras(SEGMENTOS)) == [
+        [(0.5, 1.0, "Hola"), (1.25, 2.25, "mundo")],
+        [(3.0, 4.5, "Adiós")],
+    ]
+
+def test_palabras_con_salto_de_linea_no_desalinean():
+    segmentos = [{'start': 0.0, 'end': 1.0, 'text': "a b", 'words': [
+        {'start': 0.0, 'end': 0.5, 'word': "a\nb"},
+        {'start': 0.5, 'end': 1.0, 'word': "c"},
+    ]}]
+    assert decodificar_palabras(codificar_palabras(segmentos)) == [[(0.0, 0.5, "a b"), (0.5, 1.0, "c")]]
+
+def test_sin_palabras_no_se_codifica():
+    assert codificar_palabras([{'start': 0.0, 'end': 1.0, 'text': "x"}]) is None
+    assert codificar_palabras([]) is None
+
+def test_desplazar_tiempos_no_baja_de_cero():
+    desplazados = decodificar_tiempos(desplazar_tiempos(codificar_tiempos(SEGMENTOS), -1.0))
+    np.testing.assert_array_equal(desplazados, [[0.0, 1.25], [2.0, 3.5]])
+
+    palabras = decodificar_palabras(desplazar_tiempos(codificar_palabras(SEGMENTOS), 2.0, palabras=True))
+    assert palabras[0][0] == (2.5, 3.0, "Hola")
+    assert palabras[1] == [(5.0, 6.5, "Adiós")]
+
+def test_alinear_lineas():
+    assert alinear_lineas(["a", "b"], 2) == ["a", "b"]
+    assert alinear_lineas(["a", "b", "c"], 2) == ["a b", "c"]
+    assert alinear_lineas(["a"], 3) == ["a", "", ""]
+
+def test_generar_subtitulos():
+    transcripcion = {
+        'title': "Canción", 'artist': "Artista", 'text_src': "Hola mundo\nAdiós",
+        'segments': codificar_tiempos(SEGMENTOS), 'words': codificar_palabras(SEGMENTOS),
+    }
+    assert generar_subtitulos('lrc', transcripcion) == (
+        "[ti:Canción]\n[ar:Artista]\n"
+        "[00:00.50]<00:00.50>Hola <00:01.25>mundo\n"
+        "[00:03.00]<00:03.00>Adiós\n"
+    )
+    assert generar_subtitulos('srt', transcripcion, "Hello world\nBye") == (
+        "1\n00:00:00,500 --> 00:00:02,250\nHello world\n\n"
+        "2\n00:00:03,000 --> 00:00:04,500\nBye\n\n"
+    )
+    assert generar_subtitulos('vtt', transcripcion).startswith(
+        "WEBVTT\n\n00:00:00.500 --> 00:00:02.250\nHola mundo\n\n"
+    )
+    with pytest.raises(ValueError):
+        generar_subtitulos('ass', transcripcion)
+    with pytest.raises(ValueError):
+        generar_subtitulos('srt', dict(transcripcion, text_src="una sola línea"))
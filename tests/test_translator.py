@@ -0,0 +1,117 @@
+"""Pruebas del cliente de LibreTranslate contra el servidor local de `benchmarks`."""
+import time
+
+import pytest
+
+import translator
+from benchmarks.libretranslate_local import iniciar_servidor
+from translator import CircuitoAbierto, ClienteLibreTranslate, dividir_en_fragmentos
+
+LETRA = (
+    "Primera línea del verso\n"
+    "segunda línea del verso\n"
+    "\n"
+    "Otra estrofa tras una línea vacía\n"
+    "Una línea larga que supera el límite. Con dos frases y algunas palabras más\n"
+    "fin"
+)
+
+@pytest.fixture
+def servidor():
+    creados = []
+
+    def crear(**opciones):
+        servidor = iniciar_servidor(**opciones)
+        creados.append(servidor)
+        return servidor
+
+    yield crear
+    for servidor in creados:
+        servidor.shutdown()
+        servidor.server_close()
+
+def test_dividir_corta_entre_versos_y_reconstruye_el_texto():
+    fragmentos = dividir_en_fragmentos(LETRA, 50)
+
+    assert ''.join(fragmento + separador for fragmento, separador in fragmentos) == LETRA
+    assert all(len(fragmento) <= 50 for fragmento, _ in fragmentos)
+    # Los versos cortos no se parten: cada uno queda entero en algún fragmento
+    for verso in ("Primera línea del verso", "segunda línea del verso", "Otra estrofa tras una línea vacía"):
+        assert any(verso in fragmento.split('\n') for fragmento, _ in fragmentos)
+    # La línea larga se corta en el fin de frase
+    assert ("Una línea larga que supera el límite.", ' ') in fragmentos
+
+def test_dividir_texto_corto_es_un_solo_fragmento():
+    assert dividir_en_fragmentos("hola\nmundo", 5000) == [("hola\nmundo", '')]
+
+def test_traducir_conserva_la_disposicion(servidor):
+    local = servidor()
+    cliente = ClienteLibreTranslate(local.url, concurrencia=2, max_caracteres=50)
+
+    assert cliente.traducir(LETRA, 'es', 'en') == LETRA.upper()
+    assert local.peticiones > 1
+
+def test_traducir_respeta_la_concurrencia(servidor):
+    local = servidor(latencia_ms=100)
+    cliente = ClienteLibreTranslate(local.url, concurrencia=2, max_caracteres=10)
+    texto = '\n'.join(f"verso {i}" for i in range(8))
+
+    assert cliente.traducir(texto, 'es', 'en') == texto.upper()
+    assert local.peticiones == 8
+    assert local.max_en_curso == 2
+
+def test_reintenta_los_5xx_con_espera(servidor, monkeypatch):
+    monkeypatch.setattr(translator, 'LIBRETRANSLATE_REINTENTOS', 2)
+    local = servidor(fallos=2)
+    cliente = ClienteLibreTranslate(local.url)
+
+    inicio = time.monotonic()
+    assert cliente.traducir("hola", 'es', 'en') == "HOLA"
+    assert local.peticiones == 3
+    # backoff_factor=0.5: el segundo reintento espera 1 s
+    assert time.monotonic() - inicio >= 0.9
+    assert cliente.circuito.estado == cliente.circuito.CERRADO
+
+def test_circuito_se_abre_y_corta_hasta_la_pausa(servidor, monkeypatch):
+    monkeypatch.setattr(translator, 'LIBRETRANSLATE_REINTENTOS', 0)
+    monkeypatch.setattr(translator, 'LIBRETRANSLATE_FALLOS_MAXIMOS', 3)
+    monkeypatch.setattr(translator, 'LIBRETRANSLATE_PAUSA_SEGUNDOS', 0.3)
+    local = servidor(fallos=3)
+    cliente = ClienteLibreTranslate(local.url)
+
+    for _ in range(3):
+        with pytest.raises(Exception, match="HTTP 503"):
+            cliente.traducir("hola", 'es', 'en')
+    assert cliente.circuito.estado == cliente.circuito.ABIERTO
+
+    # Abierto: falla al instante sin llegar al servidor
+    with pytest.raises(CircuitoAbierto):
+        cliente.traducir("hola", 'es', 'en')
+    assert local.peticiones == 3
+    assert cliente.circuito.rechazadas == 1
+
+    # Pasada la pausa, una llamada de prueba sale bien y cierra el circuito
+    time.sleep(0.35)
+    assert cliente.traducir("hola", 'es', 'en') == "HOLA"
+    assert local.peticiones == 4
+    assert cliente.circuito.estado == cliente.circuito.CERRADO
+
+def test_un_4xx_en_la_prueba_libera_el_circuito(servidor, monkeypatch):
+    monkeypatch.setattr(translator, 'LIBRETRANSLATE_REINTENTOS', 0)
+    monkeypatch.setattr(translator, 'LIBRETRANSLATE_FALLOS_MAXIMOS', 1)
+    monkeypatch.setattr(translator, 'LIBRETRANSLATE_PAUSA_SEGUNDOS', 0.2)
+    local = servidor(fallos=1)
+    cliente = ClienteLibreTranslate(local.url)
+
+    with pytest.raises(Exception, match="HTTP 503"):
+        cliente.traducir("hola", 'es', 'en')
+    assert cliente.circuito.estado == cliente.circuito.ABIERTO
+
+    # La llamada de prueba recibe un 400: el servicio responde, no debe quedarse bloqueado
+    time.sleep(0.25)
+    with pytest.raises(Exception, match="HTTP 400"):
+        cliente.traducir("hola", 'es', 'idioma inexistente')
+    assert cliente.circuito.estado == cliente.circuito.CERRADO
+    for _ in range(3):
+        assert cliente.traducir("hola", 'es', 'en') == "HOLA"
+    assert cliente.circuito.rechazadas == 0
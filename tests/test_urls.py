@@ -0,0 +1,55 @@
+"""Pruebas de la canonicalización de URLs de video."""
+import pytest
+
+from urls import canonicalizar_url, clave_desde_info, clave_video, normalizar_url
+
+@pytest.mark.parametrize('url', [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+    "http://m.youtube.com/watch?v=dQw4w9WgXcQ&t=42s",
+    "https://music.youtube.com/watch?v=dQw4w9WgXcQ&list=RDdQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ?t=10",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+    "  HTTPS://WWW.YOUTUBE.COM/watch?v=dQw4w9WgXcQ#comentarios  ",
+])
+def test_enlaces_equivalentes_de_youtube(url):
+    assert canonicalizar_url(url) == ('youtube', 'dQw4w9WgXcQ')
+
+@pytest.mark.parametrize('url, esperado', [
+    ("https://vimeo.com/76979871", ('vimeo', '76979871')),
+    ("https://player.vimeo.com/video/76979871?h=abc", ('vimeo', '76979871')),
+    ("https://vimeo.com/channels/staffpicks/76979871", ('vimeo', '76979871')),
+    ("https://www.dailymotion.com/video/x7tgad0_titulo-del-video", ('dailymotion', 'x7tgad0')),
+    ("https://dai.ly/x7tgad0", ('dailymotion', 'x7tgad0')),
+])
+def test_enlaces_de_vimeo_y_dailymotion(url, esperado):
+    assert canonicalizar_url(url) == esperado
+
+@pytest.mark.parametrize('url', [
+    "https://www.youtube.com/watch?v=corto",
+    "https://www.youtube.com/playlist?list=PL123",
+    "https://vimeo.com/usuario",
+])
+def test_id_invalido_cae_en_generico(url):
+    assert canonicalizar_url(url) == ('generic', normalizar_url(url))
+
+def test_generico_normaliza_host_query_y_fragmento():
+    assert canonicalizar_url("HTTPS://WWW.Ejemplo.com/cancion.mp3?b=2&a=1#t=5") == (
+        'generic', "https://ejemplo.com/cancion.mp3?a=1&b=2"
+    )
+    assert clave_video("https://ejemplo.com") == "generic:https://ejemplo.com/"
+
+def test_generico_conserva_puertos_que_no_son_los_del_esquema():
+    # Otro puerto puede ser otro servidor: no comparten cache
+    assert clave_video("http://ejemplo.com:8080/x") != clave_video("http://ejemplo.com/x")
+    assert normalizar_url("https://user@Ejemplo.com:8443/x") == "https://ejemplo.com:8443/x"
+    assert normalizar_url("https://ejemplo.com:443/x") == "https://ejemplo.com/x"
+    assert normalizar_url("http://ejemplo.com:80/x") == "http://ejemplo.com/x"
+    # El puerto no impide reconocer el sitio
+    assert canonicalizar_url("https://www.youtube.com:443/watch?v=dQw4w9WgXcQ") == ('youtube', 'dQw4w9WgXcQ')
+
+def test_clave_desde_info():
+    assert clave_desde_info({'extractor_key': 'Youtube', 'id': 'dQw4w9WgXcQ'}) == 'youtube:dQw4w9WgXcQ'
+    assert clave_desde_info({'extractor_key': 'Generic', 'id': 'x'}) is None
+    assert clave_desde_info({'extractor_key': 'Vimeo'}) is None
@@ -0,0 +1,32 @@
+"""Pruebas del recorte de regiones sin voz."""
+import numpy as np
+import pytest
+
+from transcriber.vad import FRECUENCIA_MUESTREO, recortar_no_vocal, restaurar_tiempos
+
+@pytest.mark.parametrize('muestras', [0, 100, 319, 320, FRECUENCIA_MUESTREO - 1])
+def test_audio_mas_corto_que_una_ventana_queda_intacto(muestras):
+    audio = np.zeros(muestras, dtype='f4')
+
+    recortado, mapa, omitidos = recortar_no_vocal(audio)
+
+    assert recortado is audio
+    assert mapa == [(0.0, 0.0, muestras / FRECUENCIA_MUESTREO)]
+    assert omitidos == 0.0
+
+def test_omite_el_silencio_y_restaura_los_tiempos():
+    generador = np.random.default_rng(0)
+    segundos_voz = 6
+    # Tono modulado sílaba a sílaba en la banda vocal, tras 10 s de silencio
+    t = np.arange(segundos_voz * FRECUENCIA_MUESTREO) / FRECUENCIA_MUESTREO
+    voz = np.sin(2 * np.pi * 800 * t) * (0.55 + 0.45 * np.sign(np.sin(2 * np.pi * 4 * t)))
+    silencio = generador.standard_normal(10 * FRECUENCIA_MUESTREO) * 1e-4
+    audio = np.concatenate([silencio, voz]).astype('f4')
+
+    recortado, mapa, omitidos = recortar_no_vocal(audio)
+
+    assert omitidos == pytest.approx(9.5)
+    assert len(recortado) == int(6.5 * FRECUENCIA_MUESTREO)
+    segmentos = [{'start': 1.0, 'end': 2.0, 'text': "hola"}]
+    restaurar_tiempos(segmentos, mapa)
+    assert (segmentos[0]['start'], segmentos[0]['end']) == pytest.approx((10.5, 11.5))
@@ -0,0 +1,89 @@
+"""Pruebas de la coalescencia de peticiones y del reparto de avisos del líder."""
+import asyncio
+
+import pipeline
+from vuelo_unico import GrupoVueloUnico
+
+def test_avisos_del_lider_llegan_a_las_seguidoras():
+    async def escenario():
+        grupo = GrupoVueloUnico('prueba')
+        avisos = {'lider': [], 'temprana': [], 'tardia': []}
+
+        async def trabajo():
+            grupo.difundir('clave', 'descargando')
+            await asyncio.sleep(0.05)
+            grupo.difundir('clave', 'transcribiendo')
+            await asyncio.sleep(0.05)
+            grupo.difundir('clave', 'traduciendo')
+            return 42
+
+        async def seguidora(nombre, retraso):
+            await asyncio.sleep(retraso)
+            return await grupo.ejecutar('clave', trabajo, oyente=avisos[nombre].append)
+
+        resultados = await asyncio.gather(
+            grupo.ejecutar('clave', trabajo, oyente=avisos['lider'].append),
+            seguidora('temprana', 0),
+            seguidora('tardia', 0.07),
+        )
+        return grupo, avisos, resultados
+
+    grupo, avisos, resultados = asyncio.run(escenario())
+    assert resultados == [42, 42, 42]
+    assert grupo.ejecuciones == 1 and grupo.coalescidas == 2
+    assert avisos['lider'] == ['descargando', 'transcribiendo', 'traduciendo']
+    assert avisos['temprana'] == ['descargando', 'transcribiendo', 'traduciendo']
+    # La que llega tarde recibe primero la etapa en curso y después las siguientes
+    assert avisos['tardia'] == ['transcribiendo', 'traduciendo']
+    assert not grupo._oyentes and not grupo._ultimo_aviso
+
+def test_seguidora_cancelada_deja_de_recibir_avisos():
+    async def escenario():
+        grupo = GrupoVueloUnico('prueba')
+        recibidos = []
+
+        async def trabajo():
+            await asyncio.sleep(0.05)
+            grupo.difundir('clave', 'transcribiendo')
+            return 'listo'
+
+        lider = asyncio.ensure_future(grupo.ejecutar('clave', trabajo))
+        seguidora = asyncio.ensure_future(
+            grupo.ejecutar('clave', trabajo, oyente=recibidos.append)
+        )
+        await asyncio.sleep(0.01)
+        seguidora.cancel()
+        return await lider, recibidos
+
+    resultado, recibidos = asyncio.run(escenario())
+    assert resultado == 'listo'
+    assert recibidos == []
+
+def test_procesar_cancion_reparte_etapas_entre_idiomas(ruta_base_datos, monkeypatch):
+    descargas = []
+
+    async def obtener_transcripcion(url_str, avisar, modelo=None, en_vivo=None):
+        descargas.append(url_str)
+        avisar(pipeline.ETAPA_DESCARGANDO)
+        await asyncio.sleep(0.05)
+        avisar(pipeline.ETAPA_TRANSCRIBIENDO)
+        await asyncio.sleep(0.05)
+        return {'id': None, 'title': 'Song', 'artist': 'Artist', 'source_url': url_str,
+                'language_src': 'en', 'text_src': 'hello', 'segments': []}
+
+    monkeypatch.setattr(pipeline, '_obtener_transcripcion', obtener_transcripcion)
+    monkeypatch.setattr('translator.traducir_texto', lambda texto, origen, destino: texto)
+
+    async def escenario():
+        etapas = {'es': [], 'fr': []}
+        url = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+        await asyncio.gather(*(
+            pipeline.procesar_cancion(url, idioma, lambda etapa, _, i=idioma: etapas[i].append(etapa))
+            for idioma in etapas
+        ))
+        return etapas
+
+    etapas = asyncio.run(escenario())
+    assert len(descargas) == 1
+    for idioma in ('es', 'fr'):
+        assert etapas[idioma][:2] == [pipeline.ETAPA_DESCARGANDO, pipeline.ETAPA_TRANSCRIBIENDO]
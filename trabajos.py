@@ -0,0 +1,183 @@
+"""
+Sistema de trabajos asíncronos: cola persistente, estado consultable y notificaciones.
+El cliente encola una URL, recibe un id de trabajo y consulta (o escucha) su avance
+en lugar de mantener abierta la conexión HTTP durante minutos.
+"""
+import asyncio
+import json
+import os
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from database import (
+    crear_trabajo, actualizar_trabajo, obtener_trabajo, listar_trabajos_pendientes
+)
+from pipeline import procesar_cancion
+
+# Estados de un trabajo
+ESTADO_EN_COLA = 'queued'
+ESTADO_EN_PROCESO = 'running'
+ESTADO_COMPLETADO = 'done'
+ESTADO_ERROR = 'error'
+
+ESTADOS_FINALES = (ESTADO_COMPLETADO, ESTADO_ERROR)
+
+# Trabajos procesados a la vez (cada uno reparte sus etapas en los pools de `ejecutores`)
+MAX_TRABAJOS_SIMULTANEOS = int(os.getenv('MAX_TRABAJOS_SIMULTANEOS', '4'))
+
+_cola: Optional[asyncio.Queue] = None
+_trabajadores: List[asyncio.Task] = []
+
+# Colas de suscriptores (streaming SSE) por id de trabajo
+_suscriptores: Dict[str, List[asyncio.Queue]] = {}
+
+def _serializar(trabajo: Dict[str, Any]) -> Dict[str, Any]:
+    """Convertir una fila de `jobs` al formato público de la API."""
+    return {
+        'job_id': trabajo['id'],
+        'source_url': trabajo['source_url'],
+        'target_lang': trabajo['target_lang'],
+        'model': trabajo['model'],
+        'batch_id': trabajo['batch_id'],
+        'status': trabajo['status'],
+        'stage': trabajo['stage'],
+        'progress': trabajo['progress'],
+        'result': json.loads(trabajo['result']) if trabajo['result'] else None,
+        'error': trabajo['error'],
+    }
+
+def consultar_trabajo(id_trabajo: str) -> Optional[Dict[str, Any]]:
+    """
+    Consultar el estado público de un trabajo.
+
+    Args:
+        id_trabajo: Identificador del trabajo
+
+    Returns:
+        Estado del trabajo o None si no existe
+    """
+    trabajo = obtener_trabajo(id_trabajo)
+    return _serializar(trabajo) if trabajo else None
+
+def _actualizar_y_publicar(id_trabajo: str, **campos: Any):
+    """Guardar cambios de un trabajo y avisar a sus suscriptores."""
+    actualizar_trabajo(id_trabajo, **campos)
+    estado = consultar_trabajo(id_trabajo)
+    for cola in _suscriptores.get(id_trabajo, []):
+        cola.put_nowait(estado)
+
+async def encolar_trabajo(url: str, idioma_destino: str, modelo: Optional[str] = None) -> str:
+    """
+    Registrar un trabajo y ponerlo en la cola de procesamiento.
+
+    Args:
+        url: URL del video
+        idioma_destino: Código de idioma destino (es, en, pt)
+        modelo: Modelo Whisper (None = WHISPER_MODEL)
+
+    Returns:
+        Identificador del trabajo creado
+    """
+    if _cola is None:
+        raise RuntimeError("Los trabajadores no están iniciados")
+
+    id_trabajo = uuid.uuid4().hex
+    crear_trabajo(id_trabajo, url, idioma_destino, ESTADO_EN_COLA, modelo)
+    await _cola.put(id_trabajo)
+    return id_trabajo
+
+async def poner_en_cola(ids_trabajos: List[str]):
+    """
+    Poner en la cola trabajos ya registrados en la base de datos (p. ej. los de un lote).
+
+    Args:
+        ids_trabajos: Identificadores de trabajos en estado 'queued'
+    """
+    if _cola is None:
+        raise RuntimeError("Los trabajadores no están iniciados")
+    for id_trabajo in ids_trabajos:
+        await _cola.put(id_trabajo)
+
+async def _procesar_trabajo(id_trabajo: str):
+    """Ejecutar el pipeline completo de un trabajo y guardar su resultado."""
+    trabajo = obtener_trabajo(id_trabajo)
+    if trabajo is None or trabajo['status'] in ESTADOS_FINALES:
+        return
+
+    _actualizar_y_publicar(id_trabajo, status=ESTADO_EN_PROCESO, progress=0.0)
+
+    def notificar(etapa: str, progreso: float):
+        _actualizar_y_publicar(id_trabajo, stage=etapa, progress=progreso)
+
+    try:
+        resultado = await procesar_cancion(
+            trabajo['source_url'], trabajo['target_lang'], notificar, trabajo['model']
+        )
+        _actualizar_y_publicar(
+            id_trabajo,
+            status=ESTADO_COMPLETADO,
+            progress=1.0,
+            result=json.dumps(resultado, ensure_ascii=False, default=str)
+        )
+    except Exception as e:
+        _actualizar_y_publicar(id_trabajo, status=ESTADO_ERROR, error=f"Error en el proceso: {str(e)}")
+
+async def _trabajador():
+    """Bucle de un trabajador: toma ids de la cola y los procesa."""
+    while True:
+        id_trabajo = await _cola.get()
+        try:
+            await _procesar_trabajo(id_trabajo)
+        except Exception as e:
+            print(f"Error inesperado en trabajo {id_trabajo}: {e}")
+        finally:
+            _cola.task_done()
+
+async def iniciar_trabajadores():
+    """
+    Crear la cola, recuperar trabajos pendientes y arrancar los trabajadores.
+
+    Los trabajos que quedaron en cola o a medias antes de un reinicio se
+    vuelven a encolar en su orden original.
+    """
+    global _cola
+    _cola = asyncio.Queue()
+
+    for trabajo in listar_trabajos_pendientes([ESTADO_EN_COLA, ESTADO_EN_PROCESO]):
+        if trabajo['status'] == ESTADO_EN_PROCESO:
+            actualizar_trabajo(trabajo['id'], status=ESTADO_EN_COLA, stage=None, progress=0.0)
+        _cola.put_nowait(trabajo['id'])
+
+    for _ in range(MAX_TRABAJOS_SIMULTANEOS):
+        _trabajadores.append(asyncio.create_task(_trabajador()))
+
+async def detener_trabajadores():
+    """Cancelar los trabajadores (los trabajos a medias se retoman al reiniciar)."""
+    for tarea in _trabajadores:
+        tarea.cancel()
+    await asyncio.gather(*_trabajadores, return_exceptions=True)
+    _trabajadores.clear()
+
+async def escuchar_trabajo(id_trabajo: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Emitir el estado de un trabajo cada vez que cambia, hasta que termina.
+
+    Args:
+        id_trabajo: Identificador del trabajo
+
+    Yields:
+        Estado público del trabajo
+    """
+    cola: asyncio.Queue = asyncio.Queue()
+    _suscriptores.setdefault(id_trabajo, []).append(cola)
+    try:
+        estado = consultar_trabajo(id_trabajo)
+        while estado is not None:
+            yield estado
+            if estado['status'] in ESTADOS_FINALES:
+                break
+            estado = await cola.get()
+    finally:
+        _suscriptores[id_trabajo].remove(cola)
+        if not _suscriptores[id_trabajo]:
+            del _suscriptores[id_trabajo]
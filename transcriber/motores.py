@@ -0,0 +1,204 @@
+"""
+Motores de transcripción intercambiables.
+Todos exponen la misma interfaz (`transcribir`) y se eligen con la variable
+de entorno WHISPER_BACKEND:
+
+- openai: OpenAI Whisper sobre PyTorch (FP32 en CPU)
+- faster: faster-whisper sobre CTranslate2, cuantizado a int8 por defecto
+- modulo:Clase: cualquier otra implementación de `MotorTranscripcion`
+"""
+import importlib
+import importlib.util
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Type, Union
+
+import numpy as np
+
+# Los motores importan su librería (torch, CTranslate2) al crearse, no al importar este módulo
+FASTER_WHISPER_DISPONIBLE = importlib.util.find_spec('faster_whisper') is not None
+
+# Motor por defecto
+MOTOR_WHISPER = os.getenv('WHISPER_BACKEND', 'openai')
+
+# Tiempos por palabra (LRC karaoke); cuesta una pasada extra de alineación
+PALABRAS = os.getenv('WHISPER_PALABRAS', '0') == '1'
+
+# Tipo de cómputo de CTranslate2 (int8, int8_float32, float32...)
+TIPO_COMPUTO = os.getenv('WHISPER_COMPUTE_TYPE', 'int8')
+
+Audio = Union[str, np.ndarray]
+
+class MotorTranscripcion(ABC):
+    """
+    Interfaz común de los motores de transcripción.
+
+    Las subclases cargan el modelo en `__init__` e implementan `transcribir`
+    y `detectar_idioma`; una a la que le falte alguno no se puede instanciar,
+    así un WHISPER_BACKEND mal configurado falla al crear el motor y no en la
+    primera canción.
+    """
+
+    nombre = 'base'
+
+    def __init__(self, modelo: str):
+        self.nombre_modelo = modelo
+
+    @abstractmethod
+    def transcribir(self, audio: Audio, idioma: Optional[str] = None,
+                    contexto: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Transcribir audio.
+
+        Args:
+            audio: Ruta al archivo o muestras PCM float32 mono 16 kHz
+            idioma: Código de idioma si ya se conoce (None = detección automática)
+            contexto: Texto previo al audio (el fragmento anterior al transcribir
+                      por partes); condiciona la decodificación como dentro de Whisper
+
+        Returns:
+            Diccionario con 'text', 'language' y 'segments' (lista de {start, end, text},
+            más 'words' [{start, end, word}] con WHISPER_PALABRAS=1)
+        """
+
+    @abstractmethod
+    def detectar_idioma(self, audio: np.ndarray) -> str:
+        """
+        Detectar el idioma de una ventana de audio (hasta 30 s).
+
+        Un motor sin detección propia puede delegar en esta implementación
+        (`super().detectar_idioma(audio)`), que transcribe la ventana.
+
+        Args:
+            audio: Muestras PCM float32 mono 16 kHz
+
+        Returns:
+            Código de idioma detectado
+        """
+        return self.transcribir(audio)['language']
+
+class MotorOpenAIWhisper(MotorTranscripcion):
+    """OpenAI Whisper (PyTorch)."""
+
+    nombre = 'openai'
+
+    def __init__(self, modelo: str):
+        super().__init__(modelo)
+        import whisper
+        self.modelo = whisper.load_model(modelo)
+
+    def transcribir(self, audio: Audio, idioma: Optional[str] = None,
+                    contexto: Optional[str] = None) -> Dict[str, Any]:
+        resultado = self.modelo.transcribe(
+            audio,
+            fp16=False,  # Usar FP32 para compatibilidad (FP16 requiere GPU CUDA)
+            language=idioma,  # None: detección automática
+            task='transcribe',  # Transcribir (no traducir aquí)
+            word_timestamps=PALABRAS,
+            initial_prompt=contexto
+        )
+        segmentos = []
+        for s in resultado['segments']:
+            segmento = {'start': s['start'], 'end': s['end'], 'text': s['text']}
+            if 'words' in s:
+                segmento['words'] = [
+                    {'start': p['start'], 'end': p['end'], 'word': p['word']} for p in s['words']
+                ]
+            segmentos.append(segmento)
+        return {
+            'text': resultado['text'].strip(),
+            'language': resultado['language'],
+            'segments': segmentos
+        }
+
+    def detectar_idioma(self, audio: np.ndarray) -> str:
+        import whisper
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), self.modelo.dims.n_mels)
+        _, probabilidades = self.modelo.detect_language(mel.to(self.modelo.device))
+        return max(probabilidades, key=probabilidades.get)
+
+class MotorFasterWhisper(MotorTranscripcion):
+    """faster-whisper (CTranslate2), cuantizado para CPU."""
+
+    nombre = 'faster'
+
+    def __init__(self, modelo: str):
+        super().__init__(modelo)
+        if not FASTER_WHISPER_DISPONIBLE:
+            raise Exception("faster-whisper no está instalado (pip install faster-whisper)")
+        import faster_whisper
+        self.modelo = faster_whisper.WhisperModel(
+            modelo,
+            device='cpu',
+            compute_type=TIPO_COMPUTO,
+            # 0: CTranslate2 decide; el pool de procesos fija WHISPER_HILOS por proceso
+            cpu_threads=int(os.getenv('WHISPER_HILOS', '0'))
+        )
+
+    def transcribir(self, audio: Audio, idioma: Optional[str] = None,
+                    contexto: Optional[str] = None) -> Dict[str, Any]:
+        segmentos, info = self.modelo.transcribe(
+            audio, language=idioma, task='transcribe', word_timestamps=PALABRAS,
+            initial_prompt=contexto
+        )
+        # `segmentos` es un generador: la decodificación ocurre al recorrerlo
+        segmentos = [
+            dict(
+                {'start': s.start, 'end': s.end, 'text': s.text},
+                **({'words': [{'start': p.start, 'end': p.end, 'word': p.word} for p in s.words]}
+                   if s.words else {})
+            )
+            for s in segmentos
+        ]
+        return {
+            'text': ''.join(s['text'] for s in segmentos).strip(),
+            'language': info.language,
+            'segments': segmentos
+        }
+
+    def detectar_idioma(self, audio: np.ndarray) -> str:
+        # La detección ocurre al llamar a transcribe; los segmentos no se recorren
+        _, info = self.modelo.transcribe(audio, task='transcribe')
+        return info.language
+
+MOTORES: Dict[str, Type[MotorTranscripcion]] = {
+    MotorOpenAIWhisper.nombre: MotorOpenAIWhisper,
+    MotorFasterWhisper.nombre: MotorFasterWhisper,
+}
+
+def clase_motor(nombre: str) -> Type[MotorTranscripcion]:
+    """
+    Resolver el nombre de un motor a su clase.
+
+    Args:
+        nombre: Nombre registrado ('openai', 'faster') o ruta 'modulo:Clase'
+
+    Returns:
+        Clase del motor
+
+    Raises:
+        ValueError: Si el nombre no es un motor registrado ni una ruta 'modulo:Clase'
+        TypeError: Si la clase no es un `MotorTranscripcion`
+    """
+    if nombre in MOTORES:
+        return MOTORES[nombre]
+    if ':' in nombre:
+        modulo, clase = nombre.split(':', 1)
+        motor = getattr(importlib.import_module(modulo), clase)
+        if not (isinstance(motor, type) and issubclass(motor, MotorTranscripcion)):
+            raise TypeError(f"{nombre} no es una subclase de MotorTranscripcion")
+        return motor
+    raise ValueError(f"Motor de transcripción desconocido: {nombre}")
+
+def crear_motor(modelo: str, nombre: Optional[str] = None) -> MotorTranscripcion:
+    """
+    Crear y cargar un motor de transcripción.
+
+    Args:
+        modelo: Tamaño o ruta del modelo (tiny, base, small...)
+        nombre: Motor a usar (por defecto WHISPER_BACKEND)
+
+    Returns:
+        Motor con el modelo cargado
+    """
+    return clase_motor(nombre or MOTOR_WHISPER)(modelo)
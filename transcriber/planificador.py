@@ -0,0 +1,270 @@
+"""
+Planificador de inferencia por lotes para Whisper.
+Divide el audio de cada trabajo en ventanas de 30 s y agrupa ventanas de
+trabajos distintos en una sola pasada de encoder/decoder, repartiendo luego
+los resultados a cada trabajo.
+
+A diferencia de `modelo.transcribe`, cada ventana se decodifica de forma
+independiente (sin condicionar con el texto previo ni reintentos con
+temperatura), a cambio de aprovechar mucho mejor la CPU con varios trabajos.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import whisper
+
+from .motores import MotorOpenAIWhisper
+from .vad import VAD_ACTIVADO, MapaTiempos, recortar_no_vocal, restaurar_tiempos
+from .whisper_transcriber import cargar_modelo
+
+# Configuración del planificador (variables de entorno)
+LOTE_MAXIMO = int(os.getenv('WHISPER_LOTE_MAXIMO', '8'))
+ESPERA_MAXIMA_MS = int(os.getenv('WHISPER_ESPERA_MAXIMA_MS', '100'))
+
+# Umbrales de `whisper.transcribe` para descartar ventanas sin voz
+UMBRAL_SIN_VOZ = 0.6
+UMBRAL_LOGPROB = -1.0
+
+class _Trabajo:
+    """Estado de un audio enviado al planificador."""
+
+    def __init__(self, ventanas: List[np.ndarray], duracion: float,
+                 mapa: Optional[MapaTiempos] = None, segundos_omitidos: Optional[float] = None):
+        self.ventanas = ventanas
+        self.duracion = duracion
+        # Con VAD: mapa para llevar los tiempos al audio original
+        self.mapa = mapa
+        self.segundos_omitidos = segundos_omitidos
+        # Parte de cada lote que le corresponde (duración del lote / ventanas del lote)
+        self.segundos_inferencia = 0.0
+        self.textos: List[Optional[str]] = [None] * len(ventanas)
+        self.pendientes = len(ventanas)
+        self.idioma: Optional[str] = None
+        self.futuro: Future = Future()
+
+class _Ventana:
+    """Ventana de 30 s de un trabajo, a la espera de un lote."""
+
+    def __init__(self, trabajo: _Trabajo, indice: int, idioma: Optional[str]):
+        self.trabajo = trabajo
+        self.indice = indice
+        # None: la primera ventana del trabajo detecta el idioma
+        self.idioma = idioma
+        self.llegada = time.monotonic()
+
+class PlanificadorLotes:
+    """
+    Agrupa ventanas de varios trabajos en lotes para el modelo Whisper.
+
+    Un hilo dedicado forma lotes de hasta `lote_maximo` ventanas, esperando
+    como mucho `espera_maxima_ms` desde la ventana más antigua. Las ventanas
+    de un lote comparten idioma; la primera ventana de cada trabajo detecta
+    el idioma y el resto del trabajo se encola con ese idioma.
+    """
+
+    def __init__(self, modelo=None, lote_maximo: int = LOTE_MAXIMO,
+                 espera_maxima_ms: int = ESPERA_MAXIMA_MS):
+        if modelo is None:
+            motor = cargar_modelo()
+            if not isinstance(motor, MotorOpenAIWhisper):
+                raise Exception("El planificador de lotes requiere WHISPER_BACKEND=openai")
+            modelo = motor.modelo
+        self.modelo = modelo
+        self.lote_maximo = lote_maximo
+        self.espera_maxima = espera_maxima_ms / 1000
+        self._pendientes: List[_Ventana] = []
+        self._condicion = threading.Condition()
+        self._cerrado = False
+        self.lotes_procesados = 0
+        self.ventanas_procesadas = 0
+        self._hilo = threading.Thread(target=self._bucle, name='planificador-whisper', daemon=True)
+        self._hilo.start()
+
+    def enviar(self, audio: Union[Path, np.ndarray]) -> Future:
+        """
+        Enviar un audio para transcribir.
+
+        Args:
+            audio: Path a un archivo de audio o muestras PCM float32 mono 16 kHz
+
+        Returns:
+            Future con el mismo formato que `transcribir_audio` más 'segments'
+        """
+        if isinstance(audio, Path):
+            from downloader import decodificar_pcm
+            audio = decodificar_pcm(str(audio))
+
+        # Sin intros ni solos instrumentales: la primera ventana (la que
+        # detecta el idioma) es ya la primera con voz
+        mapa = omitidos = None
+        if VAD_ACTIVADO:
+            audio, mapa, omitidos = recortar_no_vocal(audio)
+
+        muestras_ventana = whisper.audio.N_SAMPLES
+        ventanas = [audio[i:i + muestras_ventana] for i in range(0, len(audio), muestras_ventana)]
+        trabajo = _Trabajo(ventanas or [audio], len(audio) / whisper.audio.SAMPLE_RATE, mapa, omitidos)
+
+        with self._condicion:
+            if self._cerrado:
+                raise RuntimeError("El planificador está cerrado")
+            self._pendientes.append(_Ventana(trabajo, 0, None))
+            self._condicion.notify()
+        return trabajo.futuro
+
+    def cerrar(self):
+        """Detener el hilo del planificador (las ventanas pendientes se descartan)."""
+        with self._condicion:
+            self._cerrado = True
+            pendientes, self._pendientes = self._pendientes, []
+            self._condicion.notify()
+        for ventana in pendientes:
+            if not ventana.trabajo.futuro.done():
+                ventana.trabajo.futuro.set_exception(RuntimeError("El planificador se cerró"))
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Lotes procesados y tamaño medio de lote."""
+        return {
+            'lotes': self.lotes_procesados,
+            'ventanas': self.ventanas_procesadas,
+            'lote_medio': round(self.ventanas_procesadas / self.lotes_procesados, 2)
+                          if self.lotes_procesados else 0.0,
+        }
+
+    def _tomar_lote(self) -> Optional[List[_Ventana]]:
+        """Esperar y extraer el siguiente lote (ventanas con el mismo idioma)."""
+        with self._condicion:
+            while not self._pendientes and not self._cerrado:
+                self._condicion.wait()
+            if self._cerrado:
+                return None
+
+            # Esperar a que se llene el lote o venza el plazo de la ventana más antigua
+            limite = self._pendientes[0].llegada + self.espera_maxima
+            while len(self._pendientes) < self.lote_maximo and not self._cerrado:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self._condicion.wait(restante)
+
+            idioma = self._pendientes[0].idioma
+            lote = [v for v in self._pendientes if v.idioma == idioma][:self.lote_maximo]
+            for ventana in lote:
+                self._pendientes.remove(ventana)
+            return lote
+
+    def _bucle(self):
+        """Hilo del planificador: forma lotes y los procesa hasta que se cierra."""
+        while True:
+            lote = self._tomar_lote()
+            if lote is None:
+                return
+            try:
+                self._procesar_lote(lote)
+            except Exception as e:
+                error = Exception(f"Error en transcripción Whisper: {str(e)}")
+                for ventana in lote:
+                    if not ventana.trabajo.futuro.done():
+                        ventana.trabajo.futuro.set_exception(error)
+
+    def _procesar_lote(self, lote: List[_Ventana]):
+        """Decodificar un lote y repartir los textos a sus trabajos."""
+        import torch
+
+        inicio = time.perf_counter()
+        n_mels = self.modelo.dims.n_mels
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(ventana.trabajo.ventanas[ventana.indice]), n_mels
+            )
+            for ventana in lote
+        ]).to(self.modelo.device)
+
+        opciones = whisper.DecodingOptions(
+            task='transcribe',
+            language=lote[0].idioma,
+            without_timestamps=True,
+            fp16=False
+        )
+        resultados = self.modelo.decode(mels, opciones)
+        segundos_por_ventana = (time.perf_counter() - inicio) / len(lote)
+        self.lotes_procesados += 1
+        self.ventanas_procesadas += len(lote)
+
+        nuevas = []
+        for ventana, resultado in zip(lote, resultados):
+            trabajo = ventana.trabajo
+            if trabajo.futuro.done():
+                continue
+
+            sin_voz = (resultado.no_speech_prob > UMBRAL_SIN_VOZ
+                       and resultado.avg_logprob < UMBRAL_LOGPROB)
+            trabajo.textos[ventana.indice] = '' if sin_voz else resultado.text.strip()
+            trabajo.segundos_inferencia += segundos_por_ventana
+            trabajo.pendientes -= 1
+
+            if ventana.idioma is None:
+                # Primera ventana: fijar idioma y encolar el resto del trabajo
+                trabajo.idioma = resultado.language
+                nuevas.extend(
+                    _Ventana(trabajo, i, trabajo.idioma) for i in range(1, len(trabajo.ventanas))
+                )
+
+            if trabajo.pendientes == 0:
+                trabajo.futuro.set_result(self._armar_resultado(trabajo))
+
+        if nuevas:
+            with self._condicion:
+                self._pendientes.extend(nuevas)
+                self._condicion.notify()
+
+    @staticmethod
+    def _armar_resultado(trabajo: _Trabajo) -> Dict[str, Any]:
+        """Unir los textos de las ventanas en el resultado final del trabajo."""
+        segundos_ventana = whisper.audio.CHUNK_LENGTH
+        segmentos = [
+            {
+                'start': float(i * segundos_ventana),
+                'end': float(min((i + 1) * segundos_ventana, trabajo.duracion)),
+                'text': texto,
+            }
+            for i, texto in enumerate(trabajo.textos) if texto
+        ]
+        resultado = {
+            'text': ' '.join(s['text'] for s in segmentos).strip(),
+            'language': trabajo.idioma,
+            'segments': segmentos,
+            'segundos_inferencia': trabajo.segundos_inferencia,
+        }
+        if trabajo.mapa is not None:
+            restaurar_tiempos(segmentos, trabajo.mapa)
+            resultado['segundos_omitidos'] = trabajo.segundos_omitidos
+        return resultado
+
+_planificador: Optional[PlanificadorLotes] = None
+_bloqueo = threading.Lock()
+
+def obtener_planificador() -> PlanificadorLotes:
+    """
+    Obtener el planificador compartido del proceso (se crea la primera vez).
+
+    Returns:
+        Planificador de lotes con el modelo configurado en `WHISPER_MODEL`
+    """
+    global _planificador
+    with _bloqueo:
+        if _planificador is None:
+            _planificador = PlanificadorLotes()
+        return _planificador
+
+def cerrar_planificador():
+    """Detener el planificador compartido si existe."""
+    global _planificador
+    with _bloqueo:
+        if _planificador is not None:
+            _planificador.cerrar()
+            _planificador = None
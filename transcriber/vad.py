@@ -0,0 +1,194 @@
+"""
+Detección de voz (VAD) previa a Whisper.
+Marca qué segundos del audio tienen voz cantada o hablada para recortar
+intros, solos e interludios instrumentales antes de la inferencia: se
+decodifica menos audio y Whisper no inventa texto sobre la música.
+
+Motores (variable de entorno WHISPER_VAD_MOTOR):
+
+- energia: heurística con numpy (energía y modulación en la banda vocal)
+- webrtc: webrtcvad, si está instalado (pip install webrtcvad)
+"""
+import os
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    import webrtcvad
+    WEBRTCVAD_DISPONIBLE = True
+except ImportError:
+    WEBRTCVAD_DISPONIBLE = False
+
+FRECUENCIA_MUESTREO = 16000
+
+# Recortar regiones sin voz antes de transcribir (0 = desactivado)
+VAD_ACTIVADO = os.getenv('WHISPER_VAD', '1') == '1'
+VAD_MOTOR = os.getenv('WHISPER_VAD_MOTOR', 'energia')
+# Sólo se omiten tramos sin voz de al menos esta duración
+MIN_SEGUNDOS_OMITIR = float(os.getenv('WHISPER_VAD_MIN_OMITIR', '4'))
+# Margen que se conserva alrededor de cada región con voz
+RELLENO_SEGUNDOS = 0.5
+
+# Heurística de energía: tramos de 20 ms agrupados en ventanas de 1 s
+MUESTRAS_TRAMO = FRECUENCIA_MUESTREO // 50
+TRAMOS_VENTANA = 50
+BANDA_VOCAL_HZ = (300, 3400)
+# Proporción mínima de energía en la banda vocal (baja: en una mezcla el bajo
+# y el bombo suelen dominar aunque haya voz)
+UMBRAL_BANDA = 0.1
+# dB sobre el piso de ruido (percentil 10) para no considerar silencio
+UMBRAL_ENERGIA_DB = 10.0
+# Desviación mínima (dB) de la energía vocal dentro de la ventana: la voz
+# varía sílaba a sílaba, un pad o una nota sostenida no
+UMBRAL_MODULACION_DB = 3.0
+# Tramos procesados por bloque de FFT (limita la memoria con audios largos)
+TRAMOS_POR_BLOQUE = 3000
+
+# (inicio en el audio recortado, inicio en el audio original, duración), en segundos
+MapaTiempos = List[Tuple[float, float, float]]
+
+def _ventanas_vocales_energia(audio: np.ndarray) -> np.ndarray:
+    """Clasificar cada ventana de 1 s como vocal o no con la heurística de energía."""
+    n_tramos = len(audio) // MUESTRAS_TRAMO
+    frecuencias = np.fft.rfftfreq(MUESTRAS_TRAMO, 1 / FRECUENCIA_MUESTREO)
+    banda = (frecuencias >= BANDA_VOCAL_HZ[0]) & (frecuencias <= BANDA_VOCAL_HZ[1])
+    hann = np.hanning(MUESTRAS_TRAMO).astype(np.float32)
+
+    energia_banda = np.empty(n_tramos, dtype=np.float32)
+    proporcion = np.empty(n_tramos, dtype=np.float32)
+    for desde in range(0, n_tramos, TRAMOS_POR_BLOQUE):
+        hasta = min(desde + TRAMOS_POR_BLOQUE, n_tramos)
+        tramos = audio[desde * MUESTRAS_TRAMO:hasta * MUESTRAS_TRAMO].reshape(-1, MUESTRAS_TRAMO)
+        espectro = np.abs(np.fft.rfft(tramos * hann, axis=1)).astype(np.float32) ** 2
+        energia_banda[desde:hasta] = espectro[:, banda].sum(axis=1)
+        proporcion[desde:hasta] = energia_banda[desde:hasta] / (espectro.sum(axis=1) + 1e-10)
+
+    energia_db = 10 * np.log10(energia_banda + 1e-10)
+    piso = np.percentile(energia_db, 10)
+
+    n_ventanas = n_tramos // TRAMOS_VENTANA
+    energia_db = energia_db[:n_ventanas * TRAMOS_VENTANA].reshape(n_ventanas, TRAMOS_VENTANA)
+    proporcion = proporcion[:n_ventanas * TRAMOS_VENTANA].reshape(n_ventanas, TRAMOS_VENTANA)
+
+    return (
+        (energia_db.mean(axis=1) > piso + UMBRAL_ENERGIA_DB)
+        & (proporcion.mean(axis=1) > UMBRAL_BANDA)
+        & (energia_db.std(axis=1) > UMBRAL_MODULACION_DB)
+    )
+
+def _ventanas_vocales_webrtc(audio: np.ndarray) -> np.ndarray:
+    """Clasificar cada ventana de 1 s con webrtcvad (mayoría de tramos de 20 ms con voz)."""
+    if not WEBRTCVAD_DISPONIBLE:
+        raise Exception("webrtcvad no está instalado (pip install webrtcvad)")
+    vad = webrtcvad.Vad(2)
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    n_tramos = len(pcm) // MUESTRAS_TRAMO
+    voz = np.array([
+        vad.is_speech(pcm[i * MUESTRAS_TRAMO:(i + 1) * MUESTRAS_TRAMO].tobytes(), FRECUENCIA_MUESTREO)
+        for i in range(n_tramos)
+    ], dtype=bool)
+    n_ventanas = n_tramos // TRAMOS_VENTANA
+    return voz[:n_ventanas * TRAMOS_VENTANA].reshape(n_ventanas, TRAMOS_VENTANA).mean(axis=1) > 0.5
+
+def detectar_regiones_vocales(audio: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Detectar las regiones del audio con voz.
+
+    Los tramos sin voz más cortos que `MIN_SEGUNDOS_OMITIR` se conservan
+    (pausas entre versos) y cada región se amplía `RELLENO_SEGUNDOS` por
+    ambos lados para no cortar la primera o la última sílaba.
+
+    Args:
+        audio: Muestras PCM float32 mono 16 kHz
+
+    Returns:
+        Lista de rangos (inicio, fin) en muestras; vacía si no se detectó voz
+        o el audio no llega a una ventana
+    """
+    # Sin una ventana completa no hay nada que clasificar (y el piso de ruido
+    # de la heurística de energía saldría de un array vacío)
+    if len(audio) < MUESTRAS_TRAMO * TRAMOS_VENTANA:
+        return []
+
+    if VAD_MOTOR == 'webrtc':
+        vocales = _ventanas_vocales_webrtc(audio)
+    else:
+        vocales = _ventanas_vocales_energia(audio)
+
+    regiones = []
+    inicio = None
+    for segundo, vocal in enumerate(vocales):
+        if vocal and inicio is None:
+            inicio = segundo
+        elif not vocal and inicio is not None:
+            regiones.append([inicio, segundo])
+            inicio = None
+    if inicio is not None:
+        regiones.append([inicio, len(vocales)])
+
+    # Unir regiones separadas por pausas cortas
+    unidas: List[List[float]] = []
+    for inicio, fin in regiones:
+        if unidas and inicio - unidas[-1][1] < MIN_SEGUNDOS_OMITIR:
+            unidas[-1][1] = fin
+        else:
+            unidas.append([inicio, fin])
+
+    duracion = len(audio) / FRECUENCIA_MUESTREO
+    return [
+        (int(max(0.0, inicio - RELLENO_SEGUNDOS) * FRECUENCIA_MUESTREO),
+         int(min(duracion, fin + RELLENO_SEGUNDOS) * FRECUENCIA_MUESTREO))
+        for inicio, fin in unidas
+    ]
+
+def recortar_no_vocal(audio: np.ndarray) -> Tuple[np.ndarray, MapaTiempos, float]:
+    """
+    Quitar las regiones sin voz del audio.
+
+    Si no se detecta voz en ningún punto se devuelve el audio completo: es
+    preferible transcribir de más que perder una canción entera por un
+    falso negativo.
+
+    Args:
+        audio: Muestras PCM float32 mono 16 kHz
+
+    Returns:
+        Tupla (audio recortado, mapa de tiempos para `restaurar_tiempos`,
+        segundos omitidos)
+    """
+    duracion = len(audio) / FRECUENCIA_MUESTREO
+    regiones = detectar_regiones_vocales(audio)
+    if not regiones:
+        return audio, [(0.0, 0.0, duracion)], 0.0
+
+    mapa: MapaTiempos = []
+    posicion = 0.0
+    for inicio, fin in regiones:
+        segundos = (fin - inicio) / FRECUENCIA_MUESTREO
+        mapa.append((posicion, inicio / FRECUENCIA_MUESTREO, segundos))
+        posicion += segundos
+
+    recortado = np.concatenate([audio[inicio:fin] for inicio, fin in regiones])
+    return recortado, mapa, duracion - posicion
+
+def _tiempo_original(tiempo: float, mapa: MapaTiempos) -> float:
+    """Llevar un instante del audio recortado al audio original."""
+    for inicio_recortado, inicio_original, segundos in reversed(mapa):
+        if tiempo >= inicio_recortado:
+            return inicio_original + min(tiempo - inicio_recortado, segundos)
+    return mapa[0][1] + tiempo
+
+def restaurar_tiempos(segmentos: List[Dict[str, Any]], mapa: MapaTiempos) -> None:
+    """
+    Corregir (en el lugar) las marcas de tiempo de segmentos transcritos
+    sobre el audio recortado para que apunten al audio original.
+
+    Args:
+        segmentos: Lista de {start, end, text, words?}
+        mapa: Mapa devuelto por `recortar_no_vocal`
+    """
+    for segmento in segmentos:
+        for marca in [segmento] + segmento.get('words', []):
+            marca['start'] = _tiempo_original(marca['start'], mapa)
+            marca['end'] = _tiempo_original(marca['end'], mapa)
@@ -1,61 +1,387 @@
 """
 Módulo de transcripción usando OpenAI Whisper.
 Detecta idioma automáticamente y transcribe audio a texto.
+El motor (openai-whisper o faster-whisper) se elige con WHISPER_BACKEND
+(ver `motores.py`).
 """
-import whisper
 import os
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .motores import MotorTranscripcion, crear_motor
+from .vad import VAD_ACTIVADO, recortar_no_vocal, restaurar_tiempos
 
 # Modelo por defecto (puede cambiarse con variable de entorno)
 MODELO_WHISPER = os.getenv('WHISPER_MODEL', 'small')
 
-# Cache del modelo cargado
-_modelo_cache = None
+FRECUENCIA_MUESTREO = 16000
+
+# Transcripción por fragmentos en paralelo para audios largos (0 = desactivada)
+FRAGMENTAR_DESDE_SEGUNDOS = float(os.getenv('WHISPER_FRAGMENTAR_DESDE_SEGUNDOS', '0'))
+# Duración objetivo de cada fragmento; el corte se mueve al silencio más cercano
+SEGUNDOS_FRAGMENTO = float(os.getenv('WHISPER_SEGUNDOS_FRAGMENTO', '300'))
+# Margen hacia atrás (en segundos) donde se busca el silencio para cortar
+MARGEN_BUSQUEDA_SILENCIO = 30.0
+
+# Modelos que se cargan y calientan al arrancar (separados por comas)
+MODELOS_PRECARGA = [
+    m.strip() for m in os.getenv('WHISPER_MODELOS_PRECARGA', MODELO_WHISPER).split(',') if m.strip()
+]
+# Modelos que una petición puede elegir (p. ej. tiny para vistas previas)
+MODELOS_PERMITIDOS = [
+    m.strip() for m in os.getenv('WHISPER_MODELOS_PERMITIDOS', ','.join(MODELOS_PRECARGA)).split(',')
+    if m.strip()
+]
+# Memoria máxima (MB) para modelos de Whisper en total: cada proceso del pool de
+# transcripción recibe una parte igual (ver `ejecutores.py`)
+PRESUPUESTO_MEMORIA_MB = int(os.getenv('WHISPER_PRESUPUESTO_MB', '4096'))
+
+# Memoria aproximada de cada tamaño en CPU (pesos FP32 más buffers de inferencia)
+MEMORIA_ESTIMADA_MB = {
+    'tiny': 250,
+    'base': 400,
+    'small': 1100,
+    'medium': 3000,
+    'large': 6000,
+    'turbo': 3500,
+}
+MEMORIA_DESCONOCIDA_MB = 2000
+
+def memoria_estimada(modelo: str) -> int:
+    """
+    Estimar la memoria que ocupa un modelo cargado.
+    
+    Args:
+        modelo: Tamaño del modelo (tiny, base, small, medium, large-v3, small.en...)
+    
+    Returns:
+        Memoria aproximada en MB
+    """
+    base = modelo.split('.')[0].split('-')[0]
+    return MEMORIA_ESTIMADA_MB.get(base, MEMORIA_DESCONOCIDA_MB)
+
+def memoria_precarga() -> int:
+    """Memoria estimada (MB) de WHISPER_MODELOS_PRECARGA, lo que carga cada proceso al arrancar."""
+    return sum(memoria_estimada(modelo) for modelo in MODELOS_PRECARGA)
+
+class PoolModelos:
+    """
+    Modelos cargados en el proceso, con presupuesto de memoria y desalojo LRU.
+    
+    Al pedir un modelo que no cabe en el presupuesto se descargan los menos
+    usados recientemente. Un modelo desalojado que todavía está transcribiendo
+    en otro hilo sigue vivo hasta que esa llamada termina.
+    
+    La carga se hace fuera del bloqueo: mientras un modelo se carga (decenas
+    de segundos), los ya cargados se siguen entregando. Quien pide un modelo
+    que otro hilo está cargando espera esa misma carga.
+    """
+    
+    def __init__(self, presupuesto_mb: int = PRESUPUESTO_MEMORIA_MB):
+        self.presupuesto_mb = presupuesto_mb
+        self._modelos: 'OrderedDict[str, MotorTranscripcion]' = OrderedDict()
+        # Modelos en carga (su memoria ya cuenta como reservada)
+        self._cargando: Dict[str, Future] = {}
+        self._bloqueo = threading.Lock()
+        self.cargas = 0
+        self.desalojos = 0
+    
+    def obtener(self, modelo: str) -> MotorTranscripcion:
+        """
+        Obtener un modelo cargado, cargándolo si hace falta.
+        
+        Args:
+            modelo: Tamaño del modelo
+        
+        Returns:
+            Motor de transcripción con el modelo cargado
+        """
+        with self._bloqueo:
+            if modelo in self._modelos:
+                self._modelos.move_to_end(modelo)
+                return self._modelos[modelo]
+            
+            futuro = self._cargando.get(modelo)
+            if futuro is None:
+                # Liberar antes de cargar para no superar el presupuesto durante la carga
+                necesario = memoria_estimada(modelo)
+                while self._modelos and self._memoria_en_uso() + necesario > self.presupuesto_mb:
+                    self._modelos.popitem(last=False)
+                    self.desalojos += 1
+                futuro = self._cargando[modelo] = Future()
+                cargar = True
+            else:
+                cargar = False
+        
+        if not cargar:
+            return futuro.result()
+        
+        try:
+            motor = crear_motor(modelo)
+        except BaseException as e:
+            with self._bloqueo:
+                del self._cargando[modelo]
+            futuro.set_exception(e)
+            raise
+        with self._bloqueo:
+            del self._cargando[modelo]
+            self._modelos[modelo] = motor
+            self.cargas += 1
+        futuro.set_result(motor)
+        return motor
+    
+    def _memoria_en_uso(self) -> int:
+        """Memoria de los modelos cargados y de los que se están cargando."""
+        return sum(memoria_estimada(m) for m in [*self._modelos, *self._cargando])
+    
+    def cargados(self) -> List[str]:
+        """Modelos cargados, del menos al más usado recientemente."""
+        with self._bloqueo:
+            return list(self._modelos)
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        """Modelos cargados, memoria estimada y cargas/desalojos acumulados."""
+        with self._bloqueo:
+            return {
+                'modelos': list(self._modelos),
+                'memoria_mb': self._memoria_en_uso(),
+                'presupuesto_mb': self.presupuesto_mb,
+                'cargas': self.cargas,
+                'desalojos': self.desalojos,
+            }
+
+# Pool de modelos del proceso
+_pool_modelos = PoolModelos()
+
+def cargar_modelo(modelo: Optional[str] = None) -> MotorTranscripcion:
+    """
+    Cargar un modelo Whisper en el motor configurado (usa el pool para no recargar).
+    
+    Args:
+        modelo: Tamaño del modelo (por defecto WHISPER_MODEL)
+    
+    Returns:
+        Motor de transcripción con el modelo cargado
+    """
+    return _pool_modelos.obtener(modelo or MODELO_WHISPER)
+
+def fijar_presupuesto(presupuesto_mb: int):
+    """Fijar el presupuesto de memoria de este proceso (su parte de WHISPER_PRESUPUESTO_MB)."""
+    _pool_modelos.presupuesto_mb = presupuesto_mb
+
+def estadisticas_modelos() -> Dict[str, Any]:
+    """Estado del pool de modelos del proceso actual."""
+    return _pool_modelos.estadisticas()
+
+def cargar_modelos(modelos: Optional[List[str]] = None) -> List[str]:
+    """
+    Cargar los pesos de los modelos sin ejecutar inferencia.
+    
+    Pensado para el proceso maestro antes de crear workers con fork (ver
+    `gunicorn_conf.py`): los pesos quedan en páginas compartidas copy-on-write
+    y cada worker calienta su copia después del fork. Calentar antes del fork
+    dejaría hilos de OpenMP en el maestro, que los hijos no heredan.
+    
+    Args:
+        modelos: Modelos a cargar (por defecto WHISPER_MODELOS_PRECARGA)
+    
+    Returns:
+        Modelos cargados en el proceso al terminar
+    """
+    for modelo in modelos or MODELOS_PRECARGA:
+        cargar_modelo(modelo)
+    return _pool_modelos.cargados()
 
-def cargar_modelo():
+def calentar_modelos(modelos: Optional[List[str]] = None) -> List[str]:
     """
-    Cargar modelo Whisper (usa cache para no recargar).
+    Cargar modelos y ejecutar una inferencia de prueba con cada uno.
+    
+    La primera llamada a un modelo recién cargado es bastante más lenta que las
+    siguientes (asignación de buffers, kernels...); calentarlo al arrancar evita
+    que la pague el primer usuario.
+    
+    Args:
+        modelos: Modelos a calentar (por defecto WHISPER_MODELOS_PRECARGA)
     
     Returns:
-        Modelo Whisper cargado
+        Modelos cargados en el proceso al terminar
     """
-    global _modelo_cache
-    if _modelo_cache is None:
-        _modelo_cache = whisper.load_model(MODELO_WHISPER)
-    return _modelo_cache
+    silencio = np.zeros(FRECUENCIA_MUESTREO, dtype=np.float32)
+    for modelo in modelos or MODELOS_PRECARGA:
+        cargar_modelo(modelo).transcribir(silencio, 'en')
+    return _pool_modelos.cargados()
 
-def transcribir_audio(ruta_audio: Path) -> Dict[str, str]:
+def transcribir_audio(audio: Union[Path, np.ndarray], idioma: Optional[str] = None,
+                      modelo: Optional[str] = None, contexto: Optional[str] = None) -> Dict[str, Any]:
     """
-    Transcribir archivo de audio usando Whisper.
+    Transcribir audio usando Whisper.
+    
+    Con WHISPER_VAD activado se quitan antes las regiones sin voz (ver
+    `vad.py`) y, si no se indica `idioma`, se detecta sólo sobre la primera
+    ventana de 30 s con voz.
     
     Args:
-        ruta_audio: Path al archivo de audio (WAV 16kHz mono)
+        audio: Path al archivo de audio (WAV 16kHz mono) o muestras PCM
+               float32 mono 16 kHz ya decodificadas (se evita otra pasada de ffmpeg)
+        idioma: Código de idioma si ya se conoce (None = detección automática)
+        modelo: Tamaño del modelo (por defecto WHISPER_MODEL)
+        contexto: Texto que precede al audio (ver `MotorTranscripcion.transcribir`)
     
     Returns:
-        Diccionario con 'text' (transcripción) y 'language' (idioma detectado)
+        Diccionario con 'text' (transcripción), 'language' (idioma detectado),
+        'segments' (lista de {start, end, text}), 'segundos_inferencia' (sólo
+        el modelo: sin la carga, el VAD ni la espera en la cola del pool) y,
+        con VAD, 'segundos_omitidos'
     
     Raises:
         Exception: Si falla la transcripción
     """
-    if not ruta_audio.exists():
-        raise FileNotFoundError(f"Archivo de audio no encontrado: {ruta_audio}")
+    if isinstance(audio, Path):
+        if not audio.exists():
+            raise FileNotFoundError(f"Archivo de audio no encontrado: {audio}")
+        entrada = str(audio)
+    else:
+        entrada = np.ascontiguousarray(audio, dtype=np.float32)
     
     try:
-        modelo = cargar_modelo()
+        motor = cargar_modelo(modelo)
+        if not VAD_ACTIVADO:
+            inicio = time.perf_counter()
+            resultado = motor.transcribir(entrada, idioma, contexto)
+            resultado['segundos_inferencia'] = time.perf_counter() - inicio
+            return resultado
         
-        # Transcribir con detección automática de idioma
-        resultado = modelo.transcribe(
-            str(ruta_audio),
-            fp16=False,  # Usar FP32 para compatibilidad (FP16 requiere GPU CUDA)
-            language=None,  # Detección automática
-            task='transcribe'  # Transcribir (no traducir aquí)
-        )
+        if isinstance(entrada, str):
+            # ffmpeg directo a memoria: no depende del backend (vale con faster-whisper)
+            from downloader import decodificar_pcm
+            entrada = decodificar_pcm(entrada)
+        recortado, mapa, omitidos = recortar_no_vocal(entrada)
+        inicio = time.perf_counter()
+        if idioma is None:
+            idioma = motor.detectar_idioma(recortado[:FRECUENCIA_MUESTREO * 30])
         
-        return {
-            'text': resultado['text'].strip(),
-            'language': resultado['language']
-        }
+        resultado = motor.transcribir(recortado, idioma, contexto)
+        resultado['segundos_inferencia'] = time.perf_counter() - inicio
+        restaurar_tiempos(resultado['segments'], mapa)
+        resultado['language'] = idioma
+        resultado['segundos_omitidos'] = omitidos
+        return resultado
     
     except Exception as e:
-        raise Exception(f"Error en transcripción Whisper: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Error en transcripción Whisper: {str(e)}")
+
+def dividir_en_silencios(audio: np.ndarray, segundos_fragmento: float = SEGUNDOS_FRAGMENTO) -> List[Tuple[int, int]]:
+    """
+    Dividir audio en fragmentos de duración aproximada, cortando en silencios.
+    
+    Cada corte se hace en el tramo de 50 ms con menor energía dentro de los
+    últimos `MARGEN_BUSQUEDA_SILENCIO` segundos antes de la duración objetivo,
+    para no partir palabras por la mitad.
+    
+    Args:
+        audio: Muestras PCM float32 mono 16 kHz
+        segundos_fragmento: Duración objetivo de cada fragmento
+    
+    Returns:
+        Lista de rangos (inicio, fin) en muestras
+    """
+    muestras_tramo = FRECUENCIA_MUESTREO // 20
+    n_tramos = len(audio) // muestras_tramo
+    if n_tramos == 0:
+        return [(0, len(audio))]
+    
+    # Energía RMS por tramo de 50 ms
+    tramos = audio[:n_tramos * muestras_tramo].reshape(n_tramos, muestras_tramo)
+    energia = np.sqrt(np.mean(tramos ** 2, axis=1))
+    
+    tramos_fragmento = int(segundos_fragmento * 20)
+    tramos_margen = int(min(MARGEN_BUSQUEDA_SILENCIO, segundos_fragmento / 2) * 20)
+    
+    rangos = []
+    inicio = 0
+    while n_tramos - inicio > tramos_fragmento + tramos_margen:
+        objetivo = inicio + tramos_fragmento
+        desde = objetivo - tramos_margen
+        corte = desde + int(np.argmin(energia[desde:objetivo]))
+        rangos.append((inicio * muestras_tramo, corte * muestras_tramo))
+        inicio = corte
+    rangos.append((inicio * muestras_tramo, len(audio)))
+    return rangos
+
+def desplazar_segmentos(resultado: Dict[str, Any], desplazamiento: float) -> Dict[str, Any]:
+    """Llevar las marcas de tiempo de un fragmento (segmentos y palabras) al audio completo."""
+    for segmento in resultado['segments']:
+        for marca in [segmento] + segmento.get('words', []):
+            marca['start'] += desplazamiento
+            marca['end'] += desplazamiento
+    return resultado
+
+def transcribir_fragmento(audio: np.ndarray, idioma: Optional[str], desplazamiento: float,
+                          modelo: Optional[str] = None, contexto: Optional[str] = None) -> Dict[str, Any]:
+    """Transcribir un fragmento y llevar sus marcas de tiempo al audio completo."""
+    return desplazar_segmentos(transcribir_audio(audio, idioma, modelo, contexto), desplazamiento)
+
+def unir_fragmentos(resultados: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Unir las transcripciones de fragmentos consecutivos.
+    
+    Args:
+        resultados: Transcripciones de cada fragmento, en orden, con tiempos ya corregidos
+    
+    Returns:
+        Transcripción única con el idioma del primer fragmento
+    """
+    segmentos = [s for resultado in resultados for s in resultado['segments']]
+    unido = {
+        'text': ''.join(s['text'] for s in segmentos).strip(),
+        'language': resultados[0]['language'],
+        'segments': segmentos,
+        # Suma de todos los fragmentos (en paralelo supera al tiempo transcurrido)
+        'segundos_inferencia': sum(r.get('segundos_inferencia', 0.0) for r in resultados)
+    }
+    if any('segundos_omitidos' in resultado for resultado in resultados):
+        unido['segundos_omitidos'] = sum(r.get('segundos_omitidos', 0.0) for r in resultados)
+    return unido
+
+def transcribir_por_fragmentos(audio: Union[Path, np.ndarray], ejecutor: Executor,
+                               modelo: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Transcribir audio largo en fragmentos paralelos.
+    
+    El primer fragmento se transcribe solo para detectar el idioma; el resto
+    se reparte entre los procesos de `ejecutor` con ese idioma fijo, y los
+    segmentos se unen con las marcas de tiempo corregidas. Los audios más
+    cortos que `FRAGMENTAR_DESDE_SEGUNDOS` se transcriben de una vez.
+    
+    Args:
+        audio: Path al archivo de audio o muestras PCM float32 mono 16 kHz
+        ejecutor: Pool de procesos donde corre Whisper
+        modelo: Tamaño del modelo (por defecto WHISPER_MODEL)
+    
+    Returns:
+        Mismo formato que `transcribir_audio`
+    """
+    if isinstance(audio, Path):
+        from downloader import decodificar_pcm
+        audio = decodificar_pcm(str(audio))
+    
+    if len(audio) < FRAGMENTAR_DESDE_SEGUNDOS * FRECUENCIA_MUESTREO:
+        return ejecutor.submit(transcribir_audio, audio, None, modelo).result()
+    
+    rangos = dividir_en_silencios(audio)
+    
+    inicio, fin = rangos[0]
+    primero = ejecutor.submit(transcribir_fragmento, audio[inicio:fin], None, 0.0, modelo).result()
+    idioma = primero['language']
+    
+    futuros = [
+        ejecutor.submit(transcribir_fragmento, audio[inicio:fin], idioma,
+                        inicio / FRECUENCIA_MUESTREO, modelo)
+        for inicio, fin in rangos[1:]
+    ]
+    return unir_fragmentos([primero] + [futuro.result() for futuro in futuros])
\ No newline at end of file
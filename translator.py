@@ -2,22 +2,50 @@
 Módulo de traducción con fallback entre LibreTranslate y Argos Translate.
 Prioridad: LibreTranslate (online) → Argos Translate (offline).
 """
+import importlib.util
 import os
-from typing import Optional
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 # Traducción siempre disponible con requests
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 LIBRETRANSLATE_DISPONIBLE = True
 
-try:
-    import argostranslate.package
-    import argostranslate.translate
-    ARGOS_DISPONIBLE = True
-except ImportError:
-    ARGOS_DISPONIBLE = False
+# Argos se importa recién al usarlo: cargarlo lleva segundos y memoria que un
+# proceso que sólo sirve la API (o traduce siempre con LibreTranslate) no necesita
+ARGOS_DISPONIBLE = importlib.util.find_spec('argostranslate') is not None
+
+from metricas import registrar_cache, registrar_servicio_traduccion
 
 # Configuración LibreTranslate
 LIBRETRANSLATE_URL = os.getenv('LIBRETRANSLATE_URL', 'https://libretranslate.de')
+# Fragmentos enviados a la vez por traducción
+LIBRETRANSLATE_CONCURRENCIA = int(os.getenv('LIBRETRANSLATE_CONCURRENCIA', '4'))
+# Caracteres máximos por fragmento
+LIBRETRANSLATE_MAX_CARACTERES = int(os.getenv('LIBRETRANSLATE_MAX_CARACTERES', '5000'))
+# Timeouts (segundos) de conexión y de respuesta
+LIBRETRANSLATE_TIMEOUT_CONEXION = float(os.getenv('LIBRETRANSLATE_TIMEOUT_CONEXION', '3'))
+LIBRETRANSLATE_TIMEOUT = float(os.getenv('LIBRETRANSLATE_TIMEOUT', '30'))
+# Reintentos por fragmento ante errores de conexión, 429 y 5xx (con backoff exponencial)
+LIBRETRANSLATE_REINTENTOS = int(os.getenv('LIBRETRANSLATE_REINTENTOS', '2'))
+# Circuito: fallos seguidos para abrirlo y segundos que permanece abierto
+LIBRETRANSLATE_FALLOS_MAXIMOS = int(os.getenv('LIBRETRANSLATE_FALLOS_MAXIMOS', '3'))
+LIBRETRANSLATE_PAUSA_SEGUNDOS = float(os.getenv('LIBRETRANSLATE_PAUSA_SEGUNDOS', '30'))
+
+# Traducir línea por línea con la memoria de traducción de la base de datos
+MEMORIA_TRADUCCION = os.getenv('MEMORIA_TRADUCCION', '1') == '1'
+_estadisticas_memoria = {'lineas': 0, 'aciertos': 0, 'llamadas_evitadas': 0}
+_bloqueo_memoria = threading.Lock()
+
+# Idioma intermedio de Argos cuando no hay paquete directo (pt→en→es)
+ARGOS_IDIOMA_PIVOTE = os.getenv('ARGOS_IDIOMA_PIVOTE', 'en')
+# Leer los paquetes de Argos al arrancar en lugar de en la primera traducción que los necesite
+ARGOS_PRECARGAR = os.getenv('ARGOS_PRECARGAR', '0') == '1'
 
 # Mapeo de códigos de idioma
 CODIGO_IDIOMA = {
@@ -26,27 +54,159 @@ CODIGO_IDIOMA = {
     'pt': 'Portuguese'
 }
 
-def traducir_con_libretranslate(texto: str, idioma_origen: str, idioma_destino: str) -> Optional[str]:
+class CircuitoAbierto(Exception):
+    """El servicio falló demasiadas veces seguidas; no se intenta por ahora."""
+
+class InterruptorCircuito:
+    """
+    Interruptor de circuito para un servicio remoto.
+    
+    Tras `fallos_maximos` fallos seguidos se abre y las llamadas fallan al
+    instante durante `pausa_segundos`; después deja pasar una llamada de
+    prueba (semiabierto) y se cierra si sale bien.
+    """
+    
+    CERRADO = 'cerrado'
+    ABIERTO = 'abierto'
+    SEMIABIERTO = 'semiabierto'
+    
+    def __init__(self, fallos_maximos: int, pausa_segundos: float):
+        self.fallos_maximos = fallos_maximos
+        self.pausa_segundos = pausa_segundos
+        self._fallos = 0
+        self._abierto_desde: Optional[float] = None
+        self._prueba_en_curso = False
+        self._bloqueo = threading.Lock()
+        self.rechazadas = 0
+    
+    @property
+    def estado(self) -> str:
+        if self._abierto_desde is None:
+            return self.CERRADO
+        if time.monotonic() - self._abierto_desde >= self.pausa_segundos:
+            return self.SEMIABIERTO
+        return self.ABIERTO
+    
+    def permitir(self):
+        """
+        Comprobar si se puede llamar al servicio.
+        
+        Raises:
+            CircuitoAbierto: Si el circuito está abierto (o ya hay una prueba en curso)
+        """
+        with self._bloqueo:
+            estado = self.estado
+            if estado == self.CERRADO:
+                return
+            if estado == self.SEMIABIERTO and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return
+            self.rechazadas += 1
+            raise CircuitoAbierto("Circuito abierto: servicio no disponible")
+    
+    def registrar_exito(self):
+        with self._bloqueo:
+            self._fallos = 0
+            self._abierto_desde = None
+            self._prueba_en_curso = False
+    
+    def registrar_fallo(self):
+        with self._bloqueo:
+            self._fallos += 1
+            if self._prueba_en_curso or self._fallos >= self.fallos_maximos:
+                self._abierto_desde = time.monotonic()
+            self._prueba_en_curso = False
+
+def dividir_en_fragmentos(texto: str, max_caracteres: int) -> List[Tuple[str, str]]:
     """
-    Traducir usando LibreTranslate API directamente con requests.
+    Dividir texto en fragmentos de hasta `max_caracteres`, cortando entre líneas.
+    
+    Los versos se agrupan enteros; sólo una línea más larga que el límite se
+    corta dentro, en el último fin de frase o espacio antes del límite.
     
     Args:
-        texto: Texto a traducir
-        idioma_origen: Código de idioma origen (es, en, pt)
-        idioma_destino: Código de idioma destino (es, en, pt)
+        texto: Texto a dividir
+        max_caracteres: Tamaño máximo de cada fragmento
     
     Returns:
-        Texto traducido o None si falla
+        Lista de (fragmento, separador que lo une con el siguiente); unir
+        fragmentos y separadores reconstruye el texto original
     """
-    try:
-        # Dividir texto en fragmentos si es muy largo
-        max_chars = 5000
-        fragmentos = [texto[i:i+max_chars] for i in range(0, len(texto), max_chars)] if len(texto) > max_chars else [texto]
-        
-        traducciones = []
-        for fragmento in fragmentos:
-            response = requests.post(
-                f"{LIBRETRANSLATE_URL}/translate",
+    fragmentos: List[Tuple[str, str]] = []
+    actual: List[str] = []
+    largo = 0
+    
+    def cerrar_actual():
+        nonlocal actual, largo
+        if actual:
+            fragmentos.append(('\n'.join(actual), '\n'))
+            actual, largo = [], 0
+    
+    for linea in texto.split('\n'):
+        if len(linea) > max_caracteres:
+            cerrar_actual()
+            while len(linea) > max_caracteres:
+                corte = max(linea.rfind(fin, 0, max_caracteres) for fin in ('. ', '? ', '! ', '; '))
+                corte = corte + 1 if corte > 0 else linea.rfind(' ', 0, max_caracteres)
+                if corte <= 0:
+                    corte = max_caracteres
+                fragmentos.append((linea[:corte].rstrip(), ' '))
+                linea = linea[corte:].lstrip()
+            actual, largo = [linea], len(linea)
+            continue
+        if actual and largo + 1 + len(linea) > max_caracteres:
+            cerrar_actual()
+        actual.append(linea)
+        largo += len(linea) + (1 if len(actual) > 1 else 0)
+    cerrar_actual()
+    
+    if fragmentos:
+        fragmentos[-1] = (fragmentos[-1][0], '')
+    return fragmentos
+
+class ClienteLibreTranslate:
+    """
+    Cliente de LibreTranslate con sesión HTTP compartida (keep-alive).
+    
+    Los fragmentos de un texto se envían en paralelo (hasta `concurrencia`)
+    sobre el mismo pool de conexiones, con reintentos con backoff y un
+    interruptor de circuito para que un servidor caído falle al instante en
+    lugar de agotar el timeout en cada fragmento.
+    """
+    
+    def __init__(self, url: str = LIBRETRANSLATE_URL, concurrencia: int = LIBRETRANSLATE_CONCURRENCIA,
+                 max_caracteres: int = LIBRETRANSLATE_MAX_CARACTERES):
+        self.url = url.rstrip('/')
+        self.max_caracteres = max_caracteres
+        self.timeout = (LIBRETRANSLATE_TIMEOUT_CONEXION, LIBRETRANSLATE_TIMEOUT)
+        self.circuito = InterruptorCircuito(LIBRETRANSLATE_FALLOS_MAXIMOS, LIBRETRANSLATE_PAUSA_SEGUNDOS)
+        self.peticiones = 0
+        
+        reintentos = Retry(
+            total=LIBRETRANSLATE_REINTENTOS,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=None,  # /translate es idempotente: reintentar también POST
+            raise_on_status=False
+        )
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=concurrencia, max_retries=reintentos)
+        self.sesion = requests.Session()
+        self.sesion.mount('http://', adaptador)
+        self.sesion.mount('https://', adaptador)
+        self.sesion.headers['Content-Type'] = 'application/json'
+        
+        self._ejecutor = ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix='libretranslate')
+    
+    def _traducir_fragmento(self, fragmento: str, idioma_origen: str, idioma_destino: str) -> str:
+        """Traducir un fragmento (una petición HTTP, con reintentos)."""
+        if not fragmento.strip():
+            return fragmento
+        
+        self.circuito.permitir()
+        self.peticiones += 1
+        try:
+            response = self.sesion.post(
+                f"{self.url}/translate",
                 json={
                     "q": fragmento,
                     "source": idioma_origen,
@@ -54,32 +214,230 @@ def traducir_con_libretranslate(texto: str, idioma_origen: str, idioma_destino:
                     "format": "text",
                     "api_key": ""
                 },
-                headers={"Content-Type": "application/json"},
-                timeout=30
+                timeout=self.timeout
             )
-            
-            if response.status_code == 200:
-                resultado = response.json()
-                texto_traducido = resultado.get('translatedText', '')
-                if texto_traducido:
-                    traducciones.append(texto_traducido)
-                else:
-                    print(f"LibreTranslate: respuesta vacía")
-                    return None
-            else:
-                print(f"Error LibreTranslate HTTP {response.status_code}: {response.text[:200]}")
-                return None
+        except requests.RequestException:
+            self.circuito.registrar_fallo()
+            raise
         
-        return " ".join(traducciones) if traducciones else None
+        if response.status_code >= 500 or response.status_code == 429:
+            self.circuito.registrar_fallo()
+        else:
+            # Un 4xx es un error de la petición, no del servicio: éste responde,
+            # así que cuenta como éxito (y libera una posible llamada de prueba)
+            self.circuito.registrar_exito()
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}: {response.text[:200]}")
         
+        texto_traducido = response.json().get('translatedText', '')
+        if not texto_traducido:
+            raise Exception("respuesta vacía")
+        return texto_traducido
+    
+    def traducir(self, texto: str, idioma_origen: str, idioma_destino: str) -> str:
+        """
+        Traducir un texto completo conservando los saltos de línea.
+        
+        Raises:
+            CircuitoAbierto: Si el servicio está marcado como caído
+            Exception: Si falla algún fragmento
+        """
+        fragmentos = dividir_en_fragmentos(texto, self.max_caracteres)
+        futuros = [
+            self._ejecutor.submit(self._traducir_fragmento, fragmento, idioma_origen, idioma_destino)
+            for fragmento, _ in fragmentos
+        ]
+        return ''.join(
+            futuro.result() + separador for futuro, (_, separador) in zip(futuros, fragmentos)
+        )
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado del circuito y peticiones enviadas."""
+        return {
+            'circuito': self.circuito.estado,
+            'peticiones': self.peticiones,
+            'rechazadas': self.circuito.rechazadas,
+        }
+
+_cliente: Optional[ClienteLibreTranslate] = None
+_bloqueo_cliente = threading.Lock()
+
+def obtener_cliente_libretranslate() -> ClienteLibreTranslate:
+    """Obtener el cliente compartido del proceso (se crea la primera vez)."""
+    global _cliente
+    with _bloqueo_cliente:
+        if _cliente is None:
+            _cliente = ClienteLibreTranslate()
+        return _cliente
+
+def estadisticas_libretranslate() -> Dict[str, Any]:
+    """Estado del cliente de LibreTranslate (vacío si aún no se usó)."""
+    return _cliente.estadisticas() if _cliente else {}
+
+def traducir_con_libretranslate(texto: str, idioma_origen: str, idioma_destino: str) -> Optional[str]:
+    """
+    Traducir usando LibreTranslate con el cliente compartido.
+    
+    Args:
+        texto: Texto a traducir
+        idioma_origen: Código de idioma origen (es, en, pt)
+        idioma_destino: Código de idioma destino (es, en, pt)
+    
+    Returns:
+        Texto traducido o None si falla
+    """
+    try:
+        return obtener_cliente_libretranslate().traducir(texto, idioma_origen, idioma_destino)
+    
+    except CircuitoAbierto:
+        return None
     except Exception as e:
         print(f"Error en LibreTranslate: {e}")
         return None
 
+class GestorArgos:
+    """
+    Traducciones de Argos cargadas en memoria.
+    
+    Los paquetes instalados se leen una sola vez; cada par de idiomas se
+    resuelve la primera vez que se pide (directo o con pivote por
+    `ARGOS_IDIOMA_PIVOTE`) y el objeto de traducción queda cargado. Traducir
+    no toca la red: los paquetes se instalan aparte con `provisionar`.
+    """
+    
+    def __init__(self, pivote: str = ARGOS_IDIOMA_PIVOTE):
+        self.pivote = pivote
+        self._idiomas: Optional[Dict[str, Any]] = None
+        # (origen, destino) -> cadena de traducciones (1 directa, 2 con pivote) o None
+        self._traducciones: Dict[Tuple[str, str], Optional[List[Any]]] = {}
+        self._bloqueo = threading.Lock()
+    
+    def inicializar(self) -> List[str]:
+        """
+        Leer los paquetes instalados (sólo la primera vez).
+        
+        Returns:
+            Códigos de idioma disponibles
+        """
+        with self._bloqueo:
+            if self._idiomas is None:
+                if ARGOS_DISPONIBLE:
+                    import argostranslate.translate
+                self._idiomas = {
+                    idioma.code: idioma for idioma in argostranslate.translate.get_installed_languages()
+                } if ARGOS_DISPONIBLE else {}
+            return sorted(self._idiomas)
+    
+    def _directa(self, origen: str, destino: str) -> Optional[Any]:
+        if origen not in self._idiomas or destino not in self._idiomas:
+            return None
+        return self._idiomas[origen].get_translation(self._idiomas[destino])
+    
+    def _resolver(self, origen: str, destino: str) -> Optional[List[Any]]:
+        """Buscar la cadena de traducciones de un par (con el bloqueo tomado)."""
+        if (origen, destino) not in self._traducciones:
+            directa = self._directa(origen, destino)
+            if directa is not None:
+                cadena = [directa]
+            elif self.pivote not in (origen, destino):
+                primera = self._directa(origen, self.pivote)
+                segunda = self._directa(self.pivote, destino)
+                cadena = [primera, segunda] if primera and segunda else None
+            else:
+                cadena = None
+            self._traducciones[(origen, destino)] = cadena
+        return self._traducciones[(origen, destino)]
+    
+    def disponible(self, origen: str, destino: str) -> bool:
+        """Si hay paquetes instalados para traducir el par (directo o con pivote)."""
+        self.inicializar()
+        with self._bloqueo:
+            return self._resolver(origen, destino) is not None
+    
+    def traducir(self, texto: str, origen: str, destino: str) -> Optional[str]:
+        """
+        Traducir con los paquetes instalados.
+        
+        Returns:
+            Texto traducido o None si no hay paquetes para el par
+        """
+        self.inicializar()
+        with self._bloqueo:
+            cadena = self._resolver(origen, destino)
+        if cadena is None:
+            return None
+        for traduccion in cadena:
+            texto = traduccion.translate(texto)
+        return texto
+    
+    def provisionar(self, idiomas: List[str]) -> List[str]:
+        """
+        Descargar e instalar los paquetes para traducir entre `idiomas`.
+        
+        Instala el par directo si existe en el índice y, si no, los pares con
+        el idioma pivote. Es la única operación que usa la red.
+        
+        Args:
+            idiomas: Códigos de idioma (es, en, pt)
+        
+        Returns:
+            Pares instalados en esta llamada ("origen→destino")
+        """
+        if not ARGOS_DISPONIBLE:
+            raise Exception("argostranslate no está instalado (pip install argostranslate)")
+        import argostranslate.package
+        
+        argostranslate.package.update_package_index()
+        disponibles = {
+            (p.from_code, p.to_code): p for p in argostranslate.package.get_available_packages()
+        }
+        instalados = {
+            (p.from_code, p.to_code) for p in argostranslate.package.get_installed_packages()
+        }
+        
+        necesarios = set()
+        for origen in idiomas:
+            for destino in idiomas:
+                if origen == destino:
+                    continue
+                if (origen, destino) in disponibles:
+                    necesarios.add((origen, destino))
+                else:
+                    necesarios.update({(origen, self.pivote), (self.pivote, destino)})
+        
+        nuevos = []
+        for par in sorted(necesarios - instalados):
+            if par in disponibles:
+                argostranslate.package.install_from_path(disponibles[par].download())
+                nuevos.append(f"{par[0]}→{par[1]}")
+        
+        # Releer paquetes y descartar pares resueltos con los anteriores
+        with self._bloqueo:
+            self._idiomas = None
+            self._traducciones.clear()
+        self.inicializar()
+        return nuevos
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        """Idiomas instalados y pares ya cargados en memoria."""
+        with self._bloqueo:
+            return {
+                'idiomas': sorted(self._idiomas or {}),
+                'pares': {
+                    f"{origen}→{destino}": ('pivote' if len(cadena) == 2 else 'directo')
+                    if cadena else 'no disponible'
+                    for (origen, destino), cadena in self._traducciones.items()
+                },
+            }
+
+gestor_argos = GestorArgos()
+
 def traducir_con_argos(texto: str, idioma_origen: str, idioma_destino: str) -> Optional[str]:
     """
     Traducir usando Argos Translate (offline).
     
+    Usa sólo paquetes ya instalados (ver `GestorArgos.provisionar`).
+    
     Args:
         texto: Texto a traducir
         idioma_origen: Código de idioma origen (es, en, pt)
@@ -92,36 +450,96 @@ def traducir_con_argos(texto: str, idioma_origen: str, idioma_destino: str) -> O
         return None
     
     try:
-        # Actualizar índice de paquetes (solo primera vez)
-        argostranslate.package.update_package_index()
-        paquetes_disponibles = argostranslate.package.get_available_packages()
-        
-        # Buscar e instalar paquete de traducción
-        paquete = next(
-            (p for p in paquetes_disponibles 
-             if p.from_code == idioma_origen and p.to_code == idioma_destino),
-            None
-        )
-        
-        if paquete is None:
-            print(f"Paquete Argos {idioma_origen}→{idioma_destino} no disponible")
-            return None
-        
-        # Descargar e instalar paquete
-        argostranslate.package.install_from_path(paquete.download())
-        
-        # Traducir
-        texto_traducido = argostranslate.translate.translate(texto, idioma_origen, idioma_destino)
+        texto_traducido = gestor_argos.traducir(texto, idioma_origen, idioma_destino)
+        if texto_traducido is None:
+            print(f"Paquete Argos {idioma_origen}→{idioma_destino} no instalado "
+                  f"(ni vía {gestor_argos.pivote})")
         return texto_traducido
     
     except Exception as e:
         print(f"Error en Argos Translate: {e}")
         return None
 
+def _traducir_con_servicios(texto: str, idioma_origen: str, idioma_destino: str) -> str:
+    """Traducir con LibreTranslate y, si falla, con Argos."""
+    # Intentar LibreTranslate primero
+    inicio = time.perf_counter()
+    resultado = traducir_con_libretranslate(texto, idioma_origen, idioma_destino)
+    registrar_servicio_traduccion('libretranslate', time.perf_counter() - inicio, bool(resultado))
+    if resultado:
+        return resultado
+    
+    # Fallback a Argos Translate
+    inicio = time.perf_counter()
+    resultado = traducir_con_argos(texto, idioma_origen, idioma_destino)
+    if ARGOS_DISPONIBLE:
+        registrar_servicio_traduccion('argos', time.perf_counter() - inicio, bool(resultado))
+    if resultado:
+        return resultado
+    
+    # Si ambos fallan
+    raise Exception(
+        f"No se pudo traducir de {idioma_origen} a {idioma_destino}. "
+        f"LibreTranslate disponible: {LIBRETRANSLATE_DISPONIBLE}, "
+        f"Argos disponible: {ARGOS_DISPONIBLE}"
+    )
+
+def normalizar_linea(linea: str) -> str:
+    """Clave de una línea en la memoria de traducción (Unicode NFC, espacios colapsados)."""
+    return ' '.join(unicodedata.normalize('NFC', linea).split())
+
+def _traducir_con_memoria(texto: str, idioma_origen: str, idioma_destino: str) -> str:
+    """
+    Traducir línea por línea reutilizando la memoria de traducción.
+    
+    Las líneas nuevas (sin repetir) se envían juntas en una sola llamada y se
+    guardan; si el servicio no devuelve la misma cantidad de líneas, el texto
+    se traduce entero sin usar la memoria.
+    """
+    from database import buscar_en_memoria, guardar_en_memoria
+    
+    lineas = [normalizar_linea(linea) for linea in texto.split('\n')]
+    unicas = list(dict.fromkeys(linea for linea in lineas if linea))
+    
+    conocidas = buscar_en_memoria(unicas, idioma_origen, idioma_destino)
+    nuevas = [linea for linea in unicas if linea not in conocidas]
+    registrar_cache('memoria_traduccion', True, len(unicas) - len(nuevas))
+    registrar_cache('memoria_traduccion', False, len(nuevas))
+    with _bloqueo_memoria:
+        _estadisticas_memoria['lineas'] += sum(1 for linea in lineas if linea)
+        _estadisticas_memoria['aciertos'] += sum(1 for linea in lineas if linea in conocidas)
+        _estadisticas_memoria['llamadas_evitadas'] += 0 if nuevas else 1
+    
+    if nuevas:
+        traducidas = _traducir_con_servicios('\n'.join(nuevas), idioma_origen, idioma_destino).split('\n')
+        if len(traducidas) != len(nuevas):
+            return _traducir_con_servicios(texto, idioma_origen, idioma_destino)
+        traducidas = [linea.strip() for linea in traducidas]
+        guardar_en_memoria(dict(zip(nuevas, traducidas)), idioma_origen, idioma_destino)
+        conocidas.update(zip(nuevas, traducidas))
+    
+    return '\n'.join(conocidas[linea] if linea else '' for linea in lineas)
+
+def estadisticas_memoria() -> Dict[str, Any]:
+    """Líneas consultadas, aciertos de la memoria de traducción y tamaño de la tabla."""
+    from database import contar_lineas_memoria
+    
+    with _bloqueo_memoria:
+        estadisticas = dict(_estadisticas_memoria)
+    estadisticas['tasa_aciertos'] = (
+        round(estadisticas['aciertos'] / estadisticas['lineas'], 3) if estadisticas['lineas'] else 0.0
+    )
+    estadisticas['lineas_guardadas'] = contar_lineas_memoria()
+    return estadisticas
+
 def traducir_texto(texto: str, idioma_origen: str, idioma_destino: str) -> str:
     """
     Traducir texto con fallback automático entre servicios.
     
+    Con MEMORIA_TRADUCCION activada (por defecto) se traduce línea por línea:
+    estribillos repetidos y líneas ya vistas en otras canciones salen de la
+    base de datos y sólo las nuevas llegan a LibreTranslate/Argos.
+    
     Args:
         texto: Texto a traducir
         idioma_origen: Código de idioma origen (es, en, pt, auto-detectado de Whisper)
@@ -137,19 +555,17 @@ def traducir_texto(texto: str, idioma_origen: str, idioma_destino: str) -> str:
     if idioma_origen == idioma_destino:
         return texto
     
-    # Intentar LibreTranslate primero
-    resultado = traducir_con_libretranslate(texto, idioma_origen, idioma_destino)
-    if resultado:
-        return resultado
+    if MEMORIA_TRADUCCION:
+        return _traducir_con_memoria(texto, idioma_origen, idioma_destino)
+    return _traducir_con_servicios(texto, idioma_origen, idioma_destino)
+
+if __name__ == "__main__":
+    import argparse
     
-    # Fallback a Argos Translate
-    resultado = traducir_con_argos(texto, idioma_origen, idioma_destino)
-    if resultado:
-        return resultado
+    parser = argparse.ArgumentParser(description="Instalar paquetes de Argos Translate para uso offline")
+    parser.add_argument('idiomas', nargs='*', default=list(CODIGO_IDIOMA), help="Códigos de idioma")
+    args = parser.parse_args()
     
-    # Si ambos fallan
-    raise Exception(
-        f"No se pudo traducir de {idioma_origen} a {idioma_destino}. "
-        f"LibreTranslate disponible: {LIBRETRANSLATE_DISPONIBLE}, "
-        f"Argos disponible: {ARGOS_DISPONIBLE}"
-    )
+    nuevos = gestor_argos.provisionar(args.idiomas)
+    print(f"Paquetes instalados: {', '.join(nuevos) or 'ninguno (ya estaban)'}")
+    print(f"Idiomas disponibles: {', '.join(gestor_argos.inicializar())}")
@@ -0,0 +1,167 @@
+"""
+Canonicalización de URLs de video.
+Convierte las distintas formas de enlazar un mismo video (youtu.be, móvil,
+con tiempo de inicio, dentro de una playlist...) en una clave única
+(extractor, id de video) sin llamar a yt-dlp ni a la red.
+"""
+import re
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlsplit, urlunsplit
+
+EXTRACTOR_GENERICO = 'generic'
+
+_ID_YOUTUBE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+_ID_VIMEO = re.compile(r'^\d+$')
+_ID_DAILYMOTION = re.compile(r'^x[0-9a-z]+$')
+
+_HOSTS_YOUTUBE = {
+    'youtube.com', 'm.youtube.com', 'music.youtube.com',
+    'youtube-nocookie.com', 'youtu.be',
+}
+_PUERTOS_POR_DEFECTO = {'http': '80', 'https': '443'}
+
+# Rutas de YouTube con el id como segundo segmento (/shorts/ID, /embed/ID...)
+_RUTAS_ID_YOUTUBE = {'shorts', 'embed', 'live', 'v', 'e'}
+
+def normalizar_url(url: str) -> str:
+    """
+    Normalizar una URL genérica.
+
+    Pasa esquema y host a minúsculas, quita `www.`, el fragmento y ordena
+    los parámetros de la query.
+
+    Args:
+        url: URL original
+
+    Returns:
+        URL normalizada
+    """
+    partes = urlsplit(url.strip())
+    esquema = partes.scheme.lower()
+    host = _host(partes.netloc)
+    puerto = _puerto(partes.netloc)
+    # Otro puerto puede ser otro servidor: sólo se quita el del esquema
+    if puerto and puerto != _PUERTOS_POR_DEFECTO.get(esquema):
+        host = f"{host}:{puerto}"
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)))
+    return urlunsplit((esquema, host, partes.path or '/', query, ''))
+
+def _host(netloc: str) -> str:
+    """Host en minúsculas, sin puerto, credenciales ni prefijo `www.`."""
+    host = netloc.lower().rsplit('@', 1)[-1].split(':', 1)[0]
+    if host.startswith('www.'):
+        host = host[4:]
+    return host
+
+def _puerto(netloc: str) -> Optional[str]:
+    """Puerto explícito de `netloc` (sin ceros a la izquierda), o None."""
+    _, separador, puerto = netloc.rsplit('@', 1)[-1].partition(':')
+    if not separador or not puerto.isdigit():
+        return None
+    return str(int(puerto))
+
+def _id_youtube(host: str, segmentos: list, query: dict) -> Optional[str]:
+    """Extraer el id de un enlace de YouTube."""
+    if host == 'youtu.be':
+        candidato = segmentos[0] if segmentos else None
+    elif segmentos and segmentos[0] == 'watch':
+        candidato = query.get('v', [None])[0]
+    elif len(segmentos) >= 2 and segmentos[0] in _RUTAS_ID_YOUTUBE:
+        candidato = segmentos[1]
+    else:
+        candidato = None
+
+    if candidato and _ID_YOUTUBE.match(candidato):
+        return candidato
+    return None
+
+def _id_vimeo(host: str, segmentos: list) -> Optional[str]:
+    """Extraer el id de un enlace de Vimeo (vimeo.com/ID o player.vimeo.com/video/ID)."""
+    if host == 'player.vimeo.com' and len(segmentos) >= 2 and segmentos[0] == 'video':
+        candidato = segmentos[1]
+    elif host == 'vimeo.com':
+        # vimeo.com/ID, vimeo.com/channels/canal/ID, vimeo.com/ID/hash-privado
+        candidato = next((s for s in segmentos if _ID_VIMEO.match(s)), None)
+    else:
+        candidato = None
+
+    if candidato and _ID_VIMEO.match(candidato):
+        return candidato
+    return None
+
+def _id_dailymotion(host: str, segmentos: list) -> Optional[str]:
+    """Extraer el id de un enlace de Dailymotion (dailymotion.com/video/ID o dai.ly/ID)."""
+    if host == 'dai.ly' and segmentos:
+        candidato = segmentos[0]
+    elif host == 'dailymotion.com' and len(segmentos) >= 2 and segmentos[0] == 'video':
+        candidato = segmentos[1].split('_', 1)[0]
+    else:
+        candidato = None
+
+    if candidato and _ID_DAILYMOTION.match(candidato):
+        return candidato
+    return None
+
+def canonicalizar_url(url: str) -> Tuple[str, str]:
+    """
+    Obtener (extractor, id de video) de una URL sin acceder a la red.
+
+    Los extractores coinciden con el `extractor_key` de yt-dlp en minúsculas.
+    Si la URL no es de un sitio conocido se devuelve ('generic', URL normalizada).
+
+    Args:
+        url: URL del video
+
+    Returns:
+        Tupla (extractor, id)
+    """
+    partes = urlsplit(url.strip())
+    host = _host(partes.netloc)
+    segmentos = [s for s in partes.path.split('/') if s]
+    query = parse_qs(partes.query)
+
+    if host in _HOSTS_YOUTUBE:
+        id_video = _id_youtube(host, segmentos, query)
+        if id_video:
+            return 'youtube', id_video
+    elif host in ('vimeo.com', 'player.vimeo.com'):
+        id_video = _id_vimeo(host, segmentos)
+        if id_video:
+            return 'vimeo', id_video
+    elif host in ('dailymotion.com', 'dai.ly'):
+        id_video = _id_dailymotion(host, segmentos)
+        if id_video:
+            return 'dailymotion', id_video
+
+    return EXTRACTOR_GENERICO, normalizar_url(url)
+
+def clave_video(url: str) -> str:
+    """
+    Clave de cache de una URL: `extractor:id` (p. ej. `youtube:dQw4w9WgXcQ`).
+
+    Args:
+        url: URL del video
+
+    Returns:
+        Clave canónica
+    """
+    extractor, id_video = canonicalizar_url(url)
+    return f"{extractor}:{id_video}"
+
+def clave_desde_info(info: Dict[str, Any]) -> Optional[str]:
+    """
+    Clave `extractor:id` a partir de los metadatos de yt-dlp.
+
+    Sirve para enlaces que `canonicalizar_url` no reconoce (redirecciones,
+    formatos poco comunes) pero que yt-dlp resuelve a un video conocido.
+
+    Args:
+        info: Información de yt-dlp (con `extractor_key` e `id`)
+
+    Returns:
+        Clave canónica, o None si el extractor es el genérico o faltan datos
+    """
+    extractor = (info.get('extractor_key') or '').lower()
+    if not extractor or extractor == EXTRACTOR_GENERICO or not info.get('id'):
+        return None
+    return f"{extractor}:{info['id']}"
@@ -0,0 +1,106 @@
+"""
+Coalescencia de peticiones concurrentes ("single-flight").
+Si varias peticiones piden lo mismo a la vez, sólo la primera (líder) ejecuta el
+trabajo; las demás (seguidoras) esperan su resultado en lugar de repetirlo.
+Los avisos del líder (p. ej. la etapa en curso) llegan a todas con `difundir`.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+Oyente = Callable[..., None]
+
+class GrupoVueloUnico:
+    """
+    Grupo de operaciones en vuelo indexadas por clave.
+
+    El trabajo del líder corre en una tarea propia: si el cliente que lo
+    originó se desconecta, las seguidoras siguen recibiendo el resultado.
+    """
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self._en_vuelo: Dict[Hashable, asyncio.Task] = {}
+        # Por trabajo en vuelo: oyentes de las peticiones que esperan y último aviso
+        self._oyentes: Dict[asyncio.Task, List[Oyente]] = {}
+        self._ultimo_aviso: Dict[asyncio.Task, Tuple[Any, ...]] = {}
+        self.ejecuciones = 0
+        self.coalescidas = 0
+
+    def _al_terminar(self, clave: Hashable, tarea: asyncio.Task):
+        """Liberar la clave y marcar la excepción como recuperada."""
+        if self._en_vuelo.get(clave) is tarea:
+            del self._en_vuelo[clave]
+        self._oyentes.pop(tarea, None)
+        self._ultimo_aviso.pop(tarea, None)
+        if not tarea.cancelled():
+            tarea.exception()
+
+    async def ejecutar(self, clave: Hashable, funcion: Callable[[], Awaitable[Any]],
+                       oyente: Optional[Oyente] = None) -> Any:
+        """
+        Ejecutar `funcion` una sola vez por clave entre peticiones simultáneas.
+
+        Args:
+            clave: Clave que identifica el trabajo (p. ej. URL normalizada)
+            funcion: Corrutina sin argumentos que realiza el trabajo
+            oyente: Recibe los avisos que el líder pase a `difundir` mientras esta
+                    petición espera; una seguidora recibe primero el último aviso
+
+        Returns:
+            Resultado del líder (compartido por todas las peticiones de la clave)
+        """
+        tarea = self._en_vuelo.get(clave)
+        if tarea is None:
+            tarea = asyncio.ensure_future(funcion())
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda t: self._al_terminar(clave, t))
+            self.ejecuciones += 1
+        else:
+            self.coalescidas += 1
+            if oyente is not None and tarea in self._ultimo_aviso:
+                oyente(*self._ultimo_aviso[tarea])
+        if oyente is None:
+            return await asyncio.shield(tarea)
+
+        # La tarea todavía no empezó (o sigue en curso): el oyente no pierde avisos
+        oyentes = self._oyentes.setdefault(tarea, [])
+        oyentes.append(oyente)
+        try:
+            return await asyncio.shield(tarea)
+        finally:
+            if oyente in oyentes:
+                oyentes.remove(oyente)
+
+    def difundir(self, clave: Hashable, *datos: Any):
+        """
+        Pasar un aviso del líder a todas las peticiones que esperan la clave.
+
+        Args:
+            clave: Clave del trabajo en vuelo (sin trabajo en vuelo no hace nada)
+            *datos: Argumentos con los que se llama a cada oyente
+        """
+        tarea = self._en_vuelo.get(clave)
+        if tarea is None:
+            return
+        self._ultimo_aviso[tarea] = datos
+        for oyente in list(self._oyentes.get(tarea, ())):
+            oyente(*datos)
+
+    def en_vuelo(self, clave: Hashable) -> bool:
+        """Indicar si hay un trabajo en curso para la clave."""
+        return clave in self._en_vuelo
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """
+        Métricas del grupo.
+
+        Returns:
+            Diccionario con ejecuciones reales, peticiones coalescidas y trabajos en vuelo
+        """
+        total = self.ejecuciones + self.coalescidas
+        return {
+            'ejecuciones': self.ejecuciones,
+            'coalescidas': self.coalescidas,
+            'en_vuelo': len(self._en_vuelo),
+            'tasa_coalescencia': round(self.coalescidas / total, 4) if total else 0.0,
+        }